@@ -1,19 +1,26 @@
+import functools
 import logging
 import json
-from typing import Optional
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
 import asyncio
 import time
 
+import aiohttp
 from dotenv import load_dotenv
 from livekit.agents import (
     AutoSubscribe,
     JobContext,
     JobProcess,
+    Plugin,
     WorkerOptions,
     cli,
     llm,
     metrics,
+    stt,
     transcription,
+    tts,
 )
 from livekit.agents.pipeline import VoicePipelineAgent
 from livekit.plugins import (
@@ -21,28 +28,109 @@ from livekit.plugins import (
     noise_cancellation,
     silero,
     turn_detector,
-    openai,
 )
 
 
 from livekit import rtc
 
-from livekit.agents.llm import ChatMessage, ChatImage
 from typing import Dict, Any, List
 import random
+
+from compaction import TranscriptCompactor, log_compaction_metrics
+import healthcheck
+from lifecycle import (
+    GOODBYE_MARGIN,
+    SHUTDOWN_PROCESS_TIMEOUT,
+    DrainCoordinator,
+    clear_drain_notice,
+    watch_for_drain,
+)
+from load import LoadMonitor, load_threshold, monitor_event_loop_lag, process_rss
+from metadata import MetadataLimits, compact_resume, parse_participant_metadata
+from models import SharedEOUModel
+from pacing import InterviewPacer
+from phrases import build_phrase_matcher_from_env
+from providers import TTS_MODEL, TTS_SAMPLE_RATE, ProviderPool
+from rooms import RoomLimits, RoomTaskGroup, job_executor_type, shared
+from session_state import SessionState, SessionStatePublisher
+from silence import SilenceWatchdog
+from speculation import SpeculativeReplies
+from telemetry import get_process_metrics
+from tracing import SessionTrace
+from tts_cache import CachedTTS, TTSAudioCache, TTSCachePlugin, log_time_to_first_audio
+from vision import (
+    FrameBuffer,
+    FramePreprocessOptions,
+    FramePreprocessor,
+    VisionContextPolicy,
+    VisionScheduler,
+    log_preprocess_metrics,
+    log_vision_context_metrics,
+)
+
 load_dotenv(dotenv_path=".env")
 logger = logging.getLogger("vision-voice-agent")
 
+# Frames older than this (seconds) are treated as stale, e.g. when the camera froze
+MAX_FRAME_AGE = 5.0
+
+# Set to 0 to always synthesize fixed lines, e.g. to compare greeting latency
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "1") != "0"
+
+END_CONVERSATION_GOODBYE = "Thank you for the interview today. Goodbye!"
+USER_ENDED_GOODBYE = "Thank you for your time today. Goodbye!"
+SILENCE_PROMPT = "It seems we've been silent for a while. Is there anything else you'd like to discuss, or shall we conclude the interview?"
+SILENCE_GOODBYE = "Since I haven't heard back, I'll end our interview here. Thank you for your time today."
+TIME_UP_GOODBYE = "We've reached the end of our scheduled time, so I'll stop here. Thank you for your time today. Goodbye!"
+DRAIN_GOODBYE = "I'm sorry, I have to end our interview here because of a scheduled system restart. Thank you for your time today. Goodbye!"
+
+# Detail level passed to the LLM provider for attached images ("auto", "low" or "high")
+VISION_IMAGE_DETAIL = os.getenv("VISION_IMAGE_DETAIL", "auto")
+
+# Start the LLM (and frame capture) before the endpointing delay confirms the turn;
+# set to 0 to only call it once the turn is confirmed
+SPECULATIVE_REPLIES = os.getenv("SPECULATIVE_REPLIES", "1") != "0"
+
+# tiktoken is optional; prompt token counts fall back to an estimate without it
+try:
+    import tiktoken
+    _token_encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _token_encoding = None
+
 
 def prewarm(proc: JobProcess):
-    proc.userdata["vad"] = silero.VAD.load()
+    started = time.perf_counter()
+    # Model-backed components are loaded here, before the process is handed a job.
+    # Under the thread executor prewarm runs per job thread; shared() builds each component once per process
+    proc.userdata["vad"] = shared("vad", silero.VAD.load)
+    # Bound to the job's own inference client, so never shared between jobs. Its weights are already
+    # loaded in the worker's inference process; it attaches on the job's first prediction (warm_up)
+    proc.userdata["turn_detector"] = create_turn_detector()
+    proc.userdata["noise_cancellation"] = shared("noise_cancellation", create_noise_cancellation)
+    proc.userdata["tts_cache"] = shared("tts_cache", load_tts_cache)
+    proc.userdata["frame_preprocessor"] = shared(
+        "frame_preprocessor",
+        lambda: FramePreprocessor(
+            FramePreprocessOptions.from_env(),
+            max_workers=int(os.getenv("VISION_PREPROCESS_WORKERS", 1)),
+        ),
+    )
+    proc.userdata["phrase_matcher"] = shared("phrase_matcher", build_phrase_matcher_from_env)
+
+    rss = process_rss()
+    get_process_metrics().set_gauge("intervita_job_process_rss_bytes", rss)
+    logger.info(
+        f"Job process prewarmed in {time.perf_counter() - started:.2f}s, rss={rss / 2**20:.0f} MiB "
+        "(turn detector attaches when the job starts)"
+    )
 
 
-def get_greeting_message() -> str:
-    """Return a random two-sentence greeting with Evita introducing herself, no time reference."""
+def get_greetings() -> List[str]:
+    """Return the pool of two-sentence greetings with Evita introducing herself, no time reference."""
 
     agent_name = "Evita"
-    greetings = [
+    return [
         f"Hey there, I’m {agent_name}, thrilled to chat about your future. Let’s dive in.",
         f"Hi, I’m {agent_name}, great to meet you for this interview. Ready to get started?",
         f"Hello, I’m {agent_name}, excited to talk about your skills today. Here we go.",
@@ -54,29 +142,105 @@ def get_greeting_message() -> str:
         f"Hello there, I’m {agent_name}, loving that we’re doing this today. Time to shine.",
         f"Hey, I’m {agent_name}, awesome to meet you wherever you’re at. Let’s do this."
     ]
-    return random.choice(greetings)
 
 
-def get_role_instructions(max_interview_minutes: int) -> str:
-    """Return the role and time constraint instructions."""
+def get_greeting_message() -> str:
+    """Return a random two-sentence greeting with Evita introducing herself, no time reference."""
+    return random.choice(get_greetings())
+
+
+def get_fixed_lines() -> List[str]:
+    """Return every line the agent speaks verbatim, so its audio can be cached."""
+    return get_greetings() + [
+        END_CONVERSATION_GOODBYE,
+        USER_ENDED_GOODBYE,
+        SILENCE_PROMPT,
+        SILENCE_GOODBYE,
+        TIME_UP_GOODBYE,
+        DRAIN_GOODBYE,
+    ]
+
+
+def create_tts_cache() -> TTSAudioCache:
+    cache = TTSAudioCache(os.getenv("TTS_CACHE_DIR"))
+    cache.add_cacheable(get_fixed_lines())
+    return cache
+
+
+def load_tts_cache() -> TTSAudioCache:
+    cache = create_tts_cache()
+    cache.load()
+    return cache
+
+
+async def build_tts_cache() -> None:
+    """Synthesize the fixed lines into the on-disk TTS cache (run by `download-files`)."""
+    cache = create_tts_cache()
+    cache.load()
+    if not os.getenv("DEEPGRAM_API_KEY"):
+        logger.warning("DEEPGRAM_API_KEY is not set, skipping TTS cache build")
+        return
+    async with aiohttp.ClientSession() as session:
+        engine = deepgram.tts.TTS(model=TTS_MODEL, sample_rate=TTS_SAMPLE_RATE, http_session=session)
+        added = await cache.fill(engine, TTS_MODEL)
+    cache.save()
+    logger.info(f"Added {added} lines to the TTS cache at {cache.cache_dir}")
+
+
+def create_stt(providers: ProviderPool) -> stt.STT:
+    return providers.create_stt()
+
+
+def create_llm(providers: ProviderPool) -> llm.LLM:
+    # Routed to LLM_FALLBACK_MODEL while the primary's time to first token is over threshold
+    return providers.create_llm()
+
+
+def create_summary_llm(providers: ProviderPool) -> llm.LLM:
+    return providers.create_summary_llm()
+
+
+def create_tts(proc: JobProcess, providers: ProviderPool) -> tts.TTS:
+    # Routed to Cartesia while Deepgram's time to first byte is over threshold, if CARTESIA_API_KEY is set
+    engine = providers.create_tts()
+    if TTS_CACHE_ENABLED:
+        # Fixed lines (greetings, goodbyes, silence prompts) play from cached PCM
+        engine = CachedTTS(engine, proc.userdata["tts_cache"], TTS_MODEL)
+    return engine
+
+
+def create_turn_detector() -> SharedEOUModel:
+    return SharedEOUModel()
+
+
+def create_noise_cancellation() -> "rtc.NoiseCancellationOptions":
+    return noise_cancellation.BVC()
+
+
+def get_role_instructions() -> str:
+    """Return the role instructions."""
     return (
         "You are Evita, an experienced interviewer at Intervita.ai. Your role adapts to the candidate's field—HR, department head, or hiring manager—as needed. You conduct real-time voice and video interviews, observing candidates via their camera and responding naturally.\n\n"
         
         "**YOUR ROLE:**\n"
-        "Interview candidates based on their resume, optional job context, and provided questions. Assess their skills, experience, and fit for the role they're targeting. Maintain a direct, slightly casual yet professional tone, reflecting the time-limited nature of the session.\n\n"
-        
+        "Interview candidates based on their resume, optional job context, and provided questions. Assess their skills, experience, and fit for the role they're targeting. Maintain a direct, slightly casual yet professional tone, reflecting the time-limited nature of the session."
+    )
+
+def get_time_constraint(max_interview_minutes: int) -> str:
+    """Return the per-session time constraint instructions."""
+    return (
         f"**VERY IMPORTANT NOTICE: TIME CONSTRAINT**\n"
         f"**You have a maximum of {max_interview_minutes} minutes to complete this interview.** "
         f"At the start, clearly inform the candidate: 'We have only {max_interview_minutes} minutes to complete the interview, so let's make it efficient.' "
         "Stay on track, prioritize key questions, and avoid tangents. Pace yourself to cover essential topics and conclude within the time limit. "
-        "If time is running short, remind them: 'We've got just a few minutes left of our {max_interview_minutes}-minute session—let's wrap up.' "
+        f"If time is running short, remind them: 'We've got just a few minutes left of our {max_interview_minutes}-minute session—let's wrap up.' "
         "End efficiently with a final question or summary if needed."
     )
 
-def get_candidate_info(resume_data: Dict[str, Any], job_context: Optional[str]) -> str:
-    """Return candidate resume and job context details."""
+def get_candidate_info(resume: str, job_context: Optional[str]) -> str:
+    """Return candidate resume (already compacted, see metadata.compact_resume) and job context details."""
     return (
-        f"**CANDIDATE RESUME:**\n{json.dumps(resume_data, indent=2) if resume_data else 'No resume data provided.'}\n\n"
+        f"**CANDIDATE RESUME:**\n{resume if resume else 'No resume data provided.'}\n\n"
         f"**JOB CONTEXT (Optional):**\n{job_context if job_context else 'No job context provided.'}"
     )
 
@@ -136,6 +300,62 @@ def get_tone_and_video_instructions() -> str:
         "- Act human—never mention AI or tech details."
     )
 
+def get_guidance() -> str:
+    """Return the closing guidance section."""
+    return (
+        "**GUIDANCE:**\n"
+        "Prioritize provided questions, tailoring them with resume and job context details. Actively listen to answers and ask follow-ups (e.g., 'That's interesting—how did you handle Z?' or 'What was the outcome?'). Balance visual feedback with substantive discussion, staying within the time limit."
+    )
+
+def count_tokens(text: str) -> int:
+    """Count prompt tokens with tiktoken when installed, otherwise estimate ~4 chars per token."""
+    if _token_encoding is not None:
+        return len(_token_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+@dataclass(frozen=True)
+class InterviewerPrompt:
+    """System prompt split into a static prefix shared by every session and a per-candidate suffix."""
+
+    prefix: str
+    suffix: str
+    prefix_tokens: int
+    suffix_tokens: int
+
+    @property
+    def text(self) -> str:
+        return f"{self.prefix}\n\n{self.suffix}"
+
+@functools.lru_cache(maxsize=1)
+def get_static_prompt_prefix() -> Tuple[str, int]:
+    """Return the static prompt sections and their token count, built once per process.
+
+    Nothing in here may depend on session data: the prefix has to be
+    byte-identical across sessions for the provider's prompt cache to reuse it.
+    """
+    prefix = "\n\n".join([
+        get_role_instructions(),
+        get_interview_approach(),
+        get_tone_and_video_instructions(),
+        get_guidance(),
+    ])
+    return prefix, count_tokens(prefix)
+
+def build_interviewer_prompt(
+    resume: str,
+    questions: List[str] = [],
+    max_interview_minutes: int = 10,
+    job_context: Optional[str] = None,
+) -> InterviewerPrompt:
+    """Build the interviewer prompt: shared static prefix first, candidate-specific sections last."""
+    prefix, prefix_tokens = get_static_prompt_prefix()
+    suffix = "\n\n".join([
+        get_time_constraint(max_interview_minutes),
+        get_candidate_info(resume, job_context),
+        get_questions_section(questions),
+    ])
+    return InterviewerPrompt(prefix, suffix, prefix_tokens, count_tokens(suffix))
+
 def create_interviewer_prompt(
     resume_data: Dict[str, Any],
     questions: List[str] = [],
@@ -143,16 +363,15 @@ def create_interviewer_prompt(
     job_context: Optional[str] = None,
 ) -> str:
     """Create the full interviewer prompt."""
-    return "\n\n".join([
-        get_role_instructions(max_interview_minutes),
-        get_candidate_info(resume_data, job_context),
-        get_questions_section(questions),
-        get_interview_approach(),
-        get_tone_and_video_instructions(),
-        "**GUIDANCE:**\n"
-        "Prioritize provided questions, tailoring them with resume and job context details. Actively listen to answers and ask follow-ups (e.g., 'That's interesting—how did you handle Z?' or 'What was the outcome?'). Balance visual feedback with substantive discussion, staying within the time limit."
-    ])
+    resume = compact_resume(resume_data)[0]
+    return build_interviewer_prompt(resume, questions, max_interview_minutes, job_context).text
+
 async def entrypoint(ctx: JobContext):
+    job_started = time.perf_counter()
+    eou_model = ctx.proc.userdata["turn_detector"]
+    if eou_model is not None:
+        # Overlaps attaching to the inference process and the first inference with connecting and the greeting
+        eou_model.warm_up()
 
     logger.info(f"connecting to room {ctx.room.name}")
     # Update subscription to include video
@@ -160,35 +379,26 @@ async def entrypoint(ctx: JobContext):
     # Wait for the first participant to connect - we need to do this first to get metadata
     participant = await ctx.wait_for_participant()
     
-    # Parse the participant metadata (resume data)
-    resume_data = {}
-    questions = []
-    job_context = ""
-    max_interview_minutes = 10
-    try:
-        if participant.metadata:
-            # Parse the JSON string once
-            parsed_metadata = json.loads(participant.metadata)
-            
-            # Access the fields directly - they're already parsed
-            resume_data = parsed_metadata.get('resume_data', {})
-            questions = parsed_metadata.get('questions', [])
-            max_interview_minutes = parsed_metadata.get('max_interview_minutes', 10)
-            job_context = parsed_metadata.get('job_context', '')
-
-    except json.JSONDecodeError:
-        logger.error(f"Failed to parse participant metadata as JSON: {participant.metadata}")
-    except Exception as e:
-        logger.error(f"Error processing participant metadata: {str(e)}")
-    
-    # Log the parsed metadata
-    logger.info(f"participant metadata: {participant.metadata}")
-    
+    # Validate and cap the participant metadata (resume, questions, job context, timings)
+    interview = parse_participant_metadata(participant.metadata, MetadataLimits.from_env())
+    for error in interview.errors:
+        logger.error(f"Invalid participant metadata, using defaults: {error}")
+    # Sizes and a resume hash only; the raw metadata carries candidate PII
+    logger.info(f"participant metadata: {interview.describe()}")
+    silence_timeout = interview.silence_timeout
+    silence_grace_period = interview.silence_grace_period
+
     # Create the interviewer prompt, incorporating resume data if available
-    prompt = create_interviewer_prompt(resume_data, questions, max_interview_minutes, job_context)
+    prompt = build_interviewer_prompt(
+        interview.resume, interview.questions, interview.max_interview_minutes, interview.job_context
+    )
+    logger.info(
+        f"Interviewer prompt: prefix_tokens={prompt.prefix_tokens} (shared), "
+        f"suffix_tokens={prompt.suffix_tokens} (per candidate)"
+    )
     initial_ctx = llm.ChatContext().append(
         role="system",
-        text=prompt
+        text=prompt.text
     )
 
 
@@ -197,80 +407,151 @@ async def entrypoint(ctx: JobContext):
     # Create a forwarder for user transcriptions
     # We will set up the forwarder after we get audio tracks
     stt_forwarder = None
-    latest_video_track: Optional[rtc.VideoTrack] = None
-
-     # Function to capture image from video track
-    async def get_video_track(room: rtc.Room):
-        """Find and return the first available remote video track in the room."""
-        for participant_id, participant in room.remote_participants.items():
-            for track_id, track_publication in participant.track_publications.items():
-                if track_publication.track and isinstance(
-                    track_publication.track, rtc.RemoteVideoTrack
-                ):
-                    logger.info(
-                        f"Found video track {track_publication.track.sid} "
-                        f"from participant {participant_id}"
-                    )
-                    return track_publication.track
-        raise ValueError("No remote video track found in the room")
-    
-    async def get_latest_image(room: rtc.Room):
-        """Capture and return a single frame from the video track if available."""
-        video_stream = None
-        try:
-            # First check if we can get a video track
-            try:
-                video_track = await get_video_track(room)
-            except ValueError:
-                # No video track found - this is normal when video is off
-                logger.debug("No video track available")
-                return None
-            
-            if video_track is None:
-                return None
-            # Create video stream with timeout to prevent hanging
-            video_stream = rtc.VideoStream(video_track)
-            
-            # Use asyncio.wait_for to add a timeout
-            try:
-                # Set a reasonable timeout (1 second)
-                async def get_first_frame():
-                    async for event in video_stream:
-                        logger.debug("Captured latest video frame")
-                        return event.frame
-                    return None
-                    
-                return await asyncio.wait_for(get_first_frame(), timeout=1.0)
-            except asyncio.TimeoutError:
-                logger.warning("Timeout while waiting for video frame - camera might be off")
-                return None
-            
-        except Exception as e:
-            logger.warning(f"Failed to get latest image: {e}")
+    # Long-lived subscriber holding the most recent frame from the candidate's camera
+    frame_buffer: Optional[FrameBuffer] = None
+    frame_preprocessor: FramePreprocessor = ctx.proc.userdata["frame_preprocessor"]
+    vision_policy = VisionContextPolicy.from_env()
+    vision_scheduler = VisionScheduler.from_env()
+    # Compiled once per process and shared by every interview it runs
+    phrase_matcher = ctx.proc.userdata["phrase_matcher"]
+    process_metrics = get_process_metrics()
+    # Every background task of this interview; a failing one ends this room only
+    room_tasks = RoomTaskGroup(ctx.room.name, process_metrics, RoomLimits.from_env(), on_failure=ctx.shutdown)
+    # This interview's provider clients on kept-alive connections, opened while the rest of the session is set up
+    providers = ProviderPool.from_env(process_metrics)
+    room_tasks.create_task(providers.preconnect(), name="provider_preconnect")
+    # Timestamped pipeline events for latency forensics, exported when the session ends
+    trace = SessionTrace.from_env(ctx.job.id, ctx.room.name)
+    # Snapshot served by get_session_state and pushed to subscribers, updated by the handlers below
+    session_state = SessionState(started_at=time.time(), max_interview_minutes=interview.max_interview_minutes)
+    state_publisher = SessionStatePublisher.from_env(
+        ctx.room,
+        session_state,
+        process_metrics,
+        spawn=lambda coro: room_tasks.create_task(coro, name="session_state_push"),
+    )
+    # Tracks the time budget and provided questions, and ends the interview when the budget is spent
+    pacer = InterviewPacer.from_env(
+        interview.max_interview_minutes, interview.questions, started_at=session_state.started_at
+    )
+    compactor = TranscriptCompactor.from_env(create_summary_llm(providers), count_tokens, process_metrics)
+    speculation = SpeculativeReplies.from_env(eou_model, process_metrics) if SPECULATIVE_REPLIES else None
+
+    def get_video_track(room: rtc.Room) -> Optional[rtc.RemoteVideoTrack]:
+        """Find and return the candidate's already subscribed video track, if any."""
+        remote = room.remote_participants.get(participant.identity)
+        if remote is None:
             return None
-        finally:
-            if video_stream:
-                await video_stream.aclose()
+        for track_id, track_publication in remote.track_publications.items():
+            if track_publication.track and isinstance(
+                track_publication.track, rtc.RemoteVideoTrack
+            ):
+                logger.info(
+                    f"Found video track {track_publication.track.sid} "
+                    f"from participant {remote.identity}"
+                )
+                return track_publication.track
+        return None
+
+    async def start_frame_buffer(track: rtc.Track, identity: str):
+        """Replace any existing frame buffer with one subscribed to the given track."""
+        nonlocal frame_buffer
+        if frame_buffer is not None and frame_buffer.track_sid == track.sid:
+            return
+        previous, frame_buffer = frame_buffer, FrameBuffer(track, identity)
+        logger.info(f"Started video frame buffer for {identity}")
+        if previous is not None:
+            await previous.aclose()
+
+    async def stop_frame_buffer():
+        nonlocal frame_buffer
+        if frame_buffer is not None:
+            buffer, frame_buffer = frame_buffer, None
+            await buffer.aclose()
 
     async def before_llm_cb(assistant: VoicePipelineAgent, chat_ctx: llm.ChatContext):
         """
         Callback that runs right before the LLM generates a response.
-        Captures the current video frame and adds it to the conversation context.
+        Reads the most recent buffered video frame and adds it to the conversation context
+        when the scene changed, the refresh interval passed or the candidate refers to
+        something visual, unless it is nearly identical to the last frame still in context.
         If video is unavailable, continues without adding image content.
+        With speculative replies this may run before the turn is confirmed; a reply
+        released unconfirmed only changes its own request, not the agent's context.
         """
+        live = await speculation.gate(chat_ctx) if speculation is not None else True
+        capture_started = time.perf_counter()
         try:
-            latest_image = await get_latest_image(ctx.room)
-            if latest_image:
-                # Add the image to the conversation context
-                image_content = [ChatImage(image=latest_image)]
-                chat_ctx.messages.append(ChatMessage(role="user", content=image_content))
-                logger.debug("Added latest frame to conversation context")
+            buffered = frame_buffer.latest(max_age=MAX_FRAME_AGE) if frame_buffer else None
+            last_message = chat_ctx.messages[-1] if chat_ctx.messages else None
+            transcript = last_message.content if last_message and isinstance(last_message.content, str) else ""
+            attach_reason = vision_scheduler.decide(frame_buffer.scene, transcript) if buffered else None
+            if buffered and attach_reason is not None and attach_reason != "visual_cue" and room_tasks.over_budget:
+                # Over its CPU share the room sheds frames nobody asked about
+                logger.debug(f"Room over its CPU share, not attaching a frame ({attach_reason})")
+                attach_reason = None
+            if buffered and attach_reason is None:
+                # Nothing worth a new frame this turn: the frame in context still holds
+                if live:
+                    vision_scheduler.record_skipped()
+                process_metrics.inc("intervita_vision_frames_skipped_total")
+                logger.debug("No new frame needed, skipping frame capture for this turn")
+            elif buffered:
+                # Resize and encode off the event loop, then hand the LLM a ready data URL
+                encoded = await frame_preprocessor.process(
+                    buffered.frame,
+                    previous_fingerprint=vision_policy.last_fingerprint(),
+                    max_distance=vision_policy.duplicate_distance,
+                )
+                log_preprocess_metrics(encoded)
+                if encoded.duplicate:
+                    vision_policy.record_duplicate()
+                    if live:
+                        vision_scheduler.record_unchanged(frame_buffer.scene)
+                    process_metrics.inc("intervita_vision_frames_skipped_total")
+                    logger.debug("Camera view unchanged, reusing the frame already in context")
+                else:
+                    # Keep the image in the agent's own context too, so the policy can bound it across turns
+                    image_message = vision_policy.create_image_message(encoded, VISION_IMAGE_DETAIL)
+                    chat_ctx.messages.append(image_message)
+                    if live:
+                        assistant.chat_ctx.messages.append(image_message.copy())
+                        vision_scheduler.record_attached(attach_reason, frame_buffer.scene)
+                    process_metrics.inc("intervita_vision_frames_attached_total")
+                    logger.debug(
+                        f"Added latest frame to conversation context ({attach_reason}, age {buffered.age:.2f}s)"
+                    )
+                capture_seconds = time.perf_counter() - capture_started
+                process_metrics.observe("intervita_frame_capture_seconds", capture_seconds)
+                trace.record("frame_capture", duration=capture_seconds)
             else:
                 logger.debug("No video frame available, continuing without vision")
         except Exception as e:
             # Catch any errors during video capture and allow the agent to continue
             logger.warning(f"Error capturing video frame: {e}. Continuing without vision.")
-    
+
+        # Drop or collapse older frames so the context does not grow with every turn
+        if live:
+            vision_policy.apply(assistant.chat_ctx, count_savings=False)
+        vision_policy.apply(chat_ctx)
+        log_vision_context_metrics(vision_policy.stats)
+
+        # Swap turns the background summary already covers for the summary itself
+        if live:
+            compactor.apply(assistant.chat_ctx)
+        compactor.apply(chat_ctx)
+        # Near the end of the budget, this request alone carries a one-line time check
+        pacing_hint = pacer.hint(live)
+        if pacing_hint is not None:
+            chat_ctx.messages.append(pacing_hint)
+        context_tokens = compactor.count_context_tokens(chat_ctx)
+        process_metrics.observe("intervita_context_tokens", context_tokens)
+        process_metrics.observe("intervita_context_tokens_uncompacted", context_tokens + compactor.stats.tokens_saved)
+        logger.debug(f"Context tokens: {context_tokens} sent, {context_tokens + compactor.stats.tokens_saved} uncompacted")
+        if live:
+            compactor.schedule(assistant.chat_ctx)
+            trace.record("llm_request")
+
     # Flag to track conversation state
     conversation_ending = False
 
@@ -281,11 +562,13 @@ async def entrypoint(ctx: JobContext):
             """Allow frontend to explicitly end the conversation"""
             nonlocal conversation_ending
             logger.info(f"Received end_conversation request from {data.caller_identity}")
+            trace.record("rpc_end_conversation")
             conversation_ending = True
+            session_state.update(conversation_ending=True)
             
             # Say goodbye before disconnecting
             try:
-                await agent.say("Thank you for the interview today. Goodbye!")
+                await agent.say(END_CONVERSATION_GOODBYE)
             except Exception as e:
                 logger.error(f"Error saying goodbye: {str(e)}")
             
@@ -302,7 +585,7 @@ async def entrypoint(ctx: JobContext):
                 except Exception as e:
                     logger.error(f"Error during disconnect: {str(e)}")
                 
-            asyncio.create_task(disconnect_after_delay())
+            room_tasks.create_task(disconnect_after_delay(), name="disconnect_after_delay", essential=True)
             
             return response
         
@@ -312,52 +595,84 @@ async def entrypoint(ctx: JobContext):
             """Simple ping method to check if RPC is working"""
             logger.info(f"Received ping from {data.caller_identity}")
             return f"Pong! Agent is alive and received: {data.payload}"
+
+        @ctx.room.local_participant.register_rpc_method("get_session_state")
+        async def handle_get_session_state(data: rtc.RpcInvocationData):
+            """Current interview state as compact JSON, served from the incrementally kept snapshot"""
+            started = time.perf_counter()
+            payload = session_state.rpc_payload()
+            process_metrics.observe("intervita_session_state_rpc_seconds", time.perf_counter() - started)
+            return payload
+
+        @ctx.room.local_participant.register_rpc_method("subscribe_session_state")
+        async def handle_subscribe_session_state(data: rtc.RpcInvocationData):
+            """Push state changes to the caller as data messages on the session_state topic"""
+            logger.info(f"{data.caller_identity} subscribed to session state")
+            state_publisher.subscribe(data.caller_identity)
+            return session_state.rpc_payload()
+
+        @ctx.room.local_participant.register_rpc_method("unsubscribe_session_state")
+        async def handle_unsubscribe_session_state(data: rtc.RpcInvocationData):
+            state_publisher.unsubscribe(data.caller_identity)
+            return "ok"
         
         logger.info("Successfully registered RPC methods")
     except Exception as e:
         logger.error(f"Failed to register RPC methods: {str(e)}")
 
+    tts_engine = create_tts(ctx.proc, providers)
+
     agent = VoicePipelineAgent(
         vad=ctx.proc.userdata["vad"],
-        stt=deepgram.STT(),
-        llm=openai.LLM(model="gpt-4o-mini"),
-        # llm=llm_plugin.LLM.with_groq(model="grok-2-vision-1212", temperature=0.8),
-        # tts=cartesia.TTS(),
-        tts=deepgram.tts.TTS(
-            model="aura-luna-en",
-            sample_rate=32000,
-            
-        ),
-        # use LiveKit's transformer-based turn detector
-        turn_detector=turn_detector.EOUModel(),
+        stt=create_stt(providers),
+        llm=create_llm(providers),
+        tts=tts_engine,
+        # use LiveKit's transformer-based turn detector, shared by every job in this process
+        turn_detector=eou_model,
         # minimum delay for endpointing, used when turn detector believes the user is done with their turn
         min_endpointing_delay=0.5,
         # maximum delay for endpointing, used when turn detector does not believe the user is done with their turn
         max_endpointing_delay=5.0,
         # enable background voice & noise cancellation, powered by Krisp
         # included at no additional cost with LiveKit Cloud
-        noise_cancellation=noise_cancellation.BVC(),
+        noise_cancellation=ctx.proc.userdata["noise_cancellation"],
         chat_ctx=initial_ctx,
         before_llm_cb=before_llm_cb,
+        # replies start on the final transcript and are replaced if the candidate keeps talking
+        preemptive_synthesis=SPECULATIVE_REPLIES,
     )
 
     usage_collector = metrics.UsageCollector()
+    first_llm_turn_logged = False
 
     @agent.on("metrics_collected")
     def on_metrics_collected(agent_metrics: metrics.AgentMetrics):
+        nonlocal first_llm_turn_logged
         metrics.log_metrics(agent_metrics)
         usage_collector.collect(agent_metrics)
+        process_metrics.observe_agent_metrics(agent_metrics)
+        trace.on_metrics(agent_metrics)
+        pacer.on_metrics(agent_metrics)
+        if speculation is not None:
+            speculation.on_metrics(agent_metrics)
+        if isinstance(agent_metrics, metrics.LLMMetrics) and not first_llm_turn_logged:
+            # The first turn is where a warm provider prompt cache shows up as lower TTFT
+            first_llm_turn_logged = True
+            logger.info(
+                f"First LLM turn: ttft={agent_metrics.ttft:.3f}s, prompt_tokens={agent_metrics.prompt_tokens}, "
+                f"cacheable_prefix_tokens={prompt.prefix_tokens}"
+            )
     
     
     # Set up the forwarder when we get audio tracks
     @ctx.room.on("track_subscribed")
     def on_track_subscribed(track, publication, remote_participant):
-        nonlocal stt_forwarder, latest_video_track
+        nonlocal stt_forwarder
         
         if remote_participant.identity != participant.identity:
             return
             
-        if track.kind == 'audio':
+        if track.kind == rtc.TrackKind.KIND_AUDIO:
             # Now we have the participant's audio track, we can set up the forwarder
             stt_forwarder = transcription.STTSegmentsForwarder(
                 room=ctx.room,
@@ -369,145 +684,224 @@ async def entrypoint(ctx: JobContext):
             agent.transcript_forwarder = stt_forwarder
             logger.info(f"Set up transcript forwarding for {remote_participant.identity}")
         
-        elif track.kind == 'video':
-            # Store the latest video track
-            latest_video_track = track
+        elif track.kind == rtc.TrackKind.KIND_VIDEO:
+            # Keep a persistent subscriber so before_llm_cb never waits on a new stream
+            room_tasks.create_task(start_frame_buffer(track, remote_participant.identity), name="start_frame_buffer")
             logger.info(f"Subscribed to video from {remote_participant.identity}")
+
+    @ctx.room.on("track_unsubscribed")
+    def on_track_unsubscribed(track, publication, remote_participant):
+        if frame_buffer is not None and frame_buffer.track_sid == track.sid:
+            logger.info(f"Video unsubscribed from {remote_participant.identity}")
+            room_tasks.create_task(stop_frame_buffer(), name="stop_frame_buffer", essential=True)
+
+    # The video track may already be subscribed before the handler was registered
+    existing_video_track = get_video_track(ctx.room)
+    if existing_video_track is not None:
+        room_tasks.create_task(
+            start_frame_buffer(existing_video_track, participant.identity), name="start_frame_buffer"
+        )
     
-    # Enhanced transcript monitoring for user goodbyes
-    @agent.on("transcript")
-    def on_transcript(transcript):
+    # Enhanced transcript monitoring for user goodbyes, run on every committed user turn
+    @agent.on("user_speech_committed")
+    def on_transcript(msg: llm.ChatMessage):
         """Monitor user transcripts for goodbye indicators with more cases"""
         nonlocal conversation_ending
+        trace.record("transcript_committed")
+        session_state.add_turn()
         
         if conversation_ending:
             return  # Already ending, no need to check
         
-        # Check for goodbye phrases in user transcript
-        lower_text = transcript.text.lower()
-        
-        # Expanded user goodbye indicators
-        user_goodbye_indicators = [
-            # Standard goodbyes
-            "goodbye", "bye", "farewell", "see you", 
-            
-            # Direct ending statements
-            "thank you for your time", "end the interview", "that's all",
-            "need to go", "have to leave", "conclude", "finish",
-            
-            # Implicit endings
-            "appreciate the opportunity", "look forward to hearing",
-            "hope to hear from you", "next steps", "follow up",
-            
-            # Time constraints
-            "running out of time", "out of time", "another appointment", 
-            "getting late", "need to run", "have to run",
-            
-            # Questions about next steps
-            "when will i hear back", "next in the process", 
-            "follow up process", "hear about the position"
-        ]
-        
-        # Strong indicators that directly state ending
-        strong_ending_phrases = [
-            "i need to end now",
-            "let's end the interview",
-            "i have to go now",
-            "that's all i have",
-            "thank you for interviewing me",
-            "i really need to go"
-        ]
-        
-        # Strong match if we find a clear ending phrase
-        strong_match = any(phrase in lower_text for phrase in strong_ending_phrases)
-        # Weaker match if we find individual goodbye indicators
-        weak_match = any(indicator in lower_text for indicator in user_goodbye_indicators)
+        text = msg.content if isinstance(msg.content, str) else " ".join(c for c in msg.content if isinstance(c, str))
+        # Single precompiled scan for goodbye phrases, strong matches take precedence
+        phrase_match = phrase_matcher.match(text)
+        strong_match = phrase_match is not None and phrase_match.strength == "strong"
+        weak_match = phrase_match is not None and phrase_match.strength == "weak"
         
         if strong_match:
-            logger.info(f"User explicitly ended conversation: '{transcript.text}'")
+            logger.info(f"User explicitly ended conversation ('{phrase_match.phrase}'): '{text}'")
             conversation_ending = True
+            session_state.update(conversation_ending=True)
             
             # Respond with a quick goodbye
             async def say_goodbye_and_disconnect():
                 try:
-                    await agent.say("Thank you for your time today. Goodbye!")
+                    await agent.say(USER_ENDED_GOODBYE)
                     await asyncio.sleep(3)
                     logger.info("Disconnecting room after user explicitly ended conversation")
                     await ctx.room.disconnect()
                 except Exception as e:
                     logger.error(f"Error during goodbye response: {e}")
                 
-            asyncio.create_task(say_goodbye_and_disconnect())
+            room_tasks.create_task(say_goodbye_and_disconnect(), name="say_goodbye_and_disconnect", essential=True)
         elif weak_match:
-            logger.info(f"User potentially indicating conversation end: '{transcript.text}'")
+            logger.info(f"User potentially indicating conversation end ('{phrase_match.phrase}'): '{text}'")
             # Don't set conversation_ending here - let the LLM respond first
 
     # Add silence detection for natural conversation ending
-    last_interaction_time = time.time()
-    silence_check_interval = 30  # seconds
-    max_silence_duration = 120  # 2 minutes of silence triggers ending
+    async def prompt_after_silence():
+        """Check in with the candidate after prolonged silence"""
+        if conversation_ending:
+            silence_watchdog.cancel()
+            return
+        logger.info(f"Detected prolonged silence ({silence_watchdog.timeout:.0f} seconds), prompting candidate")
+        # Check if the user is still there
+        trace.record("silence_prompt")
+        await agent.say(SILENCE_PROMPT)
 
-    async def monitor_silence():
-        """Monitor for prolonged silence which might indicate the conversation ended naturally"""
-        nonlocal last_interaction_time, conversation_ending
-        
-        while True:
-            await asyncio.sleep(silence_check_interval)
-            
-            if conversation_ending:
-                return  # Already ending, stop monitoring
-            
-            current_time = time.time()
-            silence_duration = current_time - last_interaction_time
-            
-            if silence_duration > max_silence_duration:
-                logger.info(f"Detected prolonged silence ({silence_duration:.1f} seconds), ending conversation")
-                conversation_ending = True
-                
-                try:
-                    # Check if the user is still there
-                    await agent.say("It seems we've been silent for a while. Is there anything else you'd like to discuss, or shall we conclude the interview?")
-                    
-                    # Give the user a chance to respond
-                    await asyncio.sleep(15)
-                    
-                    # If still silent, disconnect
-                    if time.time() - last_interaction_time > max_silence_duration:
-                        logger.info("Still silent after prompt, disconnecting")
-                        await agent.say("Since I haven't heard back, I'll end our interview here. Thank you for your time today.")
-                        await asyncio.sleep(5)
-                        await ctx.room.disconnect()
-                except Exception as e:
-                    logger.error(f"Error handling silence detection: {e}")
-                    await ctx.room.disconnect()
+    async def end_after_silence():
+        """Still silent after the prompt's grace period: say goodbye and disconnect"""
+        nonlocal conversation_ending
+        if conversation_ending:
+            return
+        logger.info("Still silent after prompt, disconnecting")
+        conversation_ending = True
+        session_state.update(conversation_ending=True)
+        try:
+            await agent.say(SILENCE_GOODBYE)
+            await asyncio.sleep(5)
+        except Exception as e:
+            logger.error(f"Error handling silence detection: {e}")
+        await ctx.room.disconnect()
+
+    silence_watchdog = SilenceWatchdog(
+        on_silence=prompt_after_silence,
+        on_grace_expired=end_after_silence,
+        timeout=silence_timeout,
+        grace_period=silence_grace_period,
+        spawn=lambda coro: room_tasks.create_task(coro, name="silence_watchdog", essential=True),
+    )
+    room_tasks.add_cleanup(silence_watchdog.cancel)
 
-    # Update interaction timestamps for silence detection
+    async def end_at_budget() -> bool:
+        """The interview's time budget is spent: say goodbye and disconnect"""
+        nonlocal conversation_ending
+        if conversation_ending:
+            return False
+        conversation_ending = True
+        session_state.update(conversation_ending=True)
+        silence_watchdog.cancel()
+        try:
+            await agent.say(TIME_UP_GOODBYE, allow_interruptions=False)
+            await asyncio.sleep(2)
+        except Exception as e:
+            logger.error(f"Error saying goodbye at the end of the time budget: {e}")
+        logger.info("Disconnecting room at the end of the time budget")
+        await ctx.room.disconnect()
+        return True
+
+    async def end_for_drain(deadline: float):
+        """The worker is shutting down: wait for a pause, then say goodbye before the drain deadline"""
+        nonlocal conversation_ending
+        # Let the current answer or reply finish unless that would run into the deadline
+        while (session_state.user_speaking or session_state.agent_speaking) and time.time() < deadline - GOODBYE_MARGIN:
+            await asyncio.sleep(0.25)
+        if conversation_ending:
+            return
+        conversation_ending = True
+        session_state.update(conversation_ending=True)
+        silence_watchdog.cancel()
+        try:
+            await agent.say(DRAIN_GOODBYE, allow_interruptions=False)
+            await asyncio.sleep(2)
+        except Exception as e:
+            logger.error(f"Error saying goodbye before shutdown: {e}")
+        logger.info("Disconnecting room for worker shutdown")
+        await ctx.room.disconnect()
+
+    # Push the silence deadline back on any speech
     @agent.on("user_started_speaking")
     def on_user_started_speaking():
-        nonlocal last_interaction_time
-        last_interaction_time = time.time()
+        trace.record("user_speech_start")
+        session_state.update(user_speaking=True)
+        silence_watchdog.user_activity()
+
+    @agent.on("user_stopped_speaking")
+    def on_user_stopped_speaking():
+        trace.record("user_speech_end")
+        session_state.update(user_speaking=False)
+
+    # Set right before the greeting is queued, cleared once its first audio plays
+    greeting_started: Optional[float] = None
+    greeting_cached = False
 
     @agent.on("agent_started_speaking")
     def on_agent_started_speaking():
-        nonlocal last_interaction_time
-        last_interaction_time = time.time()
-
-    # Start the silence monitor
-    asyncio.create_task(monitor_silence())
+        nonlocal greeting_started
+        trace.record("agent_speech_start")
+        session_state.update(agent_speaking=True)
+        silence_watchdog.agent_activity()
+        if greeting_started is not None:
+            log_time_to_first_audio("Greeting", greeting_started, greeting_cached)
+            greeting_started = None
+            startup = time.perf_counter() - job_started
+            process_metrics.observe("intervita_startup_to_greeting_seconds", startup)
+            rss = process_rss()
+            process_metrics.set_gauge("intervita_job_process_rss_bytes", rss)
+            logger.info(f"Startup to greeting: {startup:.3f}s, rss={rss / 2**20:.0f} MiB")
+
+    @agent.on("agent_stopped_speaking")
+    def on_agent_stopped_speaking():
+        session_state.update(agent_speaking=False)
+
+    @agent.on("agent_speech_committed")
+    def on_agent_speech_committed(msg: llm.ChatMessage):
+        if isinstance(msg.content, str):
+            pacer.on_agent_speech(msg.content)
+
+    # Start the silence watchdog
+    silence_watchdog.start()
 
     # Monitor room state for unexpected disconnections
     @ctx.room.on("disconnected")
     def on_room_disconnected():
         logger.info("Room disconnected event received")
+        silence_watchdog.cancel()
+        state_publisher.close()
+        room_tasks.create_task(stop_frame_buffer(), name="stop_frame_buffer", essential=True)
+        log_vision_context_metrics(vision_policy.stats, prefix="Vision context session summary")
+        logger.info(f"Vision scheduling session summary: {vision_scheduler.stats.describe()}")
+        logger.info(
+            f"Usage summary: {usage_collector.get_summary()} "
+            f"(prompt prefix_tokens={prompt.prefix_tokens}, suffix_tokens={prompt.suffix_tokens})"
+        )
+        log_compaction_metrics(compactor.stats, prefix="Transcript compaction session summary")
+        if speculation is not None:
+            speculation.close()
+            logger.info(f"Speculative replies: {speculation.stats.describe()}")
+        logger.info(f"Room tasks: {room_tasks.stats.describe()}")
+        logger.info(
+            f"Session state pushes: {state_publisher.pushes} ({state_publisher.bytes_sent} bytes), "
+            f"coalesced changes: {state_publisher.coalesced}"
+        )
     
     @ctx.room.on("reconnecting") 
     def on_room_reconnecting():
         logger.info("Room reconnecting event received")
-        nonlocal last_interaction_time
-        # Reset interaction time during reconnections to avoid premature ending
-        last_interaction_time = time.time()
+        # Push the silence deadline back during reconnections to avoid premature ending
+        silence_watchdog.user_activity()
 
     agent.start(ctx.room, participant)
+    process_metrics.session_started()
+    # Feeds the worker's load score, so a saturated process stops receiving interviews
+    room_tasks.create_task(monitor_event_loop_lag(process_metrics), name="loop_lag", essential=True)
+    room_tasks.create_task(watch_for_drain(end_for_drain, process_metrics), name="drain_watch", essential=True)
+    room_tasks.create_task(pacer.run(end_at_budget), name="pacing", essential=True)
+    room_tasks.start()
+
+    async def on_job_shutdown():
+        state_publisher.close()
+        await stop_frame_buffer()
+        await room_tasks.aclose()
+        await compactor.aclose()
+        await trace.aclose()
+        logger.info(f"Pacing: {pacer.finish(process_metrics).describe()}")
+        logger.info(f"Providers: {providers.describe()}")
+        await providers.aclose()
+        process_metrics.session_ended()
+
+    ctx.add_shutdown_callback(on_job_shutdown)
 
     # Capture the candidate's image before greeting
 
@@ -524,14 +918,32 @@ async def entrypoint(ctx: JobContext):
     #     greeting += "! How's your day going?"
     
     # Start with a greeting that shows the agent can see the candidate
+    greeting_cached = isinstance(tts_engine, CachedTTS) and tts_engine.lookup(greeting) is not None
+    greeting_started = time.perf_counter()
     await agent.say(greeting, allow_interruptions=True)
 
 
+# Build the on-disk TTS cache as part of `python agent.py download-files`
+Plugin.register_plugin(TTSCachePlugin(build_tts_cache))
+
+
 if __name__ == "__main__":
+    # Job processes write metrics snapshots; the worker process merges and serves them
+    metrics_port = os.getenv("METRICS_PORT")
+    if metrics_port:
+        healthcheck.start_in_background(int(metrics_port))
+    clear_drain_notice()
+    # On SIGTERM, tells interviews to wrap up and bounds the drain to fit in fly's kill_timeout
+    DrainCoordinator().install()
     cli.run_app(
         WorkerOptions(
             entrypoint_fnc=entrypoint,
             prewarm_fnc=prewarm,
+            load_fnc=LoadMonitor.get_load,
+            load_threshold=load_threshold(),
+            # "thread" runs several interviews per process, sharing the prewarmed models
+            job_executor_type=job_executor_type(),
+            shutdown_process_timeout=SHUTDOWN_PROCESS_TIMEOUT,
         ),
     )
 
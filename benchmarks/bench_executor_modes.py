@@ -0,0 +1,178 @@
+"""Compare sessions per GB of RSS for the process and thread job executor modes.
+
+process: every interview runs in its own OS process (the default
+JOB_EXECUTOR_MODE), each paying for its own interpreter, imports and prewarmed
+models. thread: every interview runs on its own thread and event loop inside
+one process, with the VAD, TTS cache, encoder pool and phrase matcher built
+once through rooms.shared().
+
+Both modes drive agent.entrypoint with the replay benchmark's fake room and
+stub providers, so the difference is only in how the sessions are hosted.
+
+    python benchmarks/bench_executor_modes.py --sessions 8 --turns 3
+    python benchmarks/bench_executor_modes.py --mode thread --sessions 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List
+
+import psutil
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_replay import install_stubs, percentile, run_session
+from replay_fakes import EnergyVAD, FakeJobProcess, Latencies, camera_frames
+
+import agent as app
+
+SAMPLE_INTERVAL = 0.25
+
+
+def prewarmed_process() -> FakeJobProcess:
+    proc = FakeJobProcess()
+    app.prewarm(proc)
+    proc.userdata["vad"] = EnergyVAD()
+    proc.userdata["turn_detector"] = None
+    proc.userdata["noise_cancellation"] = None
+    return proc
+
+
+def run_threads(args) -> Dict[str, object]:
+    """Run args.sessions interviews in this process, one thread and event loop each."""
+    latencies = Latencies(stt_final=args.stt_latency, llm_ttft=args.llm_ttft, tts_ttfb=args.tts_ttfb)
+    install_stubs(latencies)
+    frames = camera_frames(args.width, args.height, 30)
+    results: List[object] = [None] * args.sessions
+
+    def worker(index: int) -> None:
+        # Like the thread executor: prewarm on the job's thread, then a private event loop
+        proc = prewarmed_process()
+        try:
+            results[index] = asyncio.run(run_session(index, proc, args, frames, None, latencies))
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=worker, args=(i,), name=f"job-{i}") for i in range(args.sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    sessions = [r for r in results if r is not None and not isinstance(r, BaseException)]
+    return {
+        "failed": args.sessions - len(sessions),
+        "end_to_end": [v for s in sessions for v in s.recorder.values("end_to_end")],
+    }
+
+
+def sample(processes, stop: threading.Event, peak: Dict[str, float]) -> None:
+    """Track the peak summed RSS of the given processes."""
+    while not stop.is_set():
+        rss = 0
+        for process in processes():
+            try:
+                rss += process.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        peak["rss"] = max(peak["rss"], rss)
+        stop.wait(SAMPLE_INTERVAL)
+
+
+def measure_thread_mode(args) -> Dict[str, object]:
+    me = psutil.Process()
+    stop, peak = threading.Event(), {"rss": 0.0}
+    sampler = threading.Thread(target=sample, args=(lambda: [me], stop, peak), daemon=True)
+    started = time.perf_counter()
+    sampler.start()
+    result = run_threads(args)
+    stop.set()
+    sampler.join()
+    # Whole-process CPU, imports included, to match what each process-mode child reports
+    result.update(rss=peak["rss"], cpu=time.process_time(), wall=time.perf_counter() - started)
+    return result
+
+
+def measure_process_mode(args) -> Dict[str, object]:
+    """Launch one single-session child per interview, all at once."""
+    child_args = [
+        sys.executable, __file__, "--child", "--sessions", "1", "--turns", str(args.turns),
+        "--width", str(args.width), "--height", str(args.height), "--fps", str(args.fps),
+        "--stt-latency", str(args.stt_latency), "--llm-ttft", str(args.llm_ttft), "--tts-ttfb", str(args.tts_ttfb),
+    ]
+    started = time.perf_counter()
+    children = [subprocess.Popen(child_args, stdout=subprocess.PIPE, text=True) for _ in range(args.sessions)]
+    handles = [psutil.Process(child.pid) for child in children]
+    stop, peak = threading.Event(), {"rss": 0.0}
+    sampler = threading.Thread(target=sample, args=(lambda: handles, stop, peak), daemon=True)
+    sampler.start()
+
+    cpu = 0.0
+    failed, end_to_end = 0, []
+    for child in children:
+        output, _ = child.communicate()
+        lines = output.strip().splitlines()
+        if child.returncode != 0 or not lines:
+            failed += 1
+            continue
+        report = json.loads(lines[-1])
+        failed += report["failed"]
+        end_to_end.extend(report["end_to_end"])
+        cpu += report["cpu"]
+    stop.set()
+    sampler.join()
+    return {
+        "failed": failed,
+        "end_to_end": end_to_end,
+        "rss": peak["rss"],
+        "cpu": cpu,
+        "wall": time.perf_counter() - started,
+    }
+
+
+def report(mode: str, sessions: int, result: Dict[str, object]) -> None:
+    rss_gb = result["rss"] / 2**30
+    e2e = result["end_to_end"]
+    e2e_text = (
+        f"e2e p50={percentile(e2e, 50) * 1000:.0f}ms p95={percentile(e2e, 95) * 1000:.0f}ms" if e2e else "e2e n=0"
+    )
+    print(
+        f"{mode:<8} sessions={sessions} failed={result['failed']} peak_rss={result['rss'] / 2**20:.0f} MiB "
+        f"({result['rss'] / max(1, sessions) / 2**20:.0f} MiB/session, {sessions / rss_gb:.1f} sessions/GB) "
+        f"cpu={result['cpu']:.1f}s wall={result['wall']:.1f}s {e2e_text}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("process", "thread", "both"), default="both")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent simulated interviews")
+    parser.add_argument("--turns", type=int, default=3, help="candidate answers before saying goodbye")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=float, default=15)
+    parser.add_argument("--think-time", type=float, default=0.8)
+    parser.add_argument("--reply-timeout", type=float, default=30)
+    parser.add_argument("--silence-timeout", type=float, default=120)
+    parser.add_argument("--stt-latency", type=float, default=Latencies.stt_final)
+    parser.add_argument("--llm-ttft", type=float, default=Latencies.llm_ttft)
+    parser.add_argument("--tts-ttfb", type=float, default=Latencies.tts_ttfb)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_threads(args)
+        result["cpu"] = time.process_time()
+        print(json.dumps(result))
+        sys.exit(0)
+
+    print(f"{args.sessions} sessions x {args.turns} turns, {args.width}x{args.height} camera")
+    if args.mode in ("process", "both"):
+        report("process", args.sessions, measure_process_mode(args))
+    if args.mode in ("thread", "both"):
+        report("thread", args.sessions, measure_thread_mode(args))
@@ -0,0 +1,85 @@
+"""Compare inline full-resolution frame encoding with the off-loop FramePreprocessor.
+
+Measures per-frame CPU time and how long the event loop is blocked while a
+ticker task tries to run every 5 ms (a stand-in for STT/TTS work).
+
+    python benchmarks/bench_frame_preprocess.py --frames 50 --width 1280 --height 720
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from livekit import rtc
+from livekit.agents.utils.images import EncodeOptions, encode
+
+from vision import FramePreprocessOptions, FramePreprocessor
+
+TICK_INTERVAL = 0.005
+
+
+def make_frame(width: int, height: int) -> rtc.VideoFrame:
+    data = bytearray(os.urandom(width * height * 4))
+    return rtc.VideoFrame(width, height, rtc.VideoBufferType.RGBA, data)
+
+
+async def measure_loop_lag(work) -> tuple:
+    """Run work() while ticking; return (work seconds, max tick lag, total lag)."""
+    stop = asyncio.Event()
+    lags = []
+
+    async def ticker():
+        while not stop.is_set():
+            expected = time.perf_counter() + TICK_INTERVAL
+            await asyncio.sleep(TICK_INTERVAL)
+            lags.append(max(0.0, time.perf_counter() - expected))
+
+    tick_task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await tick_task
+    return elapsed, max(lags, default=0.0), sum(lags)
+
+
+async def main(args) -> None:
+    frames = [make_frame(args.width, args.height) for _ in range(args.frames)]
+
+    async def inline():
+        for frame in frames:
+            # what the openai plugin does on the loop when given a raw VideoFrame
+            encode(frame, EncodeOptions())
+            await asyncio.sleep(0)
+
+    preprocessor = FramePreprocessor(FramePreprocessOptions.from_env())
+    cpu_total = 0.0
+    sizes = []
+
+    async def offloaded():
+        nonlocal cpu_total
+        for frame in frames:
+            encoded = await preprocessor.process(frame)
+            cpu_total += encoded.timings["total"]
+            sizes.append(encoded.num_bytes)
+
+    inline_elapsed, inline_max, inline_lag = await measure_loop_lag(inline)
+    off_elapsed, off_max, off_lag = await measure_loop_lag(offloaded)
+    preprocessor.shutdown()
+
+    n = len(frames)
+    print(f"frames={n} source={args.width}x{args.height} target={preprocessor.options.width}x{preprocessor.options.height}")
+    print(f"inline:    {inline_elapsed / n * 1000:.2f} ms/frame, max loop lag {inline_max * 1000:.2f} ms, total lag {inline_lag * 1000:.1f} ms")
+    print(f"offloaded: {off_elapsed / n * 1000:.2f} ms/frame, max loop lag {off_max * 1000:.2f} ms, total lag {off_lag * 1000:.1f} ms")
+    print(f"offloaded cpu {cpu_total / n * 1000:.2f} ms/frame, avg encoded size {sum(sizes) / n / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    asyncio.run(main(parser.parse_args()))
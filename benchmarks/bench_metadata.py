@@ -0,0 +1,143 @@
+"""Compare metadata ingestion against the previous json.loads + raw logging + indented resume dump.
+
+Builds synthetic participant metadata with resumes of increasing size and
+measures, per session: ingestion time (cold and with the resume already in the
+content-hash cache), bytes written to the log, and the resume's prompt size.
+Before timing, malformed payloads are checked to fall back to the defaults.
+
+    python benchmarks/bench_metadata.py --sizes 4,16,48,200 --sessions 200
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from metadata import DEFAULT_MAX_INTERVIEW_MINUTES, MetadataLimits, clear_cache, parse_participant_metadata
+
+COMPANIES = ["Acme Logistics", "Northwind", "Globex", "Initech", "Umbrella Health", "Stark Payments"]
+ROLES = ["Backend Engineer", "Senior Software Engineer", "Tech Lead", "Platform Engineer", "Data Engineer"]
+SKILLS = ["Python", "Go", "PostgreSQL", "Kafka", "Kubernetes", "Terraform", "React", "gRPC", "Redis", "Spark"]
+SENTENCES = [
+    "Designed and operated an event-driven order pipeline handling 40k messages per second.",
+    "Led the migration of a monolith to services without customer-facing downtime.",
+    "Cut p99 API latency from 900ms to 180ms by reworking the caching layer.",
+    "Mentored four engineers and ran the team's hiring loop.",
+    "Introduced on-call runbooks and reduced incident resolution time by half.",
+    "Built internal tooling for schema migrations used by twelve teams.",
+]
+
+
+def synthetic_resume(target_kb: int, rng: random.Random) -> dict:
+    resume = {
+        "name": "Jordan Example",
+        "email": "jordan@example.com",
+        "phone": "+1 555 0100",
+        "summary": " ".join(rng.choice(SENTENCES) for _ in range(4)),
+        "skills": rng.sample(SKILLS, 6),
+        "experience": [],
+        "education": [{"school": "State University", "degree": "BSc Computer Science", "year": 2014}],
+    }
+    while len(json.dumps(resume)) < target_kb * 1024:
+        resume["experience"].append({
+            "company": rng.choice(COMPANIES),
+            "role": rng.choice(ROLES),
+            "years": rng.randint(1, 5),
+            "description": " ".join(rng.choice(SENTENCES) for _ in range(rng.randint(3, 8))),
+            "highlights": [rng.choice(SENTENCES) for _ in range(rng.randint(2, 5))],
+        })
+    return resume
+
+
+def synthetic_metadata(target_kb: int, rng: random.Random) -> str:
+    return json.dumps({
+        "resume_data": synthetic_resume(target_kb, rng),
+        "questions": [f"Tell me about {skill} in production." for skill in rng.sample(SKILLS, 5)],
+        "job_context": "Senior backend engineer on the payments platform team. " * 5,
+        "max_interview_minutes": 15,
+    })
+
+
+def legacy_ingest(raw: str, logger: logging.Logger) -> str:
+    """What entrypoint did before: full parse, raw INFO log, indented dump into the prompt."""
+    parsed = json.loads(raw)
+    logger.info(f"participant metadata: {raw}")
+    return json.dumps(parsed.get("resume_data", {}), indent=2)
+
+
+def new_ingest(raw: str, logger: logging.Logger, limits: MetadataLimits) -> str:
+    interview = parse_participant_metadata(raw, limits)
+    logger.info(f"participant metadata: {interview.describe()}")
+    return interview.resume
+
+
+# Payloads whose max_interview_minutes must be rejected in favour of the default
+MALFORMED_MINUTES = {
+    "bool": '{"max_interview_minutes": true}',
+    "string": '{"max_interview_minutes": "fifteen"}',
+    "nan": '{"max_interview_minutes": NaN}',
+    "infinity": '{"max_interview_minutes": Infinity}',
+}
+
+
+def check_malformed(limits: MetadataLimits) -> None:
+    for case, raw in MALFORMED_MINUTES.items():
+        interview = parse_participant_metadata(raw, limits)
+        assert interview.max_interview_minutes == DEFAULT_MAX_INTERVIEW_MINUTES, (case, interview.max_interview_minutes)
+        assert interview.errors, case
+    deep = '{"resume_data": ' + '{"a": ' * 5000 + "1" + "}" * 5000 + "}"
+    assert parse_participant_metadata(deep, MetadataLimits(max_bytes=len(deep))).errors, "deep nesting"
+    print(f"malformed metadata: {len(MALFORMED_MINUTES) + 1} cases fall back to the defaults")
+
+
+def timed(fn, payloads, *args) -> float:
+    started = time.perf_counter()
+    for raw in payloads:
+        fn(raw, *args)
+    return (time.perf_counter() - started) / len(payloads)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="4,16,48,200", help="comma-separated resume sizes in KB")
+    parser.add_argument("--sessions", type=int, default=200, help="distinct candidates per size")
+    args = parser.parse_args()
+
+    log_sink = io.StringIO()
+    handler = logging.StreamHandler(log_sink)
+    bench_logger = logging.getLogger("bench-metadata")
+    bench_logger.addHandler(handler)
+    bench_logger.setLevel(logging.INFO)
+    bench_logger.propagate = False
+    limits = MetadataLimits()
+    rng = random.Random(7)
+    check_malformed(limits)
+
+    print(f"{'size':>6} {'legacy us':>10} {'cold us':>10} {'cached us':>10} {'legacy log B':>13} {'new log B':>10} "
+          f"{'legacy prompt ch':>17} {'new prompt ch':>14}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        payloads = [synthetic_metadata(size, rng) for _ in range(args.sessions)]
+
+        log_sink.seek(0)
+        log_sink.truncate()
+        legacy_us = timed(legacy_ingest, payloads, bench_logger) * 1e6
+        legacy_log = log_sink.tell() / len(payloads)
+        legacy_prompt = len(legacy_ingest(payloads[0], bench_logger))
+
+        clear_cache()
+        log_sink.seek(0)
+        log_sink.truncate()
+        cold_us = timed(new_ingest, payloads, bench_logger, limits) * 1e6
+        new_log = log_sink.tell() / len(payloads)
+        # Same candidates again: resumes are served from the content-hash cache
+        cached_us = timed(new_ingest, payloads, bench_logger, limits) * 1e6
+        new_prompt = len(new_ingest(payloads[0], bench_logger, limits))
+
+        print(f"{size:>4}KB {legacy_us:>10.1f} {cold_us:>10.1f} {cached_us:>10.1f} {legacy_log:>13.0f} {new_log:>10.0f} "
+              f"{legacy_prompt:>17} {new_prompt:>14}")
+    print(f"metadata over {limits.max_bytes} bytes is rejected before parsing (prompt falls back to no resume)")
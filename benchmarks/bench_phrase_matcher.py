@@ -0,0 +1,94 @@
+"""Compare PhraseMatcher against the previous per-turn list scan.
+
+Replays synthetic interview turns as on_transcript sees them: one committed
+transcript per candidate turn.
+
+    python benchmarks/bench_phrase_matcher.py --utterances 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from phrases import PhraseMatcher, load_phrase_config
+
+PHRASES = load_phrase_config()
+LEGACY_STRONG, LEGACY_WEAK = PHRASES["strong"], PHRASES["weak"]
+
+ANSWERS = [
+    "I spent five years building data pipelines for a logistics company",
+    "The biggest challenge was migrating our monolith to services without downtime",
+    "I usually handle disagreements by getting the data on the table first",
+    "My manager would probably say I take on too much at once",
+    "We shipped the feature two weeks early and cut support tickets by half",
+    "I'm looking for a team where I can own the backend architecture",
+    "I have been leading a group of four engineers for the last two years",
+    "At the time we did not have any monitoring so I set up alerting from scratch",
+    "I think my strongest skill is breaking down ambiguous problems",
+    "I need to check, but I believe the project is still running in production",
+]
+
+ENDINGS = [
+    "Honestly I think that's all I have on that topic",
+    "Thank you for your time, I appreciate the opportunity",
+    "When will I hear back about the next steps",
+    "Sorry, I really need to go, I have another appointment",
+]
+
+# Share of utterances that contain an end-of-conversation phrase
+ENDING_RATE = 0.05
+
+
+def legacy_scan(text: str):
+    """The list scan on_transcript performed before PhraseMatcher, lists rebuilt per turn."""
+    lower_text = text.lower()
+    user_goodbye_indicators = list(LEGACY_WEAK)
+    strong_ending_phrases = list(LEGACY_STRONG)
+    strong_match = any(phrase in lower_text for phrase in strong_ending_phrases)
+    weak_match = any(indicator in lower_text for indicator in user_goodbye_indicators)
+    return strong_match, weak_match
+
+
+def committed_turns(utterances: int, seed: int = 7):
+    """Yield the committed transcript of each candidate turn."""
+    rng = random.Random(seed)
+    for _ in range(utterances):
+        sentence = " ".join(rng.choice(ANSWERS) for _ in range(rng.randint(1, 3)))
+        if rng.random() < ENDING_RATE:
+            sentence += " " + rng.choice(ENDINGS)
+        yield sentence
+
+
+def bench(fn, texts):
+    started = time.perf_counter()
+    for text in texts:
+        fn(text)
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--utterances", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    matcher = PhraseMatcher(PHRASES)
+
+    texts = list(committed_turns(args.utterances))
+    legacy = min(bench(legacy_scan, texts) for _ in range(args.repeat))
+    compiled = min(bench(matcher.match, texts) for _ in range(args.repeat))
+    n = len(texts)
+    print(f"turns={n}, avg chars={sum(map(len, texts)) / n:.0f}")
+    print(f"legacy list scan:   {legacy / n * 1e6:.2f} us/turn")
+    print(f"PhraseMatcher:      {compiled / n * 1e6:.2f} us/turn ({legacy / compiled:.1f}x)")
+
+    # Word-boundary differences are intentional ("finish" no longer matches "finished")
+    disagreements = 0
+    for text in texts:
+        match = matcher.match(text)
+        if legacy_scan(text)[0] != (match is not None and match.strength == "strong"):
+            disagreements += 1
+    print(f"strong-match disagreements (legacy vs compiled): {disagreements}")
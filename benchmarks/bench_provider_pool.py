@@ -0,0 +1,185 @@
+"""Exercise ProviderPool's LLM routing against two local OpenAI-compatible mock servers.
+
+The primary server answers with --fast-ttft, then for --spike requests it
+either slows to --slow-ttft (--failure slow), answers HTTP 500 (error) or
+stalls past the client's read timeout (stall), then recovers; the fallback
+always answers with --fallback-ttft. Requests run back to back with
+--think-time between them, like turns of an interview. Reports the time to
+first token seen by the caller and the failed requests per phase, how many
+requests went to the fallback, and how many TCP connections the servers
+accepted for how many requests (connection reuse). Run once with
+--no-fallback for the single-provider baseline.
+
+    python benchmarks/bench_provider_pool.py --requests 60 --spike 20
+    python benchmarks/bench_provider_pool.py --requests 60 --spike 20 --failure error
+    python benchmarks/bench_provider_pool.py --requests 30 --spike 10 --failure stall
+    python benchmarks/bench_provider_pool.py --requests 60 --spike 20 --no-fallback
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("METRICS_DIR", tempfile.mkdtemp(prefix="bench-provider-pool-metrics-"))
+
+from livekit.agents import APIConnectOptions, APIError, llm
+
+from providers import ProviderConfig, ProviderLatency, ProviderPool
+from telemetry import get_process_metrics
+
+
+# Longer than the pool's 5s httpx read timeout
+STALL_SECONDS = 30.0
+
+
+class MockOpenAI:
+    """Streams a fixed chat completion after a configurable delay and counts connections."""
+
+    def __init__(self, name: str, ttft: float) -> None:
+        self.name = name
+        self.ttft = ttft
+        # None, "error" (HTTP 500) or "stall" (no response within STALL_SECONDS)
+        self.failure = None
+        self.requests = 0
+        self._transports = set()
+        self._runner = None
+        self.url = ""
+
+    @property
+    def connections(self) -> int:
+        return len(self._transports)
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._chat)
+        app.router.add_route("HEAD", "/v1/", self._head)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/v1/"
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
+
+    async def _head(self, request: web.Request) -> web.Response:
+        self._transports.add(request.transport.get_extra_info("peername"))
+        return web.Response(status=404)
+
+    async def _chat(self, request: web.Request) -> web.StreamResponse:
+        self._transports.add(request.transport.get_extra_info("peername"))
+        self.requests += 1
+        body = await request.json()
+        if self.failure == "error":
+            return web.json_response({"error": {"message": "mock outage", "type": "server_error"}}, status=500)
+        if self.failure == "stall":
+            await asyncio.sleep(STALL_SECONDS)
+            # The client gave up long ago
+            return web.Response(status=504)
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await asyncio.sleep(self.ttft)
+        for word in ["That", " sounds", " great,", " tell", " me", " more."]:
+            await response.write(self._event({"choices": [{"index": 0, "delta": {"role": "assistant", "content": word}, "finish_reason": None}]}, body))
+            await asyncio.sleep(0.01)
+        await response.write(self._event({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}, body))
+        await response.write(self._event({"choices": [], "usage": {"prompt_tokens": 900, "completion_tokens": 6, "total_tokens": 906}}, body))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    def _event(self, chunk: dict, body: dict) -> bytes:
+        chunk = dict(chunk, id=f"chatcmpl-{self.name}-{self.requests}", object="chat.completion.chunk", created=0, model=body["model"])
+        return f"data: {json.dumps(chunk)}\n\n".encode()
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+async def main(args) -> None:
+    primary = MockOpenAI("primary", args.fast_ttft)
+    fallback = MockOpenAI("fallback", args.fallback_ttft)
+    await primary.start()
+    await fallback.start()
+    os.environ["OPENAI_BASE_URL"] = primary.url
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+
+    config = ProviderConfig(
+        llm_fallback_model=None if args.no_fallback else "mock-fallback",
+        llm_fallback_base_url=fallback.url,
+        llm_fallback_api_key="mock",
+        llm_ttft_threshold=args.threshold,
+    )
+    pool = ProviderPool(config, get_process_metrics(), ProviderLatency(window=args.window, min_samples=args.min_samples))
+    await pool.preconnect(speech=False)
+    preconnects = primary.connections + fallback.connections
+    model = pool.create_llm()
+    chat_ctx = llm.ChatContext().append(role="system", text="You are an interviewer.").append(role="user", text="Hi!")
+
+    # One attempt per request, so a failure shows up as one failed turn
+    conn_options = APIConnectOptions(max_retry=0)
+    phases: Dict[str, List[float]] = {"before": [], "spike": [], "after": []}
+    failed: Dict[str, int] = {phase: 0 for phase in phases}
+    spike_start = (args.requests - args.spike) // 2
+    for i in range(args.requests):
+        phase = "before" if i < spike_start else "spike" if i < spike_start + args.spike else "after"
+        in_spike = phase == "spike"
+        primary.ttft = args.slow_ttft if in_spike and args.failure == "slow" else args.fast_ttft
+        primary.failure = args.failure if in_spike and args.failure != "slow" else None
+        started = time.perf_counter()
+        first_token = None
+        try:
+            async with model.chat(chat_ctx=chat_ctx, conn_options=conn_options) as stream:
+                async for chunk in stream:
+                    if first_token is None and chunk.choices and chunk.choices[0].delta.content:
+                        first_token = time.perf_counter() - started
+        except APIError:
+            failed[phase] += 1
+        if first_token is not None:
+            phases[phase].append(first_token)
+        # Lets the stream's metrics reach the router before the next pick
+        await asyncio.sleep(args.think_time)
+
+    incident = f"{args.fast_ttft}s -> {args.slow_ttft}s" if args.failure == "slow" else args.failure
+    print(f"requests={args.requests} spike={args.spike} ({incident}), fallback={'off' if args.no_fallback else f'{args.fallback_ttft}s'}")
+    for phase, values in phases.items():
+        print(
+            f"  {phase:>6}: n={len(values)} failed={failed[phase]} "
+            f"ttft p50={percentile(values, 50) * 1000:.0f}ms p95={percentile(values, 95) * 1000:.0f}ms"
+        )
+    print(f"routed: primary={primary.requests} fallback={fallback.requests}; {pool.describe()}")
+    requests = primary.requests + fallback.requests
+    connections = primary.connections + fallback.connections
+    print(f"connections: {connections} TCP connections ({preconnects} opened by preconnect) for {requests} requests")
+
+    await model.aclose()
+    await pool.aclose()
+    await primary.stop()
+    await fallback.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--spike", type=int, default=20, help="requests during which the primary is slow or failing")
+    parser.add_argument("--failure", choices=["slow", "error", "stall"], default="slow", help="how the primary misbehaves during the spike")
+    parser.add_argument("--fast-ttft", type=float, default=0.2)
+    parser.add_argument("--slow-ttft", type=float, default=2.5)
+    parser.add_argument("--fallback-ttft", type=float, default=0.4)
+    parser.add_argument("--threshold", type=float, default=1.5, help="p95 TTFT above which requests fail over (s)")
+    parser.add_argument("--window", type=float, default=10, help="latency window (s); shorter than production to see recovery")
+    parser.add_argument("--min-samples", type=int, default=3)
+    parser.add_argument("--think-time", type=float, default=0.05)
+    parser.add_argument("--no-fallback", action="store_true", help="single provider baseline")
+    args = parser.parse_args()
+    asyncio.run(main(args))
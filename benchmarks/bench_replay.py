@@ -0,0 +1,434 @@
+"""Replay N concurrent simulated interviews through agent.entrypoint in one process.
+
+Each interview gets a fake JobContext and room whose candidate publishes real
+microphone/camera tracks (a recorded WAV and image, or synthetic media) plus
+participant metadata. STT, LLM and TTS are deterministic local stubs with
+configurable latencies, so the numbers isolate this process's own overhead:
+per-turn latency breakdown, event-loop lag, CPU and memory.
+
+    python benchmarks/bench_replay.py --sessions 4 --turns 5
+    python benchmarks/bench_replay.py --sessions 8 --audio answer.wav --video face.jpg --vad silero
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+import psutil
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# Keep the benchmark's metrics snapshots away from a locally running worker's
+os.environ.setdefault("METRICS_DIR", tempfile.mkdtemp(prefix="bench-replay-metrics-"))
+
+from livekit.agents import metrics
+from livekit.agents.pipeline import VoicePipelineAgent
+
+import agent as app
+from replay_fakes import (
+    AUDIO_SAMPLE_RATE,
+    WORDS_PER_SECOND,
+    CandidateMedia,
+    CandidateScript,
+    EnergyVAD,
+    FakeJobContext,
+    FakeJobProcess,
+    FakeProviderPool,
+    FakeRemoteParticipant,
+    FakeRoom,
+    Latencies,
+    StubLLM,
+    StubSTT,
+    StubTTS,
+    camera_frames,
+    load_wav,
+    synthetic_speech,
+)
+
+ANSWERS = [
+    "I spent five years building data pipelines for a logistics company",
+    "The biggest challenge was migrating our monolith to services without downtime",
+    "I usually handle disagreements by getting the data on the table first",
+    "We shipped the feature two weeks early and cut support tickets by half",
+    "I'm looking for a team where I can own the backend architecture",
+    "At the time we did not have any monitoring so I set up alerting from scratch",
+    # Figures of speech that must not count as visual cues, then an explicit one
+    "I saw the error rate drop once the team started to watch the dashboards closely",
+    "I'm holding up the architecture diagram now, can you see it on my camera",
+]
+# A strong end phrase, so the agent says goodbye and disconnects
+GOODBYE = "That's all I have, thank you for interviewing me"
+
+METADATA = {
+    "resume_data": {
+        "name": "Jordan Example",
+        "experience": "7 years in backend engineering",
+        "skills": ["Python", "Go", "PostgreSQL", "Kubernetes"],
+    },
+    "questions": [
+        "Tell me about a system you designed end to end.",
+        "How do you handle production incidents?",
+    ],
+    "max_interview_minutes": 10,
+    "job_context": "Senior backend engineer, platform team",
+}
+
+# Each simulated interview runs in its own task; provider factories read it from here
+current_session: contextvars.ContextVar["Session"] = contextvars.ContextVar("current_session")
+
+TURN_FIELDS = ("stt_delay", "eou_delay", "before_llm_cb", "llm_ttft", "tts_ttfb", "end_to_end")
+
+
+class TurnRecorder:
+    """Per-turn latency breakdown, joined on the pipeline's sequence_id."""
+
+    def __init__(self) -> None:
+        self.turns: Dict[str, Dict[str, float]] = {}
+        self.end_to_end: List[float] = []
+        self.before_llm: List[float] = []
+        self._user_stopped: Optional[float] = None
+
+    def on_metrics(self, m: metrics.AgentMetrics) -> None:
+        if isinstance(m, metrics.PipelineEOUMetrics):
+            turn = self.turns.setdefault(m.sequence_id, {})
+            turn["stt_delay"] = m.transcription_delay
+            turn["eou_delay"] = m.end_of_utterance_delay
+        elif isinstance(m, metrics.PipelineLLMMetrics) and m.sequence_id in self.turns:
+            self.turns[m.sequence_id]["llm_ttft"] = m.ttft
+        elif isinstance(m, metrics.PipelineTTSMetrics) and m.sequence_id in self.turns:
+            self.turns[m.sequence_id].setdefault("tts_ttfb", m.ttfb)
+
+    def on_user_stopped(self) -> None:
+        self._user_stopped = time.perf_counter()
+
+    def on_agent_started(self) -> None:
+        if self._user_stopped is not None:
+            self.end_to_end.append(time.perf_counter() - self._user_stopped)
+            self._user_stopped = None
+
+    def values(self, name: str) -> List[float]:
+        if name == "end_to_end":
+            return self.end_to_end
+        if name == "before_llm_cb":
+            return self.before_llm
+        return [t[name] for t in self.turns.values() if t.get(name, -1) >= 0]
+
+
+@dataclass
+class Session:
+    index: int
+    script: CandidateScript
+    room: FakeRoom
+    ctx: FakeJobContext
+    media: CandidateMedia
+    recorder: TurnRecorder = field(default_factory=TurnRecorder)
+    agent: Optional[VoicePipelineAgent] = None
+    agent_replies: int = 0
+    agent_reply: asyncio.Event = field(default_factory=asyncio.Event)
+    started: float = 0.0
+    first_audio: Optional[float] = None
+    ended_by_goodbye: bool = False
+    vision_scheduler: Optional[app.VisionScheduler] = None
+
+
+class RecordingPipelineAgent(VoicePipelineAgent):
+    """VoicePipelineAgent that reports its turns and before_llm_cb timing to the current session."""
+
+    def __init__(self, *args, before_llm_cb=None, **kwargs) -> None:
+        session = current_session.get()
+
+        async def timed_before_llm_cb(assistant, chat_ctx):
+            started = time.perf_counter()
+            try:
+                return await before_llm_cb(assistant, chat_ctx)
+            finally:
+                session.recorder.before_llm.append(time.perf_counter() - started)
+
+        super().__init__(*args, before_llm_cb=timed_before_llm_cb, **kwargs)
+        session.agent = self
+
+        def on_agent_started() -> None:
+            if session.first_audio is None:
+                session.first_audio = time.perf_counter() - session.started
+            session.recorder.on_agent_started()
+
+        def on_agent_stopped() -> None:
+            session.agent_replies += 1
+            session.agent_reply.set()
+
+        self.on("metrics_collected", session.recorder.on_metrics)
+        self.on("user_stopped_speaking", session.recorder.on_user_stopped)
+        self.on("agent_started_speaking", on_agent_started)
+        self.on("agent_stopped_speaking", on_agent_stopped)
+
+    def start(self, room, participant=None) -> None:
+        # The fake candidate is not an rtc.RemoteParticipant; start() also links a participant by identity
+        if isinstance(participant, FakeRemoteParticipant):
+            participant = participant.identity
+        super().start(room, participant)
+
+
+class RecordingVisionScheduler(app.VisionScheduler):
+    """VisionScheduler that counts every decision by reason, including frames later found unchanged."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.decisions: Dict[str, int] = {}
+        current_session.get().vision_scheduler = self
+
+    def decide(self, scene, transcript: str = "") -> Optional[str]:
+        reason = super().decide(scene, transcript)
+        key = reason or "none"
+        self.decisions[key] = self.decisions.get(key, 0) + 1
+        return reason
+
+
+def install_stubs(latencies: Latencies) -> None:
+    """Point agent.py's provider factories at the local stubs."""
+    app.create_stt = lambda providers: StubSTT(current_session.get().script, latencies)
+    app.create_llm = lambda providers: StubLLM(latencies)
+    app.create_summary_llm = lambda providers: StubLLM(latencies)
+
+    def create_tts(proc, providers):
+        engine = StubTTS(latencies)
+        if app.TTS_CACHE_ENABLED:
+            engine = app.CachedTTS(engine, proc.userdata["tts_cache"], "stub")
+        return engine
+
+    app.create_tts = create_tts
+    app.ProviderPool = FakeProviderPool
+    app.VoicePipelineAgent = RecordingPipelineAgent
+    app.VisionScheduler = RecordingVisionScheduler
+
+
+async def wait_for_reply(session: Session, replies_before: int, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while session.agent_replies <= replies_before:
+        session.agent_reply.clear()
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            raise asyncio.TimeoutError
+        await asyncio.wait_for(session.agent_reply.wait(), timeout=remaining)
+
+
+async def run_candidate(session: Session, args, recording: Optional[np.ndarray], rng: np.random.Generator) -> None:
+    cursor = 0
+
+    def speech_for(text: str) -> np.ndarray:
+        nonlocal cursor
+        n = int(len(text.split()) / WORDS_PER_SECOND * AUDIO_SAMPLE_RATE)
+        if recording is None:
+            return synthetic_speech(n / AUDIO_SAMPLE_RATE, rng)
+        chunk = np.resize(np.roll(recording, -cursor), n)
+        cursor = (cursor + n) % len(recording)
+        return chunk
+
+    # Wait for the greeting to finish before answering
+    await wait_for_reply(session, 0, args.reply_timeout)
+    for turn in range(args.turns + 1):
+        text = GOODBYE if turn == args.turns else session.script.answers[turn % len(session.script.answers)]
+        await asyncio.sleep(args.think_time)
+        session.script.current_text = text
+        replies = session.agent_replies
+        await session.media.say(speech_for(text))
+        if turn == args.turns:
+            break
+        try:
+            await wait_for_reply(session, replies, args.reply_timeout)
+        except asyncio.TimeoutError:
+            print(f"session {session.index}: no reply to turn {turn} within {args.reply_timeout:.0f}s")
+
+    try:
+        await asyncio.wait_for(session.room.disconnected.wait(), timeout=args.reply_timeout)
+        session.ended_by_goodbye = True
+    except asyncio.TimeoutError:
+        await session.room.disconnect()
+
+
+async def run_session(index: int, proc: FakeJobProcess, args, frames, recording, latencies: Latencies) -> Session:
+    metadata = dict(METADATA, silence_timeout_seconds=args.silence_timeout)
+    candidate = FakeRemoteParticipant(f"candidate-{index}", json.dumps(metadata))
+    media = CandidateMedia.create(args.width, args.height)
+    for publication in media.publications:
+        candidate.add_publication(publication)
+    room = FakeRoom(f"bench-{index}", candidate)
+    ctx = FakeJobContext(room, proc)
+    session = Session(index, CandidateScript(list(ANSWERS)), room, ctx, media)
+    current_session.set(session)
+
+    def on_agent_track_published() -> None:
+        # In a real room the candidate's tracks are subscribed around the time the agent publishes
+        for publication in media.publications:
+            room.emit("track_subscribed", publication.track, publication, candidate)
+
+    room.local_participant.on_track_published = on_agent_track_published
+
+    stop = asyncio.Event()
+    media_tasks = [
+        asyncio.create_task(media.run_microphone(stop)),
+        asyncio.create_task(media.run_camera(frames, args.fps, stop)),
+    ]
+    try:
+        session.started = time.perf_counter()
+        await app.entrypoint(ctx)
+        await run_candidate(session, args, recording, np.random.default_rng(index))
+    finally:
+        await ctx.run_shutdown_callbacks()
+        if session.agent is not None:
+            await session.agent.aclose()
+        stop.set()
+        await asyncio.gather(*media_tasks, return_exceptions=True)
+        await media.aclose()
+    return session
+
+
+class ResourceSampler:
+    """Samples event-loop lag every 10 ms and RSS every 250 ms while sessions run."""
+
+    TICK = 0.01
+
+    def __init__(self) -> None:
+        self.lags: List[float] = []
+        self.rss: List[int] = []
+        self._process = psutil.Process()
+        self._stop = asyncio.Event()
+
+    async def run(self) -> None:
+        ticks = 0
+        while not self._stop.is_set():
+            expected = time.perf_counter() + self.TICK
+            await asyncio.sleep(self.TICK)
+            self.lags.append(max(0.0, time.perf_counter() - expected))
+            ticks += 1
+            if ticks % 25 == 0:
+                self.rss.append(self._process.memory_info().rss)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def summarize(name: str, values: List[float], scale: float = 1000, unit: str = "ms") -> str:
+    if not values:
+        return f"  {name:<16} n=0"
+    return (
+        f"  {name:<16} n={len(values):<4} p50={percentile(values, 50) * scale:8.1f}{unit} "
+        f"p95={percentile(values, 95) * scale:8.1f}{unit} max={max(values) * scale:8.1f}{unit}"
+    )
+
+
+async def main(args) -> None:
+    latencies = Latencies(
+        stt_final=args.stt_latency,
+        llm_ttft=args.llm_ttft,
+        llm_tokens_per_second=args.llm_tps,
+        tts_ttfb=args.tts_ttfb,
+    )
+    process = psutil.Process()
+
+    prewarm_started = time.perf_counter()
+    proc = FakeJobProcess()
+    app.prewarm(proc)
+    prewarm_seconds = time.perf_counter() - prewarm_started
+    if args.vad == "energy":
+        proc.userdata["vad"] = EnergyVAD()
+    # No worker inference process or Krisp filter offline; the pipeline falls back to endpointing delays
+    proc.userdata["turn_detector"] = None
+    proc.userdata["noise_cancellation"] = None
+    install_stubs(latencies)
+
+    frames = camera_frames(args.width, args.height, 30, args.video)
+    recording = load_wav(args.audio) if args.audio else None
+    rss_before = process.memory_info().rss
+
+    sampler = ResourceSampler()
+    sampler_task = asyncio.create_task(sampler.run())
+    cpu_before, wall_before = time.process_time(), time.perf_counter()
+    sessions = await asyncio.gather(
+        *(run_session(i, proc, args, frames, recording, latencies) for i in range(args.sessions)),
+        return_exceptions=True,
+    )
+    cpu_seconds, wall_seconds = time.process_time() - cpu_before, time.perf_counter() - wall_before
+    sampler.stop()
+    await sampler_task
+
+    failed = [s for s in sessions if isinstance(s, BaseException)]
+    sessions = [s for s in sessions if not isinstance(s, BaseException)]
+    for error in failed:
+        print(f"session failed: {error!r}")
+
+    peak_rss = max(sampler.rss, default=rss_before)
+    print(
+        f"sessions={args.sessions} ({len(failed)} failed) turns={args.turns} vad={args.vad} "
+        f"latencies: stt={latencies.stt_final}s llm_ttft={latencies.llm_ttft}s tts_ttfb={latencies.tts_ttfb}s"
+    )
+    print(f"prewarm {prewarm_seconds:.2f}s, wall {wall_seconds:.1f}s, ended by goodbye: {sum(s.ended_by_goodbye for s in sessions)}/{len(sessions)}")
+    print("per-turn latency:")
+    for name in TURN_FIELDS:
+        print(summarize(name, [v for s in sessions for v in s.recorder.values(name)]))
+    print(summarize("start_to_greeting", [s.first_audio for s in sessions if s.first_audio is not None]))
+    counters = app.get_process_metrics().snapshot()["counters"]
+    print(
+        "speculative replies: "
+        + ", ".join(
+            f"{name}={counters[f'intervita_speculative_{name}_total']:.0f}"
+            for name in ("hits", "misses", "cancels", "timeouts", "wasted_tokens")
+        )
+    )
+    decisions: Dict[str, int] = {}
+    attached: Dict[str, int] = {}
+    schedulers = [s.vision_scheduler for s in sessions if s.vision_scheduler is not None]
+    for scheduler in schedulers:
+        for reason, count in scheduler.decisions.items():
+            decisions[reason] = decisions.get(reason, 0) + count
+        for reason, count in scheduler.stats.attached.items():
+            attached[reason] = attached.get(reason, 0) + count
+    reasons = ("first", "changed", "interval", "visual_cue")
+    print("vision decisions by reason: " + ", ".join(f"{r}={decisions.get(r, 0)}" for r in reasons + ("none",)))
+    print(
+        "vision frames attached by reason: " + ", ".join(f"{r}={attached.get(r, 0)}" for r in reasons)
+        + f", skipped={sum(s.stats.skipped for s in schedulers)}"
+    )
+    print("event loop:")
+    print(summarize("lag", sampler.lags))
+    print("resources:")
+    print(f"  cpu              {cpu_seconds / wall_seconds:.2f} cores avg ({cpu_seconds:.1f}s cpu)")
+    print(
+        f"  rss              before {rss_before / 2**20:.0f} MiB, peak {peak_rss / 2**20:.0f} MiB, "
+        f"{(peak_rss - rss_before) / max(1, args.sessions) / 2**20:.1f} MiB/session"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent simulated interviews")
+    parser.add_argument("--turns", type=int, default=4, help="candidate answers before saying goodbye")
+    parser.add_argument("--audio", help="16-bit WAV of recorded speech used for candidate answers")
+    parser.add_argument("--video", help="image used as the candidate's camera feed")
+    parser.add_argument("--vad", choices=("energy", "silero"), default="energy",
+                        help="silero needs real speech (--audio); energy works with synthetic audio")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=float, default=15)
+    parser.add_argument("--think-time", type=float, default=0.8, help="pause before each answer (s)")
+    parser.add_argument("--reply-timeout", type=float, default=30)
+    parser.add_argument("--silence-timeout", type=float, default=120)
+    parser.add_argument("--stt-latency", type=float, default=Latencies.stt_final)
+    parser.add_argument("--llm-ttft", type=float, default=Latencies.llm_ttft)
+    parser.add_argument("--llm-tps", type=float, default=Latencies.llm_tokens_per_second)
+    parser.add_argument("--tts-ttfb", type=float, default=Latencies.tts_ttfb)
+    parser.add_argument("--verbose", action="store_true", help="show the agent's own logs")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    asyncio.run(main(args))
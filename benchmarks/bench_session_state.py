@@ -0,0 +1,133 @@
+"""Load-test get_session_state and the coalescing session state push channel.
+
+Simulates N rooms in one event loop. Each room flips the speaking flags and
+commits turns at --event-rate, while one client polls get_session_state at
+--poll-rate and another subscribes to pushes. Reports payload sizes, RPC
+handling time, pushes vs raw state changes, and event-loop lag.
+
+    python benchmarks/bench_session_state.py --rooms 50 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("METRICS_DIR", tempfile.mkdtemp(prefix="bench-session-state-metrics-"))
+
+from session_state import SessionState, SessionStatePublisher
+from telemetry import get_process_metrics
+
+
+class _LocalParticipant:
+    def __init__(self) -> None:
+        self.messages = 0
+        self.bytes = 0
+
+    async def publish_data(self, payload, **kwargs) -> None:
+        self.messages += 1
+        self.bytes += len(payload)
+
+
+class _Room:
+    def __init__(self) -> None:
+        self.local_participant = _LocalParticipant()
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+async def drive_events(state: SessionState, rate: float, deadline: float, rng: random.Random) -> None:
+    while time.monotonic() < deadline:
+        await asyncio.sleep(rng.expovariate(rate))
+        kind = rng.random()
+        if kind < 0.4:
+            state.update(user_speaking=not state.user_speaking)
+        elif kind < 0.8:
+            state.update(agent_speaking=not state.agent_speaking)
+        else:
+            state.add_turn()
+
+
+async def poll(state: SessionState, rate: float, deadline: float, timings: List[float], sizes: List[int]) -> None:
+    while time.monotonic() < deadline:
+        await asyncio.sleep(1 / rate)
+        started = time.perf_counter()
+        payload = state.rpc_payload()
+        timings.append(time.perf_counter() - started)
+        sizes.append(len(payload.encode()))
+
+
+async def measure_lag(deadline: float, lags: List[float]) -> None:
+    while time.monotonic() < deadline:
+        expected = time.perf_counter() + 0.01
+        await asyncio.sleep(0.01)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def main(args) -> None:
+    process_metrics = get_process_metrics()
+    rng = random.Random(3)
+    deadline = time.monotonic() + args.seconds
+    timings: List[float] = []
+    sizes: List[int] = []
+    lags: List[float] = []
+    rooms, states, publishers = [], [], []
+    for i in range(args.rooms):
+        room = _Room()
+        state = SessionState(started_at=time.time(), max_interview_minutes=15)
+        publisher = SessionStatePublisher(room, state, process_metrics, min_interval=args.min_interval)
+        publisher.subscribe(f"candidate-{i}")
+        rooms.append(room)
+        states.append(state)
+        publishers.append(publisher)
+
+    cpu_before = time.process_time()
+    await asyncio.gather(
+        measure_lag(deadline, lags),
+        *(drive_events(state, args.event_rate, deadline, rng) for state in states),
+        *(poll(state, args.poll_rate, deadline, timings, sizes) for state in states),
+    )
+    cpu_seconds = time.process_time() - cpu_before
+    for publisher in publishers:
+        publisher.close()
+    await asyncio.sleep(0.1)
+
+    changes = sum(state.version for state in states)
+    pushes = sum(room.local_participant.messages for room in rooms)
+    push_bytes = sum(room.local_participant.bytes for room in rooms)
+    print(f"rooms={args.rooms} seconds={args.seconds} event_rate={args.event_rate}/s poll_rate={args.poll_rate}/s")
+    print(
+        f"get_session_state: n={len(timings)} p50={percentile(timings, 50) * 1e6:.1f}us "
+        f"p99={percentile(timings, 99) * 1e6:.1f}us max={max(timings, default=0) * 1e6:.1f}us, "
+        f"payload {min(sizes, default=0)}-{max(sizes, default=0)} bytes"
+    )
+    print(
+        f"push: {changes} state changes -> {pushes} pushes ({pushes / max(1, changes):.1%}), "
+        f"{push_bytes / max(1, pushes):.0f} bytes/push, {push_bytes / args.rooms / args.seconds:.0f} B/s per room"
+    )
+    print(
+        f"polling the same state at {args.poll_rate}/s would cost {sum(sizes) / args.rooms / args.seconds:.0f} B/s per room "
+        f"plus an RPC round trip per call"
+    )
+    print(
+        f"loop: lag p99={percentile(lags, 99) * 1000:.2f}ms max={max(lags, default=0) * 1000:.2f}ms, "
+        f"cpu {cpu_seconds / args.seconds:.2f} cores"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--event-rate", type=float, default=20, help="state changes per second per room")
+    parser.add_argument("--poll-rate", type=float, default=2, help="get_session_state calls per second per room")
+    parser.add_argument("--min-interval", type=float, default=0.5, help="push coalescing window (s)")
+    args = parser.parse_args()
+    asyncio.run(main(args))
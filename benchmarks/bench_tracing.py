@@ -0,0 +1,167 @@
+"""Measure the cost of per-session tracing: per event, per export, and as a share of loop time.
+
+micro: ns per SessionTrace.record() / on_metrics() call and the cost of
+building the waterfall and writing the JSONL for a long session.
+replay: runs simulated interviews through agent.entrypoint (see
+bench_replay.py) with a SessionTrace that clocks its own calls, and reports
+that time against the process CPU spent on the sessions. The target is < 1%.
+
+    python benchmarks/bench_tracing.py --events 200000
+    python benchmarks/bench_tracing.py --replay --sessions 4 --replay-turns 5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from livekit.agents import metrics
+
+from tracing import SessionTrace
+
+# Per turn: speech start/end, EOU, frame, LLM request/first token, TTS, agent speech, transcript
+EVENTS_PER_TURN = 9
+
+
+def pipeline_metrics(sequence_id: str):
+    now = time.time()
+    return (
+        metrics.PipelineEOUMetrics(sequence_id=sequence_id, timestamp=now, end_of_utterance_delay=0.6, transcription_delay=0.1),
+        metrics.PipelineLLMMetrics(
+            sequence_id=sequence_id, request_id="r", timestamp=now + 1.0, ttft=0.4, duration=1.0, label="llm",
+            cancelled=False, completion_tokens=40, prompt_tokens=900, total_tokens=940, tokens_per_second=60.0,
+            error=None,
+        ),
+        metrics.PipelineTTSMetrics(
+            sequence_id=sequence_id, request_id="r", timestamp=now + 1.5, ttfb=0.2, duration=1.0, audio_duration=3.0,
+            cancelled=False, characters_count=120, label="tts", streamed=True, error=None,
+        ),
+    )
+
+
+def simulate_turn(trace: SessionTrace, sequence_id: str, agent_metrics) -> None:
+    trace.record("user_speech_start")
+    trace.record("user_speech_end")
+    trace.record("frame_capture", sequence_id, duration=0.004)
+    trace.record("llm_request", sequence_id)
+    for m in agent_metrics:
+        trace.on_metrics(m)
+    trace.record("transcript_committed")
+    trace.record("agent_speech_start")
+
+
+def micro(args) -> None:
+    trace = SessionTrace("bench", "bench-room", capacity=args.capacity)
+    started = time.perf_counter_ns()
+    for _ in range(args.events):
+        trace.record("llm_request")
+    record_ns = (time.perf_counter_ns() - started) / args.events
+
+    turn_metrics = [pipeline_metrics(f"seq-{i}") for i in range(args.events // EVENTS_PER_TURN)]
+    trace = SessionTrace("bench", "bench-room", capacity=args.capacity)
+    started = time.perf_counter_ns()
+    for i, agent_metrics in enumerate(turn_metrics):
+        simulate_turn(trace, f"seq-{i}", agent_metrics)
+    turn_us = (time.perf_counter_ns() - started) / len(turn_metrics) / 1000
+
+    with tempfile.TemporaryDirectory() as directory:
+        session = SessionTrace("bench", "bench-room", capacity=args.capacity, directory=directory)
+        for i, agent_metrics in enumerate(turn_metrics[: args.turns]):
+            simulate_turn(session, f"seq-{i}", agent_metrics)
+        started = time.perf_counter()
+        waterfalls = session.waterfalls()
+        waterfall_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        path = session._write_jsonl(session.events())
+        export_ms = (time.perf_counter() - started) * 1000
+        size = os.path.getsize(path)
+
+    buffer_kib = args.capacity * (8 + 8 + 1 + 4) / 1024
+    print(f"record(): {record_ns:.0f} ns/event; one traced turn ({EVENTS_PER_TURN} events incl. metrics): {turn_us:.1f} us")
+    print(f"buffer: {args.capacity} events preallocated ({buffer_kib:.0f} KiB)")
+    print(
+        f"{args.turns}-turn session: waterfall {waterfall_ms:.2f} ms ({len(waterfalls)} turns), "
+        f"JSONL export {export_ms:.2f} ms, {size / 1024:.1f} KiB"
+    )
+
+
+class ClockedSessionTrace(SessionTrace):
+    """SessionTrace that adds the time spent in its own hot-path calls to a shared total."""
+
+    spent = 0.0
+    _depth = 0
+
+    def record(self, *args, **kwargs) -> None:
+        ClockedSessionTrace._depth += 1
+        started = time.perf_counter()
+        try:
+            super().record(*args, **kwargs)
+        finally:
+            ClockedSessionTrace._depth -= 1
+            if ClockedSessionTrace._depth == 0:
+                ClockedSessionTrace.spent += time.perf_counter() - started
+
+    def on_metrics(self, agent_metrics) -> None:
+        ClockedSessionTrace._depth += 1
+        started = time.perf_counter()
+        try:
+            super().on_metrics(agent_metrics)
+        finally:
+            ClockedSessionTrace._depth -= 1
+            if ClockedSessionTrace._depth == 0:
+                ClockedSessionTrace.spent += time.perf_counter() - started
+
+
+async def replay(args) -> None:
+    from bench_replay import install_stubs, run_session
+    from replay_fakes import EnergyVAD, FakeJobProcess, Latencies, camera_frames
+
+    import agent as app
+
+    proc = FakeJobProcess()
+    app.prewarm(proc)
+    proc.userdata["vad"] = EnergyVAD()
+    proc.userdata["turn_detector"] = None
+    proc.userdata["noise_cancellation"] = None
+    latencies = Latencies()
+    install_stubs(latencies)
+    app.SessionTrace = ClockedSessionTrace
+    frames = camera_frames(args.width, args.height, 30)
+    args = argparse.Namespace(**dict(vars(args), turns=args.replay_turns))
+
+    cpu_before = time.process_time()
+    sessions = await asyncio.gather(
+        *(run_session(i, proc, args, frames, None, latencies) for i in range(args.sessions)),
+        return_exceptions=True,
+    )
+    cpu_seconds = time.process_time() - cpu_before
+    failed = sum(isinstance(s, BaseException) for s in sessions)
+    share = ClockedSessionTrace.spent / cpu_seconds if cpu_seconds else 0.0
+    print(
+        f"replay: sessions={args.sessions} ({failed} failed) turns={args.turns}: tracing {ClockedSessionTrace.spent * 1000:.1f} ms "
+        f"of {cpu_seconds:.1f}s process CPU = {share:.3%} (target < 1%)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--capacity", type=int, default=4096)
+    parser.add_argument("--turns", type=int, default=60, help="turns per simulated session")
+    parser.add_argument("--replay", action="store_true", help="also measure inside full entrypoint replays")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--replay-turns", type=int, default=4, help="candidate answers per replayed interview")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=float, default=15)
+    parser.add_argument("--think-time", type=float, default=0.8)
+    parser.add_argument("--reply-timeout", type=float, default=30)
+    parser.add_argument("--silence-timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    micro(args)
+    if args.replay:
+        asyncio.run(replay(args))
@@ -0,0 +1,596 @@
+"""Local stand-ins for the LiveKit job/room and for the STT, LLM, TTS and VAD providers.
+
+Used by bench_replay.py to drive agent.entrypoint without a LiveKit server or
+paid APIs. Media still flows through real livekit.rtc audio/video sources and
+streams, so VoicePipelineAgent, FrameBuffer and the playout path do their usual
+work; only the network edges are faked.
+"""
+import asyncio
+import time
+import wave
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import llm, stt, tts, utils, vad
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions
+
+AUDIO_SAMPLE_RATE = 48000
+AUDIO_FRAME_MS = 20
+# Spoken words per second, used to size both candidate and agent audio
+WORDS_PER_SECOND = 2.8
+# int16 RMS above which a frame counts as speech for the stub VAD/STT
+SPEECH_RMS = 300.0
+
+
+@dataclass
+class Latencies:
+    """Artificial provider latencies, in seconds."""
+
+    stt_final: float = 0.15
+    llm_ttft: float = 0.4
+    llm_tokens_per_second: float = 60.0
+    tts_ttfb: float = 0.2
+
+
+@dataclass
+class CandidateScript:
+    """What the simulated candidate says; shared by the audio publisher and the stub STT."""
+
+    answers: List[str]
+    current_text: str = ""
+
+
+def _rms(frame: rtc.AudioFrame) -> float:
+    samples = np.frombuffer(frame.data, dtype=np.int16)
+    if samples.size == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(samples.astype(np.float32) ** 2)))
+
+
+def _estimate_tokens(chat_ctx: llm.ChatContext) -> int:
+    chars = 0
+    for msg in chat_ctx.messages:
+        if isinstance(msg.content, str):
+            chars += len(msg.content)
+        elif isinstance(msg.content, list):
+            chars += sum(len(c) for c in msg.content if isinstance(c, str))
+    return chars // 4
+
+
+# --- providers -------------------------------------------------------------
+
+
+class StubSTT(stt.STT):
+    """Streaming STT that transcribes speech segments (by energy) as the scripted text."""
+
+    def __init__(self, script: CandidateScript, latencies: Latencies) -> None:
+        super().__init__(capabilities=stt.STTCapabilities(streaming=True, interim_results=True))
+        self._script = script
+        self._latencies = latencies
+
+    async def _recognize_impl(self, buffer, *, language=None, conn_options=DEFAULT_API_CONNECT_OPTIONS) -> stt.SpeechEvent:
+        return stt.SpeechEvent(
+            type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+            alternatives=[stt.SpeechData(language="en", text=self._script.current_text)],
+        )
+
+    def stream(self, *, language: Optional[str] = None, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> "StubSpeechStream":
+        return StubSpeechStream(stt=self, conn_options=conn_options)
+
+
+class StubSpeechStream(stt.RecognizeStream):
+    # Trailing silence that ends a segment, like a provider's endpointing
+    ENDPOINT_SILENCE = 0.3
+
+    def __init__(self, *, stt: StubSTT, conn_options: APIConnectOptions) -> None:
+        super().__init__(stt=stt, conn_options=conn_options, sample_rate=16000)
+        self._stub = stt
+
+    async def _run(self) -> None:
+        request_id = utils.shortuuid("stub_stt_")
+        in_speech = False
+        text, speech_time, silence_time, usage_time = "", 0.0, 0.0, 0.0
+        finals: set = set()
+
+        def send(kind: stt.SpeechEventType, transcript: str = "") -> None:
+            alternatives = [stt.SpeechData(language="en", text=transcript)] if transcript else []
+            self._event_ch.send_nowait(stt.SpeechEvent(type=kind, request_id=request_id, alternatives=alternatives))
+
+        async def send_final(transcript: str) -> None:
+            await asyncio.sleep(self._stub._latencies.stt_final)
+            send(stt.SpeechEventType.FINAL_TRANSCRIPT, transcript)
+            send(stt.SpeechEventType.END_OF_SPEECH)
+
+        try:
+            async for data in self._input_ch:
+                if isinstance(data, self._FlushSentinel):
+                    continue
+                duration = data.samples_per_channel / data.sample_rate
+                usage_time += duration
+                if usage_time >= 1.0:
+                    self._event_ch.send_nowait(
+                        stt.SpeechEvent(
+                            type=stt.SpeechEventType.RECOGNITION_USAGE,
+                            request_id=request_id,
+                            recognition_usage=stt.RecognitionUsage(audio_duration=usage_time),
+                        )
+                    )
+                    usage_time = 0.0
+
+                if _rms(data) >= SPEECH_RMS:
+                    if not in_speech:
+                        in_speech, text, speech_time = True, self._stub._script.current_text, 0.0
+                        send(stt.SpeechEventType.START_OF_SPEECH)
+                    speech_time += duration
+                    silence_time = 0.0
+                    words = text.split()
+                    heard = min(len(words), int(speech_time * WORDS_PER_SECOND))
+                    if heard and int((speech_time - duration) * WORDS_PER_SECOND) < heard:
+                        send(stt.SpeechEventType.INTERIM_TRANSCRIPT, " ".join(words[:heard]))
+                elif in_speech:
+                    silence_time += duration
+                    if silence_time >= self.ENDPOINT_SILENCE:
+                        in_speech = False
+                        task = asyncio.create_task(send_final(text))
+                        finals.add(task)
+                        task.add_done_callback(finals.discard)
+        finally:
+            await utils.aio.gracefully_cancel(*finals)
+
+
+class StubLLM(llm.LLM):
+    """Streams a canned reply after a fixed time to first token."""
+
+    REPLY = (
+        "That's helpful context. Could you walk me through a specific example, "
+        "what you personally owned, and how you measured whether it worked?"
+    )
+
+    def __init__(self, latencies: Latencies) -> None:
+        super().__init__()
+        self._latencies = latencies
+
+    def chat(self, *, chat_ctx: llm.ChatContext, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS, fnc_ctx=None, **kwargs) -> "StubLLMStream":
+        return StubLLMStream(self, chat_ctx=chat_ctx, fnc_ctx=fnc_ctx, conn_options=conn_options)
+
+
+class StubLLMStream(llm.LLMStream):
+    async def _run(self) -> None:
+        latencies: Latencies = self._llm._latencies
+        request_id = utils.shortuuid("stub_llm_")
+        words = StubLLM.REPLY.split()
+        await asyncio.sleep(latencies.llm_ttft)
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(1 / latencies.llm_tokens_per_second)
+            self._event_ch.send_nowait(
+                llm.ChatChunk(
+                    request_id=request_id,
+                    choices=[llm.Choice(delta=llm.ChoiceDelta(role="assistant", content=word if i == 0 else f" {word}"))],
+                )
+            )
+        prompt_tokens = _estimate_tokens(self._chat_ctx)
+        self._event_ch.send_nowait(
+            llm.ChatChunk(
+                request_id=request_id,
+                usage=llm.CompletionUsage(
+                    completion_tokens=len(words),
+                    prompt_tokens=prompt_tokens,
+                    total_tokens=prompt_tokens + len(words),
+                ),
+            )
+        )
+
+
+class StubTTS(tts.TTS):
+    """Streaming TTS producing a quiet tone sized to the text, after a fixed time to first byte."""
+
+    def __init__(self, latencies: Latencies, sample_rate: int = 24000) -> None:
+        super().__init__(capabilities=tts.TTSCapabilities(streaming=True), sample_rate=sample_rate, num_channels=1)
+        self._latencies = latencies
+
+    def synthesize(self, text: str, *, conn_options: Optional[APIConnectOptions] = None) -> "StubChunkedStream":
+        return StubChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+    def stream(self, *, conn_options: Optional[APIConnectOptions] = None) -> "StubSynthesizeStream":
+        return StubSynthesizeStream(tts=self, conn_options=conn_options)
+
+    def audio_for(self, text: str) -> List[rtc.AudioFrame]:
+        seconds = max(0.2, len(text.split()) / WORDS_PER_SECOND)
+        t = np.arange(int(seconds * self.sample_rate)) / self.sample_rate
+        pcm = (np.sin(2 * np.pi * 220 * t) * 2000).astype(np.int16)
+        step = self.sample_rate // 10
+        return [
+            rtc.AudioFrame(
+                data=pcm[i:i + step].tobytes(),
+                sample_rate=self.sample_rate,
+                num_channels=1,
+                samples_per_channel=len(pcm[i:i + step]),
+            )
+            for i in range(0, len(pcm), step)
+        ]
+
+
+class StubChunkedStream(tts.ChunkedStream):
+    async def _run(self) -> None:
+        await asyncio.sleep(self._tts._latencies.tts_ttfb)
+        request_id = utils.shortuuid("stub_tts_")
+        for frame in self._tts.audio_for(self._input_text):
+            self._event_ch.send_nowait(tts.SynthesizedAudio(frame=frame, request_id=request_id))
+
+
+class StubSynthesizeStream(tts.SynthesizeStream):
+    # Words buffered before a chunk is "synthesized", like a provider's sentence chunking
+    CHUNK_WORDS = 6
+
+    async def _run(self) -> None:
+        stub: StubTTS = self._tts
+        request_id = utils.shortuuid("stub_tts_")
+        pending, first_chunk = "", True
+
+        async def emit(text: str, final: bool) -> None:
+            nonlocal first_chunk
+            if first_chunk:
+                self._mark_started()
+                await asyncio.sleep(stub._latencies.tts_ttfb)
+                first_chunk = False
+            frames = stub.audio_for(text) if text.strip() else []
+            for i, frame in enumerate(frames):
+                self._event_ch.send_nowait(
+                    tts.SynthesizedAudio(frame=frame, request_id=request_id, is_final=final and i == len(frames) - 1)
+                )
+
+        async for data in self._input_ch:
+            if isinstance(data, self._FlushSentinel):
+                await emit(pending, final=True)
+                pending, first_chunk = "", True
+                continue
+            pending += data
+            if len(pending.split()) >= self.CHUNK_WORDS:
+                chunk, pending = pending, ""
+                await emit(chunk, final=False)
+
+
+class EnergyVAD(vad.VAD):
+    """Energy-threshold VAD for synthetic audio, which Silero would (rightly) not call speech."""
+
+    def __init__(self, min_silence: float = 0.5, update_interval: float = 0.032) -> None:
+        super().__init__(capabilities=vad.VADCapabilities(update_interval=update_interval))
+        self._min_silence = min_silence
+
+    def stream(self) -> "EnergyVADStream":
+        return EnergyVADStream(self, self._min_silence)
+
+
+class EnergyVADStream(vad.VADStream):
+    def __init__(self, vad_: EnergyVAD, min_silence: float) -> None:
+        super().__init__(vad_)
+        self._min_silence = min_silence
+
+    async def _main_task(self) -> None:
+        speaking = False
+        speech, silence, samples_index = 0.0, 0.0, 0
+        async for data in self._input_ch:
+            if isinstance(data, self._FlushSentinel):
+                continue
+            started = time.perf_counter()
+            duration = data.samples_per_channel / data.sample_rate
+            samples_index += data.samples_per_channel
+            is_speech = _rms(data) >= SPEECH_RMS
+            if is_speech:
+                speech += duration
+                silence = 0.0
+            else:
+                silence += duration
+
+            def event(kind: vad.VADEventType, **kwargs) -> vad.VADEvent:
+                return vad.VADEvent(
+                    type=kind,
+                    samples_index=samples_index,
+                    timestamp=time.time(),
+                    speech_duration=speech,
+                    silence_duration=silence,
+                    speaking=speaking,
+                    **kwargs,
+                )
+
+            if is_speech and not speaking:
+                speaking = True
+                self._event_ch.send_nowait(event(vad.VADEventType.START_OF_SPEECH))
+            self._event_ch.send_nowait(
+                event(
+                    vad.VADEventType.INFERENCE_DONE,
+                    frames=[data],
+                    probability=1.0 if is_speech else 0.0,
+                    inference_duration=time.perf_counter() - started,
+                    raw_accumulated_speech=speech if speaking else 0.0,
+                    raw_accumulated_silence=silence,
+                )
+            )
+            if speaking and silence >= self._min_silence:
+                speaking = False
+                self._event_ch.send_nowait(event(vad.VADEventType.END_OF_SPEECH, frames=[data]))
+                speech = 0.0
+
+
+# --- room and job ----------------------------------------------------------
+
+
+class FakeTrackPublication:
+    def __init__(self, track: rtc.Track, source: int, kind: int) -> None:
+        self.sid = f"TR_{utils.shortuuid()}"
+        self.track = track
+        self.source = source
+        self.kind = kind
+        self.subscribed = True
+        self.muted = False
+
+    def set_subscribed(self, subscribed: bool) -> None:
+        self.subscribed = subscribed
+
+    async def wait_for_subscription(self) -> None:
+        # The simulated candidate subscribes to the agent's audio right away
+        return None
+
+
+class FakeRemoteParticipant:
+    def __init__(self, identity: str, metadata: str) -> None:
+        self.identity = identity
+        self.sid = f"PA_{utils.shortuuid()}"
+        self.name = identity
+        self.metadata = metadata
+        self.attributes: Dict[str, str] = {}
+        self.track_publications: Dict[str, FakeTrackPublication] = {}
+
+    def add_publication(self, publication: FakeTrackPublication) -> None:
+        self.track_publications[publication.sid] = publication
+
+
+class FakeLocalParticipant:
+    def __init__(self, identity: str) -> None:
+        self.identity = identity
+        self.sid = f"PA_{utils.shortuuid()}"
+        self.attributes: Dict[str, str] = {}
+        self.rpc_handlers: Dict[str, Callable] = {}
+        self.published: List[rtc.LocalTrack] = []
+        # The pipeline's transcription forwarder looks the agent's microphone track up here
+        self.track_publications: Dict[str, FakeTrackPublication] = {}
+        self.data_messages: List[bytes] = []
+        self.transcriptions = 0
+        self.on_track_published: Optional[Callable[[], None]] = None
+
+    def register_rpc_method(self, method_name: str, handler: Optional[Callable] = None):
+        if handler is not None:
+            self.rpc_handlers[method_name] = handler
+            return None
+
+        def decorator(fn: Callable) -> Callable:
+            self.rpc_handlers[method_name] = fn
+            return fn
+
+        return decorator
+
+    async def publish_track(self, track: rtc.LocalTrack, options: Optional[rtc.TrackPublishOptions] = None):
+        self.published.append(track)
+        publication = FakeTrackPublication(track, rtc.TrackSource.SOURCE_MICROPHONE, track.kind)
+        self.track_publications[publication.sid] = publication
+        if self.on_track_published is not None:
+            self.on_track_published()
+        return publication
+
+    async def publish_transcription(self, transcription: rtc.Transcription) -> None:
+        self.transcriptions += 1
+
+    async def publish_data(self, payload, **kwargs) -> None:
+        self.data_messages.append(payload.encode() if isinstance(payload, str) else bytes(payload))
+
+    async def set_attributes(self, attributes: Dict[str, str]) -> None:
+        self.attributes.update(attributes)
+
+
+class FakeRoom(rtc.EventEmitter):
+    """Duck-typed rtc.Room holding one simulated candidate."""
+
+    def __init__(self, name: str, candidate: FakeRemoteParticipant) -> None:
+        super().__init__()
+        self.name = name
+        self.sid = f"RM_{utils.shortuuid()}"
+        self.metadata = ""
+        self.local_participant = FakeLocalParticipant(f"agent-{name}")
+        self.remote_participants: Dict[str, FakeRemoteParticipant] = {candidate.identity: candidate}
+        self._connected = False
+        self.disconnected = asyncio.Event()
+
+    def isconnected(self) -> bool:
+        return self._connected
+
+    async def connect(self) -> None:
+        self._connected = True
+        self.emit("connected")
+
+    async def disconnect(self) -> None:
+        if not self._connected:
+            return
+        self._connected = False
+        self.emit("disconnected", "CLIENT_INITIATED")
+        self.disconnected.set()
+
+
+class FakeProviderPool:
+    """Stands in for ProviderPool; the stub providers need no connections."""
+
+    @classmethod
+    def from_env(cls, process_metrics) -> "FakeProviderPool":
+        return cls()
+
+    async def preconnect(self) -> None:
+        pass
+
+    def describe(self) -> str:
+        return "stub providers"
+
+    async def aclose(self) -> None:
+        pass
+
+
+class FakeJobProcess:
+    def __init__(self) -> None:
+        self.userdata: Dict[str, object] = {}
+        self.pid = 0
+
+
+class FakeJob:
+    def __init__(self, room: FakeRoom) -> None:
+        self.id = f"AJ_{utils.shortuuid()}"
+        self.room = room
+
+
+class FakeJobContext:
+    """Duck-typed JobContext for one simulated interview."""
+
+    def __init__(self, room: FakeRoom, proc: FakeJobProcess) -> None:
+        self.room = room
+        self.proc = proc
+        self.job = FakeJob(room)
+        self._shutdown_callbacks: List[Callable[..., Awaitable[None]]] = []
+
+    async def connect(self, *, auto_subscribe=None, **kwargs) -> None:
+        await self.room.connect()
+
+    async def wait_for_participant(self, *, identity: Optional[str] = None, **kwargs) -> FakeRemoteParticipant:
+        return next(iter(self.room.remote_participants.values()))
+
+    def add_shutdown_callback(self, callback: Callable[..., Awaitable[None]]) -> None:
+        self._shutdown_callbacks.append(callback)
+
+    def shutdown(self, reason: str = "") -> None:
+        asyncio.ensure_future(self.room.disconnect())
+
+    async def run_shutdown_callbacks(self, reason: str = "") -> None:
+        for callback in self._shutdown_callbacks:
+            try:
+                await (callback(reason) if callback.__code__.co_argcount else callback())
+            except Exception as e:
+                print(f"shutdown callback failed: {e!r}")
+
+
+# --- media -----------------------------------------------------------------
+
+
+def load_wav(path: str) -> np.ndarray:
+    """Load a 16-bit WAV as mono int16 samples at AUDIO_SAMPLE_RATE."""
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV files are supported")
+        pcm = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        channels, rate = f.getnchannels(), f.getframerate()
+    if channels > 1:
+        pcm = pcm.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    if rate != AUDIO_SAMPLE_RATE:
+        positions = np.arange(0, len(pcm), rate / AUDIO_SAMPLE_RATE)
+        pcm = np.interp(positions, np.arange(len(pcm)), pcm).astype(np.int16)
+    return pcm
+
+
+def synthetic_speech(seconds: float, rng: np.random.Generator) -> np.ndarray:
+    """Amplitude-modulated noise with syllable-rate envelope, loud enough for the energy VAD."""
+    n = int(seconds * AUDIO_SAMPLE_RATE)
+    t = np.arange(n) / AUDIO_SAMPLE_RATE
+    envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+    return (rng.standard_normal(n) * 3000 * envelope).clip(-32768, 32767).astype(np.int16)
+
+
+@dataclass
+class CandidateMedia:
+    """Real rtc sources/tracks the simulated candidate publishes into the fake room."""
+
+    audio_source: rtc.AudioSource
+    audio_track: rtc.LocalAudioTrack
+    video_source: rtc.VideoSource
+    video_track: rtc.LocalVideoTrack
+    publications: List[FakeTrackPublication] = field(default_factory=list)
+
+    @classmethod
+    def create(cls, width: int, height: int) -> "CandidateMedia":
+        audio_source = rtc.AudioSource(AUDIO_SAMPLE_RATE, 1)
+        video_source = rtc.VideoSource(width, height)
+        media = cls(
+            audio_source=audio_source,
+            audio_track=rtc.LocalAudioTrack.create_audio_track("microphone", audio_source),
+            video_source=video_source,
+            video_track=rtc.LocalVideoTrack.create_video_track("camera", video_source),
+        )
+        media.publications = [
+            FakeTrackPublication(media.audio_track, rtc.TrackSource.SOURCE_MICROPHONE, rtc.TrackKind.KIND_AUDIO),
+            FakeTrackPublication(media.video_track, rtc.TrackSource.SOURCE_CAMERA, rtc.TrackKind.KIND_VIDEO),
+        ]
+        return media
+
+    def __post_init__(self) -> None:
+        self._queue: List[tuple] = []
+
+    def say(self, pcm: np.ndarray) -> "asyncio.Future[None]":
+        """Queue speech for the microphone; the future resolves once it has been played."""
+        done = asyncio.get_running_loop().create_future()
+        self._queue.append((pcm, done))
+        return done
+
+    async def run_microphone(self, stop: asyncio.Event) -> None:
+        """Publish queued speech, or silence between utterances, in real time 20 ms frames."""
+        step = AUDIO_SAMPLE_RATE * AUDIO_FRAME_MS // 1000
+        silence = np.zeros(step, dtype=np.int16)
+        pcm, done, offset = None, None, 0
+        started, sent = time.perf_counter(), 0
+        while not stop.is_set():
+            if pcm is None and self._queue:
+                (pcm, done), offset = self._queue.pop(0), 0
+            if pcm is not None:
+                chunk = pcm[offset:offset + step]
+                offset += step
+                if len(chunk) < step:
+                    chunk = np.pad(chunk, (0, step - len(chunk)))
+                if offset >= len(pcm):
+                    pcm = None
+                    done.set_result(None)
+            else:
+                chunk = silence
+            await self.audio_source.capture_frame(rtc.AudioFrame(chunk.tobytes(), AUDIO_SAMPLE_RATE, 1, step))
+            sent += 1
+            # capture_frame buffers up to a second; pace explicitly so speech timing is real
+            delay = started + sent * AUDIO_FRAME_MS / 1000 - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def run_camera(self, frames: List[rtc.VideoFrame], fps: float, stop: asyncio.Event) -> None:
+        i = 0
+        while not stop.is_set():
+            self.video_source.capture_frame(frames[i % len(frames)])
+            i += 1
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=1 / fps)
+            except asyncio.TimeoutError:
+                pass
+
+    async def aclose(self) -> None:
+        await self.audio_source.aclose()
+
+
+def camera_frames(width: int, height: int, count: int, image_path: Optional[str] = None) -> List[rtc.VideoFrame]:
+    """Frames from a recorded still (slightly jittered) or a moving synthetic gradient."""
+    rng = np.random.default_rng(0)
+    if image_path:
+        from PIL import Image
+
+        base = np.asarray(Image.open(image_path).convert("RGBA").resize((width, height)), dtype=np.int16)
+    else:
+        y, x = np.mgrid[0:height, 0:width]
+        base = np.stack([x * 255 // width, y * 255 // height, np.full_like(x, 128), np.full_like(x, 255)], axis=-1)
+    frames = []
+    for i in range(count):
+        jitter = rng.integers(-6, 7, size=base.shape[:2] + (1,))
+        shifted = np.roll(base, i * 4, axis=1) + np.concatenate([jitter.repeat(3, axis=-1), np.zeros_like(jitter)], axis=-1)
+        rgba = shifted.clip(0, 255).astype(np.uint8)
+        frames.append(rtc.VideoFrame(width, height, rtc.VideoBufferType.RGBA, bytearray(rgba.tobytes())))
+    return frames
@@ -0,0 +1,183 @@
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Set
+
+from livekit.agents import llm
+
+from telemetry import ProcessMetrics
+from vision import IMAGE_PLACEHOLDER
+
+logger = logging.getLogger("vision-voice-agent")
+
+DEFAULT_TOKEN_BUDGET = 2500
+DEFAULT_KEEP_TURNS = 6
+
+SUMMARY_HEADER = "Summary of the interview so far (earlier turns are no longer shown verbatim):\n"
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a job interview between Evita (the interviewer) and a candidate. "
+    "Update the summary with the new turns. Keep every question already asked, the candidate's key answers, "
+    "concrete facts (names, numbers, technologies, dates), strengths, concerns and any commitments made about "
+    "the interview's remaining flow. Write plain prose, third person, at most 250 words. Reply with the summary only."
+)
+
+
+@dataclass
+class CompactionStats:
+    """Running per-session totals for transcript compaction."""
+
+    summaries: int = 0
+    turns_summarized: int = 0
+    failures: int = 0
+    # Tokens the summary currently removes from every request (summarized turns minus the summary)
+    tokens_saved: int = 0
+    last_summary_seconds: float = 0.0
+
+
+class TranscriptCompactor:
+    """Caps the transcript part of the chat context with a rolling summary.
+
+    Once the user/assistant turns after the system prompt exceed token_budget,
+    everything but the newest keep_turns is folded into a running summary by a
+    background LLM call. The summary replaces those turns on a later
+    before_llm_cb, so no turn waits for summarization and no turn is dropped
+    before its content made it into the summary. The system prompt stays first
+    and verbatim, keeping the provider's prompt cache prefix intact.
+    """
+
+    def __init__(
+        self,
+        summary_llm: llm.LLM,
+        count_tokens: Callable[[str], int],
+        process_metrics: ProcessMetrics,
+        token_budget: int = DEFAULT_TOKEN_BUDGET,
+        keep_turns: int = DEFAULT_KEEP_TURNS,
+    ) -> None:
+        self._llm = summary_llm
+        self._count_tokens = count_tokens
+        self._process_metrics = process_metrics
+        self._token_budget = token_budget
+        self._keep_turns = keep_turns
+        self._summary = ""
+        self._summary_message = llm.ChatMessage(role="system", content="")
+        self._summarized_ids: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = CompactionStats()
+
+    @classmethod
+    def from_env(
+        cls, summary_llm: llm.LLM, count_tokens: Callable[[str], int], process_metrics: ProcessMetrics
+    ) -> "TranscriptCompactor":
+        return cls(
+            summary_llm,
+            count_tokens,
+            process_metrics,
+            token_budget=int(os.getenv("COMPACTION_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET)),
+            keep_turns=int(os.getenv("COMPACTION_KEEP_TURNS", DEFAULT_KEEP_TURNS)),
+        )
+
+    def count_context_tokens(self, chat_ctx: llm.ChatContext) -> int:
+        """Tokens of the text in the context; images are accounted for by the vision policy."""
+        return sum(self._count_tokens(msg.content) for msg in chat_ctx.messages if isinstance(msg.content, str))
+
+    def apply(self, chat_ctx: llm.ChatContext) -> int:
+        """Replace already summarized turns with the summary; return the number of turns removed."""
+        if not self._summary:
+            return 0
+        messages: List[llm.ChatMessage] = []
+        removed = 0
+        for msg in chat_ctx.messages:
+            if msg.id in self._summarized_ids:
+                removed += 1
+            elif msg.id != self._summary_message.id:
+                messages.append(msg)
+        # Right after the system prompt, ahead of every verbatim turn
+        insert_at = 1 if messages and messages[0].role == "system" else 0
+        messages.insert(insert_at, self._summary_message)
+        chat_ctx.messages[:] = messages
+        return removed
+
+    def schedule(self, chat_ctx: llm.ChatContext) -> None:
+        """Start summarizing the oldest turns in the background if the transcript is over budget."""
+        if self._task is not None and not self._task.done():
+            return
+        turns = self._turns(chat_ctx)
+        transcript_tokens = sum(self._count_tokens(msg.content) for msg in turns)
+        if self._summary:
+            transcript_tokens += self._count_tokens(self._summary_message.content)
+        if transcript_tokens <= self._token_budget or len(turns) <= self._keep_turns:
+            return
+        # The pipeline's speech context must not leak in, or the summary's LLM usage would count as a reply's
+        self._task = asyncio.create_task(
+            self._summarize(turns[: -self._keep_turns]),
+            context=contextvars.Context(),
+        )
+
+    async def aclose(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def _turns(self, chat_ctx: llm.ChatContext) -> List[llm.ChatMessage]:
+        """Verbatim text turns that have not been summarized yet."""
+        return [
+            msg for msg in chat_ctx.messages
+            if msg.role in ("user", "assistant")
+            and isinstance(msg.content, str)
+            and msg.content != IMAGE_PLACEHOLDER
+            and msg.id not in self._summarized_ids
+        ]
+
+    async def _summarize(self, turns: List[llm.ChatMessage]) -> None:
+        started = time.perf_counter()
+        transcript = "\n".join(
+            f"{'Evita' if msg.role == 'assistant' else 'Candidate'}: {msg.content}" for msg in turns
+        )
+        request = llm.ChatContext().append(role="system", text=SUMMARY_INSTRUCTIONS)
+        request.append(
+            role="user",
+            text=f"Current summary:\n{self._summary or '(none yet)'}\n\nNew turns:\n{transcript}",
+        )
+        try:
+            parts: List[str] = []
+            async with self._llm.chat(chat_ctx=request) as stream:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+            summary = "".join(parts).strip()
+        except Exception as e:
+            self.stats.failures += 1
+            logger.warning(f"Transcript summarization failed, keeping {len(turns)} turns verbatim: {e}")
+            return
+        if not summary:
+            self.stats.failures += 1
+            return
+
+        content = SUMMARY_HEADER + summary
+        saved = sum(self._count_tokens(msg.content) for msg in turns)
+        saved += self._count_tokens(self._summary_message.content) - self._count_tokens(content)
+        self._summary = summary
+        self._summary_message.content = content
+        self._summarized_ids.update(msg.id for msg in turns)
+        self.stats.summaries += 1
+        self.stats.turns_summarized += len(turns)
+        self.stats.tokens_saved += saved
+        self.stats.last_summary_seconds = time.perf_counter() - started
+        self._process_metrics.inc("intervita_transcript_summaries_total")
+        logger.info(
+            f"Summarized {len(turns)} turns in {self.stats.last_summary_seconds:.2f}s "
+            f"({self._count_tokens(summary)} summary tokens)"
+        )
+
+
+def log_compaction_metrics(stats: CompactionStats, prefix: str = "Transcript compaction") -> None:
+    logger.info(
+        f"{prefix}: summaries={stats.summaries}, turns_summarized={stats.turns_summarized}, "
+        f"failures={stats.failures}, tokens_saved={stats.tokens_saved}"
+    )
@@ -1,10 +1,49 @@
+import asyncio
+import os
+import threading
+
 from aiohttp import web
 
+from load import LoadMonitor
+from telemetry import get_aggregator
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
 async def health_check(request):
-    return web.Response(text="OK")
+    monitor: LoadMonitor = request.app["load_monitor"]
+    report = await asyncio.get_running_loop().run_in_executor(None, monitor.report)
+    if report.score >= monitor.threshold:
+        return web.Response(status=503, text=f"DEGRADED {report.describe()}")
+    return web.Response(text=f"OK {report.describe()}")
+
+
+async def prometheus_metrics(request):
+    return web.Response(body=get_aggregator().render().encode("utf-8"), headers={"Content-Type": PROMETHEUS_CONTENT_TYPE})
+
+
+def create_app() -> web.Application:
+    app = web.Application()
+    app["load_monitor"] = LoadMonitor.instance()
+    app.add_routes([web.get('/health', health_check), web.get('/metrics', prometheus_metrics)])
+    return app
+
+
+def start_in_background(port: int, host: str = "0.0.0.0") -> threading.Thread:
+    """Serve /health and /metrics from a daemon thread with its own event loop."""
+
+    def _serve() -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(create_app())
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, host, port).start())
+        loop.run_forever()
+
+    thread = threading.Thread(target=_serve, name="metrics_server", daemon=True)
+    thread.start()
+    return thread
 
-app = web.Application()
-app.add_routes([web.get('/health', health_check)])
 
 if __name__ == "__main__":
-    web.run_app(app, host="0.0.0.0", port=8081)
\ No newline at end of file
+    web.run_app(create_app(), host="0.0.0.0", port=int(os.getenv("METRICS_PORT", 8081)))
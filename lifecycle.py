@@ -0,0 +1,155 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+from livekit.agents import Worker
+
+from telemetry import ProcessMetrics, get_process_metrics, metrics_dir
+
+logger = logging.getLogger("vision-voice-agent")
+
+# fly.toml kill_timeout: SIGKILL follows SIGTERM after this many seconds
+DEFAULT_KILL_TIMEOUT = 60.0
+# Kept back from the kill timeout for closing job processes after the drain
+DEFAULT_SHUTDOWN_MARGIN = 12.0
+# Job processes get this long to exit once the drain is over
+SHUTDOWN_PROCESS_TIMEOUT = 8.0
+# Time reserved before the drain deadline for the goodbye line and the disconnect
+GOODBYE_MARGIN = 10.0
+DRAIN_POLL_INTERVAL = 1.0
+
+# Not .json: MetricsAggregator reads those as process snapshots
+DRAIN_NOTICE_FILE = "drain.notice"
+# Set by the worker for the job processes it starts, so they recognise its notice
+WORKER_PID_ENV = "INTERVITA_WORKER_PID"
+
+
+def drain_timeout() -> float:
+    """Seconds the worker waits for interviews to end after SIGTERM, leaving room to close before SIGKILL."""
+    kill_timeout = float(os.getenv("KILL_TIMEOUT", DEFAULT_KILL_TIMEOUT))
+    return max(1.0, kill_timeout - float(os.getenv("SHUTDOWN_MARGIN", DEFAULT_SHUTDOWN_MARGIN)))
+
+
+def _notice_path() -> str:
+    return os.path.join(metrics_dir(), DRAIN_NOTICE_FILE)
+
+
+def clear_drain_notice() -> None:
+    """Remove a notice left by an earlier worker on this machine; call once at worker start."""
+    try:
+        os.remove(_notice_path())
+    except FileNotFoundError:
+        pass
+
+
+class DrainCoordinator:
+    """Worker-side half of a graceful drain, started by SIGTERM.
+
+    LiveKit's CLI turns SIGTERM into worker.drain(), which stops new jobs from
+    being assigned and waits for running ones, but job processes are never told
+    and its default timeout equals Fly's kill_timeout, so SIGKILL hits before the
+    worker can close. The coordinator wraps that drain: it writes a notice with
+    the deadline where job processes poll for it (next to the metrics snapshots),
+    bounds the wait to drain_timeout(), and reports how long draining took and
+    how many interviews were still running at the deadline.
+
+    The CLI creates the worker itself, so call install() before cli.run_app: it
+    wraps Worker.drain for whichever worker the CLI starts, and a SIGTERM that
+    arrives before the worker's first load update is still handled.
+    """
+
+    def __init__(self, timeout: Optional[float] = None) -> None:
+        self._timeout = timeout if timeout is not None else drain_timeout()
+        self._worker: Optional[Worker] = None
+
+    def install(self) -> None:
+        # Job processes may be started from a forkserver, so their parent is not the worker
+        os.environ[WORKER_PID_ENV] = str(os.getpid())
+        original_drain = Worker.drain
+        coordinator = self
+
+        async def drain(worker: Worker, timeout: Optional[int] = None) -> None:
+            # The CLI's --drain-timeout defaults to the full kill_timeout, so ours replaces it
+            coordinator._worker = worker
+            await coordinator._drain(functools.partial(original_drain, worker))
+
+        Worker.drain = drain
+
+    async def _drain(self, original_drain: Callable[..., Awaitable[None]]) -> None:
+        started = time.monotonic()
+        deadline = time.time() + self._timeout
+        active = len(self._worker.active_jobs)
+        try:
+            await asyncio.to_thread(self._write_notice, deadline)
+        except OSError as e:
+            logger.warning(f"Could not publish drain notice, interviews will run until the deadline: {e}")
+        logger.info(f"Draining: {active} interviews in progress, {self._timeout:.0f}s until they are abandoned")
+
+        abandoned = 0
+        try:
+            await original_drain(timeout=self._timeout)
+        except asyncio.TimeoutError:
+            abandoned = len(self._worker.active_jobs)
+        drained_seconds = time.monotonic() - started
+
+        process_metrics = get_process_metrics()
+        process_metrics.set_gauge("intervita_drain_seconds", drained_seconds)
+        process_metrics.inc("intervita_drain_abandoned_sessions_total", abandoned)
+        process_metrics.flush()
+        if abandoned:
+            logger.warning(f"Drain deadline reached after {drained_seconds:.1f}s, abandoning {abandoned} of {active} interviews")
+        else:
+            logger.info(f"Drained {active} interviews in {drained_seconds:.1f}s")
+
+    def _write_notice(self, deadline: float) -> None:
+        path = _notice_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"pid": os.getpid(), "deadline": deadline}, f)
+        os.replace(tmp_path, path)
+
+
+def _worker_pid() -> int:
+    """Pid of the worker this process runs jobs for; thread-executor jobs run inside it."""
+    worker_pid = os.getenv(WORKER_PID_ENV)
+    if worker_pid is not None:
+        return int(worker_pid)
+    return os.getppid()
+
+
+def drain_deadline() -> Optional[float]:
+    """Epoch deadline of a drain of this process's worker, if one has started."""
+    try:
+        with open(_notice_path(), encoding="utf-8") as f:
+            notice = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if notice.get("pid") != _worker_pid():
+        return None
+    return float(notice["deadline"])
+
+
+async def watch_for_drain(
+    on_drain: Callable[[float], Awaitable[None]],
+    process_metrics: ProcessMetrics,
+    interval: float = DRAIN_POLL_INTERVAL,
+) -> None:
+    """Session-side half: wait for the worker's drain notice, then hand its deadline to on_drain."""
+    path = _notice_path()
+    while True:
+        await asyncio.sleep(interval)
+        # A stat per second per session; the file is only read once it exists
+        if not os.path.exists(path):
+            continue
+        deadline = drain_deadline()
+        if deadline is None:
+            continue
+        logger.info(f"Worker is draining, wrapping up the interview within {max(0.0, deadline - time.time()):.0f}s")
+        process_metrics.inc("intervita_drain_wrapped_up_total")
+        await on_drain(deadline)
+        return
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import psutil
+from livekit.agents import utils
+from livekit.agents.utils.hw import get_cpu_monitor
+
+from telemetry import MetricsAggregator, ProcessMetrics, get_aggregator
+
+logger = logging.getLogger("vision-voice-agent")
+
+# Sessions a 2-vCPU machine serves before latency suffers (VAD + EOU model + BVC per session)
+DEFAULT_MAX_SESSIONS = 8
+# Event-loop lag at which a job process counts as saturated
+DEFAULT_MAX_LOOP_LAG = 0.1
+DEFAULT_LOAD_THRESHOLD = 0.75
+
+LOOP_LAG_INTERVAL = 0.25
+# Number of recent lag samples the reported worst case is taken over
+LOOP_LAG_WINDOW = 20
+
+_instance_lock = threading.Lock()
+
+# Recent worst lag of each running monitor, one per event loop
+_loop_lag_lock = threading.Lock()
+_loop_lags: Dict[object, float] = {}
+
+
+@dataclass
+class LoadReport:
+    """Load score in [0, 1] and the per-resource utilizations it was derived from."""
+
+    score: float
+    sessions: float
+    cpu: float
+    memory: float
+    loop_lag: float
+
+    def describe(self) -> str:
+        return (
+            f"load={self.score:.2f} (sessions={self.sessions:.2f}, cpu={self.cpu:.2f}, "
+            f"memory={self.memory:.2f}, loop_lag={self.loop_lag:.2f})"
+        )
+
+
+def _memory_limit() -> int:
+    """Container memory limit (cgroup v2) or the machine's total memory."""
+    try:
+        with open("/sys/fs/cgroup/memory.max", encoding="utf-8") as f:
+            value = f.read().strip()
+        if value != "max":
+            return int(value)
+    except (OSError, ValueError):
+        pass
+    return psutil.virtual_memory().total
+
+
+def process_rss() -> int:
+    """Resident memory of this process."""
+    return psutil.Process().memory_info().rss
+
+
+def _worker_rss() -> int:
+    """Resident memory of this process and every job process it spawned."""
+    process = psutil.Process()
+    rss = process.memory_info().rss
+    for child in process.children(recursive=True):
+        try:
+            rss += child.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return rss
+
+
+class LoadMonitor:
+    """Worker load score: the most saturated of sessions, CPU, RSS and event-loop lag.
+
+    Taking the maximum rather than an average means one exhausted resource is
+    enough to stop new interviews from landing here. Active sessions and loop
+    lag come from the job processes' metrics snapshots, CPU is sampled on a
+    background thread like livekit's default load calculation.
+    """
+
+    _instance: Optional["LoadMonitor"] = None
+
+    def __init__(
+        self,
+        aggregator: MetricsAggregator,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        max_loop_lag: float = DEFAULT_MAX_LOOP_LAG,
+        threshold: float = DEFAULT_LOAD_THRESHOLD,
+    ) -> None:
+        self._aggregator = aggregator
+        self._max_sessions = max_sessions
+        self._max_loop_lag = max_loop_lag
+        self._threshold = threshold
+        self._memory_limit = _memory_limit()
+        self._cpu_monitor = get_cpu_monitor()
+        self._cpu_avg = utils.MovingAverage(5)
+        self._lock = threading.Lock()
+        self._last_degraded = False
+        self._thread = threading.Thread(target=self._sample_cpu, daemon=True, name="load_monitor_cpu")
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls) -> "LoadMonitor":
+        return cls(
+            get_aggregator(),
+            max_sessions=int(os.getenv("LOAD_MAX_SESSIONS", DEFAULT_MAX_SESSIONS)),
+            max_loop_lag=float(os.getenv("LOAD_MAX_LOOP_LAG", DEFAULT_MAX_LOOP_LAG)),
+            threshold=load_threshold(),
+        )
+
+    @classmethod
+    def instance(cls) -> "LoadMonitor":
+        # Shared by the worker's load_fnc thread and the /health server thread
+        with _instance_lock:
+            if cls._instance is None:
+                cls._instance = cls.from_env()
+            return cls._instance
+
+    @classmethod
+    def get_load(cls) -> float:
+        """WorkerOptions.load_fnc: called by the worker every few seconds from an executor thread."""
+        return cls.instance().report().score
+
+    @property
+    def threshold(self) -> float:
+        return self._threshold
+
+    def report(self) -> LoadReport:
+        gauges = self._aggregator.collect()["gauges"]
+        with self._lock:
+            cpu = self._cpu_avg.get_avg()
+        report = LoadReport(
+            score=0.0,
+            sessions=gauges["intervita_active_rooms"] / self._max_sessions,
+            cpu=cpu,
+            memory=_worker_rss() / self._memory_limit,
+            loop_lag=gauges["intervita_event_loop_lag_seconds"] / self._max_loop_lag,
+        )
+        report.score = min(1.0, max(report.sessions, report.cpu, report.memory, report.loop_lag))
+
+        degraded = report.score >= self._threshold
+        if degraded != self._last_degraded:
+            self._last_degraded = degraded
+            if degraded:
+                logger.warning(f"Worker degraded, refusing new interviews: {report.describe()}")
+            else:
+                logger.info(f"Worker has headroom again: {report.describe()}")
+        return report
+
+    def _sample_cpu(self) -> None:
+        while True:
+            cpu = self._cpu_monitor.cpu_percent(interval=0.5)
+            with self._lock:
+                self._cpu_avg.add_sample(cpu)
+
+
+def load_threshold() -> float:
+    return float(os.getenv("LOAD_THRESHOLD", DEFAULT_LOAD_THRESHOLD))
+
+
+async def monitor_event_loop_lag(process_metrics: ProcessMetrics, interval: float = LOOP_LAG_INTERVAL) -> None:
+    """Publish the recent worst event-loop lag of this process's busiest loop until cancelled.
+
+    Under the thread executor every room runs its own loop and monitor in the
+    same process, so each monitor keeps its own lag and the process gauge (and
+    with it the load score) follows the worst of them.
+    """
+    samples: deque = deque(maxlen=LOOP_LAG_WINDOW)
+    key = object()
+    try:
+        while True:
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            samples.append(max(0.0, time.perf_counter() - expected))
+            # Under the lock, so a monitor publishing a stale maximum cannot overwrite a newer one
+            with _loop_lag_lock:
+                _loop_lags[key] = max(samples)
+                process_metrics.set_gauge("intervita_event_loop_lag_seconds", max(_loop_lags.values()))
+    finally:
+        with _loop_lag_lock:
+            _loop_lags.pop(key, None)
+            process_metrics.set_gauge("intervita_event_loop_lag_seconds", max(_loop_lags.values(), default=0.0))
@@ -0,0 +1,377 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Any, List, Optional, Tuple
+
+from silence import DEFAULT_SILENCE_GRACE_PERIOD, DEFAULT_SILENCE_TIMEOUT
+
+logger = logging.getLogger("vision-voice-agent")
+
+DEFAULT_MAX_METADATA_BYTES = 64 * 1024
+DEFAULT_MAX_RESUME_CHARS = 4000
+MAX_RESUME_VALUE_CHARS = 600
+MAX_RESUME_DEPTH = 4
+# Deeper resume data is rejected before hashing; values nested past MAX_INLINE_DEPTH render as TRUNCATION_MARK
+MAX_METADATA_DEPTH = 32
+MAX_INLINE_DEPTH = 8
+MAX_QUESTIONS = 20
+MAX_QUESTION_CHARS = 400
+MAX_JOB_CONTEXT_CHARS = 2000
+DEFAULT_MAX_INTERVIEW_MINUTES = 10
+
+# Accepted ranges; values outside are clamped
+INTERVIEW_MINUTES_RANGE = (1, 120)
+SILENCE_TIMEOUT_RANGE = (10.0, 900.0)
+SILENCE_GRACE_RANGE = (5.0, 120.0)
+
+# Normalized resumes and job contexts kept per process, keyed by content hash
+NORMALIZED_CACHE_SIZE = 256
+
+TRUNCATION_MARK = "…"
+RESUME_TRUNCATED = "[resume truncated]"
+
+
+@dataclass(frozen=True)
+class MetadataLimits:
+    """Size caps applied while ingesting participant metadata."""
+
+    max_bytes: int = DEFAULT_MAX_METADATA_BYTES
+    max_resume_chars: int = DEFAULT_MAX_RESUME_CHARS
+
+    @classmethod
+    def from_env(cls) -> "MetadataLimits":
+        return cls(
+            max_bytes=int(os.getenv("METADATA_MAX_BYTES", DEFAULT_MAX_METADATA_BYTES)),
+            max_resume_chars=int(os.getenv("METADATA_MAX_RESUME_CHARS", DEFAULT_MAX_RESUME_CHARS)),
+        )
+
+
+@dataclass
+class InterviewMetadata:
+    """Validated interview settings from participant metadata, with a compact resume for the prompt."""
+
+    resume: str = ""
+    resume_digest: Optional[str] = None
+    questions: List[str] = field(default_factory=list)
+    job_context: str = ""
+    max_interview_minutes: int = DEFAULT_MAX_INTERVIEW_MINUTES
+    silence_timeout: float = DEFAULT_SILENCE_TIMEOUT
+    silence_grace_period: float = DEFAULT_SILENCE_GRACE_PERIOD
+    raw_bytes: int = 0
+    cache_hit: bool = False
+    truncated: List[str] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+    def describe(self) -> str:
+        """Log line with sizes and a resume hash only; no candidate content."""
+        resume = f"{len(self.resume)} chars sha256:{self.resume_digest}" if self.resume_digest else "none"
+        return (
+            f"{self.raw_bytes} bytes, resume={resume}{' (cached)' if self.cache_hit else ''}, "
+            f"questions={len(self.questions)}, job_context={len(self.job_context)} chars, "
+            f"max_interview_minutes={self.max_interview_minutes}, silence_timeout={self.silence_timeout:.0f}s, "
+            f"silence_grace={self.silence_grace_period:.0f}s, truncated={self.truncated or 'none'}"
+        )
+
+
+class _NormalizedCache:
+    """Thread-safe LRU of normalized results keyed by the hash of their source."""
+
+    def __init__(self, maxsize: int = NORMALIZED_CACHE_SIZE) -> None:
+        self._maxsize = maxsize
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = _NormalizedCache()
+
+
+def clear_cache() -> None:
+    _cache.clear()
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _clip(text: str, limit: int) -> Tuple[str, bool]:
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text, False
+    return text[: limit - 1].rstrip() + TRUNCATION_MARK, True
+
+
+def _label(key: Any) -> str:
+    return str(key).replace("_", " ").strip().capitalize()
+
+
+class _ResumeRenderer:
+    """Renders a resume tree as "Label: value" lines, stopping once max_chars is reached.
+
+    Large resumes are mostly cut anyway, so rendering stops at the cap instead of
+    normalizing every remaining entry.
+    """
+
+    def __init__(self, max_chars: int) -> None:
+        self.lines: List[str] = []
+        self.clipped = False
+        self._max_chars = max_chars
+        self._chars = 0
+
+    @property
+    def full(self) -> bool:
+        return self._chars > self._max_chars
+
+    def render(self, value: Any, indent: str = "", depth: int = 0) -> None:
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if self.full:
+                    return
+                if item in (None, "", [], {}):
+                    continue
+                if isinstance(item, (dict, list)) and depth < MAX_RESUME_DEPTH and not _is_flat_list(item):
+                    self._append(f"{indent}{_label(key)}:")
+                    self.render(item, indent + "  ", depth + 1)
+                else:
+                    self._append(f"{indent}{_label(key)}: {self._value(item)}")
+        elif isinstance(value, list) and depth < MAX_RESUME_DEPTH:
+            for item in value:
+                if self.full:
+                    return
+                if isinstance(item, dict):
+                    first = len(self.lines)
+                    self.render(item, indent + "  ", depth + 1)
+                    if len(self.lines) > first:
+                        self.lines[first] = f"{indent}- {self.lines[first].lstrip()}"
+                elif item not in (None, ""):
+                    self._append(f"{indent}- {self._value(item)}")
+        else:
+            self._append(f"{indent}{self._value(value)}")
+
+    def _value(self, value: Any) -> str:
+        text, cut = _clip(_inline(value), MAX_RESUME_VALUE_CHARS)
+        self.clipped |= cut
+        return text
+
+    def _append(self, line: str) -> None:
+        self.lines.append(line)
+        self._chars += len(line) + 1
+
+
+def _is_flat_list(value: Any) -> bool:
+    return isinstance(value, list) and all(not isinstance(item, (dict, list)) for item in value)
+
+
+def _inline(value: Any, depth: int = 0) -> str:
+    if isinstance(value, (list, dict)) and depth >= MAX_INLINE_DEPTH:
+        return TRUNCATION_MARK
+    if isinstance(value, list):
+        return ", ".join(_inline(item, depth + 1) for item in value if item not in (None, ""))
+    if isinstance(value, dict):
+        return "; ".join(f"{_label(k)}: {_inline(v, depth + 1)}" for k, v in value.items() if v not in (None, ""))
+    return str(value)
+
+
+def _nesting_depth(value: Any, limit: int) -> int:
+    """Depth of nested lists and dicts, counted without recursion and only up to limit + 1."""
+    deepest = 0
+    stack = [(value, 1)]
+    while stack:
+        item, depth = stack.pop()
+        if not isinstance(item, (list, dict)):
+            continue
+        deepest = max(deepest, depth)
+        if deepest > limit:
+            break
+        stack.extend((child, depth + 1) for child in (item.values() if isinstance(item, dict) else item))
+    return deepest
+
+
+def compact_resume(resume_data: Any, max_chars: int = DEFAULT_MAX_RESUME_CHARS) -> Tuple[str, Optional[str], bool, bool]:
+    """Render resume data as compact "Label: value" text for the prompt.
+
+    Returns (text, digest, truncated, cache_hit). The rendering is cached by the
+    hash of the canonical JSON, so a candidate rejoining or a resume reused across
+    interviews is only normalized once per process. Raises ValueError for data
+    nested deeper than MAX_METADATA_DEPTH.
+    """
+    if not resume_data:
+        return "", None, False, False
+    if _nesting_depth(resume_data, MAX_METADATA_DEPTH) > MAX_METADATA_DEPTH:
+        raise ValueError(f"resume_data is nested deeper than {MAX_METADATA_DEPTH} levels")
+    # Key order is kept: the same resume arrives from the same client serialization
+    canonical = json.dumps(resume_data, ensure_ascii=False, separators=(",", ":"), default=str)
+    digest = _digest(canonical)
+    key = f"resume:{max_chars}:{digest}"
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached[0], digest, cached[1], True
+
+    if isinstance(resume_data, str):
+        # Free-text resume: whitespace-normalized and capped as a whole
+        text, truncated = _clip(resume_data, max_chars)
+        _cache.put(key, (text, truncated))
+        return text, digest, truncated, False
+
+    renderer = _ResumeRenderer(max_chars)
+    renderer.render(resume_data)
+    truncated = renderer.clipped
+    text = "\n".join(renderer.lines)
+    if len(text) > max_chars:
+        # Cut on a line boundary so the last entry is not half a field
+        cut = text.rfind("\n", 0, max_chars - len(RESUME_TRUNCATED) - 1)
+        text = text[: cut if cut > 0 else max_chars - len(RESUME_TRUNCATED) - 1] + "\n" + RESUME_TRUNCATED
+        truncated = True
+    _cache.put(key, (text, truncated))
+    return text, digest, truncated, False
+
+
+def normalize_job_context(job_context: str) -> Tuple[str, bool]:
+    """Collapse whitespace and cap length; cached because one job context serves many candidates."""
+    key = f"job:{_digest(job_context)}"
+    cached = _cache.get(key)
+    if cached is None:
+        cached = _clip(job_context, MAX_JOB_CONTEXT_CHARS)
+        _cache.put(key, cached)
+    return cached
+
+
+def _clamp(value: Any, bounds: Tuple[float, float], name: str, default: float, metadata: InterviewMetadata) -> float:
+    # bool is an int subclass, so `true` would otherwise pass as 1
+    if isinstance(value, bool):
+        metadata.errors.append(f"{name} is not a number")
+        return default
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        metadata.errors.append(f"{name} is not a number")
+        return default
+    if not math.isfinite(number):
+        metadata.errors.append(f"{name} is not a finite number")
+        return default
+    low, high = bounds
+    if not low <= number <= high:
+        metadata.truncated.append(name)
+        return min(max(number, low), high)
+    return number
+
+
+def parse_participant_metadata(raw: Optional[str], limits: Optional[MetadataLimits] = None) -> InterviewMetadata:
+    """Validate participant metadata against the interview schema.
+
+    Oversized or malformed metadata yields the defaults with an entry in
+    errors; individual fields of the wrong type are ignored, and fields over
+    their size cap are truncated and listed in truncated. Never raises.
+    """
+    limits = limits or MetadataLimits()
+    metadata = InterviewMetadata()
+    if not raw:
+        return metadata
+    encoded = raw.encode("utf-8")
+    metadata.raw_bytes = len(encoded)
+    if metadata.raw_bytes > limits.max_bytes:
+        metadata.errors.append(f"metadata is {metadata.raw_bytes} bytes, over the {limits.max_bytes} byte limit")
+        return metadata
+
+    # A rejoining candidate (reconnect, retried job) sends the identical blob: skip parsing entirely
+    key = f"metadata:{limits.max_resume_chars}:{hashlib.sha256(encoded).hexdigest()[:16]}"
+    cached = _cache.get(key)
+    if cached is not None:
+        return replace(cached, questions=list(cached.questions), truncated=list(cached.truncated), cache_hit=True)
+    metadata = _parse(raw, metadata, limits)
+    if not metadata.errors:
+        _cache.put(key, replace(metadata, questions=list(metadata.questions), truncated=list(metadata.truncated)))
+    return metadata
+
+
+def _parse(raw: str, metadata: InterviewMetadata, limits: MetadataLimits) -> InterviewMetadata:
+    try:
+        parsed = json.loads(raw)
+    except json.JSONDecodeError as e:
+        metadata.errors.append(f"metadata is not valid JSON ({e.msg} at {e.pos})")
+        return metadata
+    except RecursionError:
+        metadata.errors.append("metadata is nested too deeply to parse")
+        return metadata
+    except ValueError as e:
+        # e.g. an integer literal past the int string conversion limit
+        metadata.errors.append(f"metadata is not valid JSON ({e})")
+        return metadata
+    if not isinstance(parsed, dict):
+        metadata.errors.append("metadata is not a JSON object")
+        return metadata
+
+    resume_data = parsed.get("resume_data")
+    if isinstance(resume_data, (dict, list, str)):
+        try:
+            metadata.resume, metadata.resume_digest, truncated, metadata.cache_hit = compact_resume(
+                resume_data, limits.max_resume_chars
+            )
+        except (RecursionError, ValueError) as e:
+            metadata.errors.append(str(e) or "resume_data could not be rendered")
+            truncated = False
+        if truncated:
+            metadata.truncated.append("resume_data")
+    elif resume_data is not None:
+        metadata.errors.append("resume_data is not an object")
+
+    questions = parsed.get("questions")
+    if isinstance(questions, list):
+        for question in questions[:MAX_QUESTIONS]:
+            if not isinstance(question, str) or not question.strip():
+                continue
+            text, cut = _clip(question, MAX_QUESTION_CHARS)
+            metadata.questions.append(text)
+            if cut and "questions" not in metadata.truncated:
+                metadata.truncated.append("questions")
+        if len(questions) > MAX_QUESTIONS and "questions" not in metadata.truncated:
+            metadata.truncated.append("questions")
+    elif questions is not None:
+        metadata.errors.append("questions is not a list")
+
+    job_context = parsed.get("job_context")
+    if isinstance(job_context, str):
+        metadata.job_context, cut = normalize_job_context(job_context)
+        if cut:
+            metadata.truncated.append("job_context")
+    elif job_context is not None:
+        metadata.errors.append("job_context is not a string")
+
+    if "max_interview_minutes" in parsed:
+        metadata.max_interview_minutes = int(_clamp(
+            parsed["max_interview_minutes"], INTERVIEW_MINUTES_RANGE, "max_interview_minutes",
+            DEFAULT_MAX_INTERVIEW_MINUTES, metadata,
+        ))
+    if "silence_timeout_seconds" in parsed:
+        metadata.silence_timeout = _clamp(
+            parsed["silence_timeout_seconds"], SILENCE_TIMEOUT_RANGE, "silence_timeout_seconds",
+            DEFAULT_SILENCE_TIMEOUT, metadata,
+        )
+    if "silence_grace_seconds" in parsed:
+        metadata.silence_grace_period = _clamp(
+            parsed["silence_grace_seconds"], SILENCE_GRACE_RANGE, "silence_grace_seconds",
+            DEFAULT_SILENCE_GRACE_PERIOD, metadata,
+        )
+    return metadata
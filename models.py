@@ -0,0 +1,97 @@
+import asyncio
+import inspect
+import logging
+import time
+from typing import Optional, Tuple
+
+from livekit.agents import llm
+from livekit.plugins import turn_detector
+
+logger = logging.getLogger("vision-voice-agent")
+
+# Turns of history the turn detector reads; matches the plugin's own limit
+MAX_HISTORY_TURNS = 6
+
+# A short exchange for the warm-up prediction; its result is discarded
+_WARM_UP_TURNS = (
+    ("assistant", "Could you tell me a bit about your last role?"),
+    ("user", "Sure, I was a backend engineer working on payments"),
+)
+
+
+def _turn_key(chat_ctx: llm.ChatContext) -> Tuple[Tuple[str, str], ...]:
+    """The part of the context the EOU model sees: recent user/assistant text."""
+    turns = [
+        (msg.role, msg.content)
+        for msg in chat_ctx.messages
+        if msg.role in ("user", "assistant") and isinstance(msg.content, str)
+    ]
+    return tuple(turns[-MAX_HISTORY_TURNS:])
+
+
+class SharedEOUModel:
+    """Turn detector of one job, created empty in prewarm and attached on first use.
+
+    Wraps the plugin's public EOUModel. The ONNX weights are loaded once per
+    worker, in LiveKit's shared inference process, when the worker starts; a
+    job reaches them through its own inference client, which only exists once
+    the job is running. prewarm therefore loads nothing here: the EOUModel is
+    built on first use and warm_up() pays the first inference's cold start
+    while the room connects. The pipeline's endpointing and speculative
+    replies both ask about the same transcript, so the latest prediction is
+    shared instead of run twice.
+    """
+
+    def __init__(self) -> None:
+        self._model: Optional[turn_detector.EOUModel] = None
+        self._threshold_takes_language = False
+        self._warm_up_task: Optional[asyncio.Task] = None
+        self._last_key: Optional[Tuple[Tuple[str, str], ...]] = None
+        self._last_prediction: Optional[asyncio.Future] = None
+
+    @property
+    def model(self) -> turn_detector.EOUModel:
+        if self._model is None:
+            self._model = turn_detector.EOUModel()
+            # Plugin 0.4.3 has one threshold; 0.4.4+ looks it up per language
+            self._threshold_takes_language = bool(inspect.signature(self._model.unlikely_threshold).parameters)
+        return self._model
+
+    def unlikely_threshold(self, language: Optional[str] = None) -> Optional[float]:
+        model = self.model
+        if self._threshold_takes_language:
+            return model.unlikely_threshold(language)
+        return model.unlikely_threshold()
+
+    def supports_language(self, language: Optional[str]) -> bool:
+        return self.model.supports_language(language)
+
+    async def predict_end_of_turn(self, chat_ctx: llm.ChatContext, *, timeout: Optional[float] = 3) -> float:
+        key = _turn_key(chat_ctx)
+        previous = self._last_prediction
+        if (
+            previous is None
+            or key != self._last_key
+            or (previous.done() and (previous.cancelled() or previous.exception() is not None))
+        ):
+            self._last_key = key
+            self._last_prediction = asyncio.ensure_future(self.model.predict_end_of_turn(chat_ctx, timeout=timeout))
+        # Shielded so one caller being cancelled does not cancel the other's prediction
+        return await asyncio.shield(self._last_prediction)
+
+    def warm_up(self) -> None:
+        """Attach to the inference process and run one throwaway prediction, so the first real turn skips both."""
+        if self._warm_up_task is None:
+            self._warm_up_task = asyncio.create_task(self._warm_up())
+
+    async def _warm_up(self) -> None:
+        chat_ctx = llm.ChatContext()
+        for role, text in _WARM_UP_TURNS:
+            chat_ctx.append(role=role, text=text)
+        started = time.perf_counter()
+        try:
+            await self.predict_end_of_turn(chat_ctx)
+            logger.info(f"Turn detector attached and warmed up in {time.perf_counter() - started:.3f}s")
+        except Exception as e:
+            # Real turns retry on their own; fall back to endpointing delays until then
+            logger.warning(f"Turn detector warm-up failed: {e}")
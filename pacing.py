@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, FrozenSet, List, Optional
+
+from livekit.agents import llm, metrics
+
+from telemetry import ProcessMetrics
+
+logger = logging.getLogger("vision-voice-agent")
+
+# Remaining time (seconds) below which every LLM request carries a pacing hint
+DEFAULT_WRAP_UP_SECONDS = 120.0
+# Share of a provided question's content words the agent has to say for it to count as asked
+QUESTION_MATCH_RATIO = 0.6
+
+_WORD = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset(
+    "about after also been before could does from have into just more over some than that their them then there "
+    "these they this tell what when where which while with would your you're".split()
+)
+
+
+def _content_words(text: str) -> FrozenSet[str]:
+    return frozenset(w for w in _WORD.findall(text.lower()) if len(w) > 3 and w not in _STOPWORDS)
+
+
+@dataclass
+class PacingStats:
+    """Time budget use of one interview."""
+
+    budget_seconds: float
+    elapsed_seconds: float = 0.0
+    questions: int = 0
+    questions_asked: int = 0
+    hints: int = 0
+    ended_by_budget: bool = False
+    # Billed STT and TTS audio after the budget ran out; what enforcing the budget saves
+    stt_seconds_over_budget: float = 0.0
+    tts_seconds_over_budget: float = 0.0
+
+    @property
+    def overrun_seconds(self) -> float:
+        return max(0.0, self.elapsed_seconds - self.budget_seconds)
+
+    def describe(self) -> str:
+        return (
+            f"elapsed={self.elapsed_seconds / 60:.1f}/{self.budget_seconds / 60:.0f} min, "
+            f"questions_asked={self.questions_asked}/{self.questions}, hints={self.hints}, "
+            f"ended_by_budget={self.ended_by_budget}, overrun={self.overrun_seconds:.0f}s, "
+            f"stt_over_budget={self.stt_seconds_over_budget:.0f}s, tts_over_budget={self.tts_seconds_over_budget:.0f}s"
+        )
+
+
+class InterviewPacer:
+    """Keeps an interview within max_interview_minutes.
+
+    The budget is only stated in the system prompt, which the LLM cannot keep
+    track of. The pacer follows elapsed time and which provided questions the
+    agent has asked (matched on their content words in the agent's committed
+    speech). Once less than wrap_up_seconds remain, hint() returns a
+    one-sentence system message for the turn's request only, so it never
+    piles up in the transcript and costs nothing before the wrap-up window.
+    run() waits for the budget and hands over to the goodbye and disconnect
+    path when enforce is set; with enforce off the interview continues, and
+    the STT/TTS audio billed past the budget is what enforcing would save.
+    """
+
+    def __init__(
+        self,
+        max_interview_minutes: int,
+        questions: List[str],
+        wrap_up_seconds: float = DEFAULT_WRAP_UP_SECONDS,
+        enforce: bool = True,
+        started_at: Optional[float] = None,
+    ) -> None:
+        self._budget = max_interview_minutes * 60.0
+        self._wrap_up = wrap_up_seconds
+        self._started_at = time.time() if started_at is None else started_at
+        self._questions = [_content_words(q) for q in questions]
+        self._asked = [not words for words in self._questions]
+        self.enforce = enforce
+        self.stats = PacingStats(budget_seconds=self._budget, questions=len(questions))
+
+    @classmethod
+    def from_env(
+        cls, max_interview_minutes: int, questions: List[str], started_at: Optional[float] = None
+    ) -> "InterviewPacer":
+        return cls(
+            max_interview_minutes,
+            questions,
+            wrap_up_seconds=float(os.getenv("PACING_WRAP_UP_SECONDS", DEFAULT_WRAP_UP_SECONDS)),
+            enforce=os.getenv("PACING_ENFORCE_BUDGET", "1") != "0",
+            started_at=started_at,
+        )
+
+    @property
+    def elapsed(self) -> float:
+        return time.time() - self._started_at
+
+    @property
+    def remaining(self) -> float:
+        return self._budget - self.elapsed
+
+    @property
+    def questions_remaining(self) -> int:
+        return self._asked.count(False)
+
+    def on_agent_speech(self, text: str) -> None:
+        """Mark the provided questions the agent just asked."""
+        spoken = _content_words(text)
+        for i, words in enumerate(self._questions):
+            if not self._asked[i] and len(words & spoken) >= QUESTION_MATCH_RATIO * len(words):
+                self._asked[i] = True
+                self.stats.questions_asked += 1
+
+    def on_metrics(self, agent_metrics: metrics.AgentMetrics) -> None:
+        """Count billed audio once the budget is spent."""
+        if self.remaining > 0:
+            return
+        if isinstance(agent_metrics, metrics.STTMetrics):
+            self.stats.stt_seconds_over_budget += agent_metrics.audio_duration
+        elif isinstance(agent_metrics, metrics.TTSMetrics):
+            self.stats.tts_seconds_over_budget += agent_metrics.audio_duration
+
+    def hint(self, live: bool = True) -> Optional[llm.ChatMessage]:
+        """A short system message for this turn's request once the interview is in its wrap-up window.
+
+        Only live requests are counted; a speculative reply that is never played still gets the hint.
+        """
+        remaining = self.remaining
+        if remaining > self._wrap_up:
+            return None
+        if live:
+            self.stats.hints += 1
+        minutes = max(0, round(remaining / 60))
+        time_left = f"about {minutes} minute{'s' if minutes != 1 else ''}" if minutes else "less than a minute"
+        if self.questions_remaining:
+            plan = (
+                f"{self.questions_remaining} provided question{'s' if self.questions_remaining != 1 else ''} "
+                "not asked yet: ask only the most important one, briefly, then wrap up"
+            )
+        else:
+            plan = "Start wrapping up"
+        return llm.ChatMessage(role="system", content=f"Time check: {time_left} left. {plan}.")
+
+    async def run(self, on_budget: Callable[[], Awaitable[bool]]) -> None:
+        """Wait until the budget is spent, then end the interview if the budget is enforced.
+
+        on_budget returns False when the interview was already ending for another reason.
+        """
+        while self.remaining > 0:
+            await asyncio.sleep(self.remaining)
+        if not self.enforce:
+            logger.info(f"Interview budget of {self._budget / 60:.0f} minutes reached, not enforced")
+            return
+        logger.info(f"Interview budget of {self._budget / 60:.0f} minutes reached, ending the interview")
+        self.stats.ended_by_budget = await on_budget()
+
+    def finish(self, process_metrics: ProcessMetrics) -> PacingStats:
+        """Close the session's accounting and export it."""
+        self.stats.elapsed_seconds = self.elapsed
+        process_metrics.observe("intervita_interview_minutes", self.stats.elapsed_seconds / 60)
+        process_metrics.inc("intervita_interview_overrun_seconds_total", self.stats.overrun_seconds)
+        process_metrics.inc(
+            "intervita_api_audio_seconds_over_budget_total",
+            self.stats.stt_seconds_over_budget + self.stats.tts_seconds_over_budget,
+        )
+        process_metrics.inc("intervita_pacing_hints_total", self.stats.hints)
+        if self.stats.ended_by_budget:
+            process_metrics.inc("intervita_interviews_ended_by_budget_total")
+        return self.stats
@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger("vision-voice-agent")
+
+DEFAULT_PHRASES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "end_phrases.json")
+
+# Strength classes in priority order: a strong match anywhere in the text wins over a weak one
+STRENGTHS = ("strong", "weak")
+
+
+@dataclass(frozen=True)
+class PhraseMatch:
+    """A matched end-of-conversation phrase and its strength class."""
+
+    phrase: str
+    strength: str
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and unify apostrophes so STT output matches the configured phrases."""
+    return text.lower().replace("’", "'")
+
+
+class PhraseMatcher:
+    """Single precompiled regex matching end-of-conversation phrases on word boundaries.
+
+    Every phrase of every strength class is compiled into one alternation with a
+    named group per class, so a transcript is scanned once regardless of how many
+    phrases or locales are configured.
+    """
+
+    def __init__(self, phrases: Dict[str, Iterable[str]]) -> None:
+        groups = []
+        self._phrases: Dict[str, List[str]] = {}
+        for strength in STRENGTHS:
+            unique = sorted({normalize_text(p).strip() for p in phrases.get(strength, ()) if p.strip()})
+            self._phrases[strength] = unique
+            if not unique:
+                continue
+            groups.append(f"(?P<{strength}>{_trie_pattern(unique)})")
+        self._pattern = re.compile(r"\b(?:" + "|".join(groups) + r")\b") if groups else None
+
+    @property
+    def phrases(self) -> Dict[str, List[str]]:
+        return self._phrases
+
+    def match(self, text: str) -> Optional[PhraseMatch]:
+        """Return the strongest phrase found in text, or None."""
+        return self.match_normalized(normalize_text(text))
+
+    def match_normalized(self, text: str) -> Optional[PhraseMatch]:
+        """Like match(), for text that has already been through normalize_text()."""
+        if self._pattern is None:
+            return None
+        first_weak: Optional[PhraseMatch] = None
+        for m in self._pattern.finditer(text):
+            strength = m.lastgroup
+            if strength == "strong":
+                return PhraseMatch(m.group(strength), strength)
+            if first_weak is None:
+                first_weak = PhraseMatch(m.group(strength), strength)
+        return first_weak
+
+
+def _trie_pattern(phrases: Iterable[str]) -> str:
+    """Build a prefix-factored alternation, e.g. ["need to go", "need to run"] -> "need\\ to\\ (?:go|run)".
+
+    Factoring shared prefixes lets the regex engine reject most positions after a
+    single character instead of trying every phrase in turn. Longer continuations
+    are tried first so "that's all i have" wins over "that's all".
+    """
+    trie: Dict[str, dict] = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        terminal = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        # Prefer the longest continuation, ending here is the last resort
+        branches.sort(key=len, reverse=True)
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if terminal else body
+
+    return build(trie)
+
+
+def load_phrase_config(path: Optional[str] = None, locales: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    """Load phrase lists from a JSON config and merge the requested locales.
+
+    The file maps locale codes to {"strong": [...], "weak": [...]}. When locales
+    is None, every locale in the file is loaded.
+    """
+    path = path or DEFAULT_PHRASES_PATH
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+
+    available = config.get("locales", {})
+    selected = list(locales) if locales is not None else list(available)
+    merged: Dict[str, List[str]] = {strength: [] for strength in STRENGTHS}
+    for locale in selected:
+        if locale not in available:
+            logger.warning(f"No end-of-conversation phrases configured for locale {locale!r}")
+            continue
+        for strength in STRENGTHS:
+            merged[strength].extend(available[locale].get(strength, []))
+    return merged
+
+
+def build_phrase_matcher_from_env() -> PhraseMatcher:
+    """Build the matcher from END_PHRASES_PATH and END_PHRASE_LOCALES (comma separated)."""
+    locales_env = os.getenv("END_PHRASE_LOCALES", "")
+    locales = [l.strip() for l in locales_env.split(",") if l.strip()] or None
+    matcher = PhraseMatcher(load_phrase_config(os.getenv("END_PHRASES_PATH"), locales))
+    logger.info(
+        "Loaded end-of-conversation phrases: "
+        + ", ".join(f"{strength}={len(p)}" for strength, p in matcher.phrases.items())
+    )
+    return matcher
@@ -0,0 +1,555 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Deque, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar, Union
+
+import aiohttp
+import httpx
+import openai as openai_sdk
+from livekit.agents import APIError, llm, metrics, stt, tts, utils
+from livekit.agents.types import APIConnectOptions
+from livekit.plugins import cartesia, deepgram, openai
+
+from telemetry import ProcessMetrics
+
+logger = logging.getLogger("vision-voice-agent")
+
+LLM_MODEL = "gpt-4o-mini"
+TTS_MODEL = "aura-luna-en"
+TTS_SAMPLE_RATE = 32000
+
+# Rolling window of latency samples per provider (seconds)
+DEFAULT_LATENCY_WINDOW = 120.0
+# A provider is only judged slow once it has this many samples in the window
+DEFAULT_MIN_SAMPLES = 5
+# p95 time to first token / first audio byte above which requests go to the next provider
+DEFAULT_LLM_TTFT_THRESHOLD = 1.5
+DEFAULT_TTS_TTFB_THRESHOLD = 0.8
+# Latency recorded for a failed request, so errors also push traffic away from a provider
+ERROR_LATENCY = 10.0
+
+# Routed streams relay the provider's stream, which does its own retries
+_RELAY_CONN_OPTIONS = APIConnectOptions(max_retry=0)
+
+# Idle connections stay open across the pauses between turns (aiohttp's default is 15s)
+KEEPALIVE_TIMEOUT = 120.0
+DNS_CACHE_TTL = 300
+PRECONNECT_TIMEOUT = 5.0
+DEEPGRAM_URL = "https://api.deepgram.com/"
+CARTESIA_URL = "https://api.cartesia.ai/"
+
+
+class LatencyWindow:
+    """Latency samples of one provider over the last window seconds."""
+
+    def __init__(self, window: float = DEFAULT_LATENCY_WINDOW) -> None:
+        self._window = window
+        self._samples: Deque[Tuple[float, float]] = deque()
+
+    def add(self, seconds: float, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._samples.append((now, seconds))
+        self._expire(now)
+
+    def percentiles(self, now: Optional[float] = None) -> Tuple[int, float, float]:
+        """Sample count, p50 and p95 of the current window."""
+        self._expire(time.monotonic() if now is None else now)
+        if not self._samples:
+            return 0, 0.0, 0.0
+        ordered = sorted(seconds for _, seconds in self._samples)
+        last = len(ordered) - 1
+        return len(ordered), ordered[round(0.5 * last)], ordered[round(0.95 * last)]
+
+    def _expire(self, now: float) -> None:
+        while self._samples and self._samples[0][0] < now - self._window:
+            self._samples.popleft()
+
+
+class ProviderLatency:
+    """Rolling p50/p95 per provider, shared by every interview in the process.
+
+    Samples age out of the window, so a provider that stopped receiving
+    traffic because it was slow falls below min_samples and gets requests
+    again: recovery needs no separate probe.
+    """
+
+    def __init__(self, window: float = DEFAULT_LATENCY_WINDOW, min_samples: int = DEFAULT_MIN_SAMPLES) -> None:
+        self._window = window
+        self._min_samples = min_samples
+        self._lock = threading.Lock()
+        self._windows: Dict[str, LatencyWindow] = {}
+
+    @classmethod
+    def from_env(cls) -> "ProviderLatency":
+        return cls(
+            window=float(os.getenv("PROVIDER_LATENCY_WINDOW", DEFAULT_LATENCY_WINDOW)),
+            min_samples=int(os.getenv("PROVIDER_MIN_SAMPLES", DEFAULT_MIN_SAMPLES)),
+        )
+
+    def record(self, provider: str, seconds: float) -> None:
+        with self._lock:
+            window = self._windows.get(provider)
+            if window is None:
+                window = self._windows[provider] = LatencyWindow(self._window)
+            window.add(seconds)
+
+    def percentiles(self, provider: str) -> Tuple[int, float, float]:
+        with self._lock:
+            window = self._windows.get(provider)
+            return window.percentiles() if window is not None else (0, 0.0, 0.0)
+
+    def is_slow(self, provider: str, threshold: float) -> bool:
+        count, _, p95 = self.percentiles(provider)
+        return count >= self._min_samples and p95 > threshold
+
+    def describe(self, providers: Sequence[str]) -> str:
+        parts = []
+        for provider in providers:
+            count, p50, p95 = self.percentiles(provider)
+            parts.append(f"{provider} n={count} p50={p50 * 1000:.0f}ms p95={p95 * 1000:.0f}ms")
+        return ", ".join(parts)
+
+
+_provider_latency: Optional[ProviderLatency] = None
+_provider_latency_lock = threading.Lock()
+
+
+def get_provider_latency() -> ProviderLatency:
+    """Return this process's ProviderLatency, creating it on first use."""
+    global _provider_latency
+    with _provider_latency_lock:
+        if _provider_latency is None:
+            _provider_latency = ProviderLatency.from_env()
+        return _provider_latency
+
+
+T = TypeVar("T")
+
+
+class LatencyRouter(Generic[T]):
+    """Picks the provider for each request: the first configured one whose p95 is under threshold.
+
+    When every provider is over threshold the one with the lowest p50 is used.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        providers: List[Tuple[str, T]],
+        threshold: float,
+        latency: ProviderLatency,
+        process_metrics: ProcessMetrics,
+    ) -> None:
+        self._kind = kind
+        self._providers = providers
+        self._threshold = threshold
+        self._latency = latency
+        self._process_metrics = process_metrics
+        self._current = providers[0][0]
+        self.failovers = 0
+
+    @property
+    def providers(self) -> List[Tuple[str, T]]:
+        return self._providers
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name, _ in self._providers]
+
+    def pick(self) -> Tuple[str, T]:
+        chosen = next(
+            ((name, p) for name, p in self._providers if not self._latency.is_slow(name, self._threshold)),
+            None,
+        )
+        if chosen is None:
+            chosen = min(self._providers, key=lambda item: self._latency.percentiles(item[0])[1])
+        name = chosen[0]
+        if name != self._current:
+            logger.warning(
+                f"Switching {self._kind} provider from {self._current} to {name} "
+                f"(threshold p95 {self._threshold * 1000:.0f}ms; {self._latency.describe(self.names)})"
+            )
+            self._current = name
+        if name != self._providers[0][0]:
+            self.failovers += 1
+            self._process_metrics.inc("intervita_provider_failovers_total")
+        return chosen
+
+    def record(self, name: str, latency: float, error: bool) -> None:
+        """Add a request's time to first token/byte; negative means none arrived (e.g. cancelled)."""
+        if error:
+            self._process_metrics.inc("intervita_provider_errors_total")
+            self._latency.record(name, ERROR_LATENCY)
+        elif latency >= 0:
+            self._latency.record(name, latency)
+
+
+async def _relay(
+    router: LatencyRouter,
+    name: str,
+    stream: Union[llm.LLMStream, tts.ChunkedStream, tts.SynthesizeStream],
+    event_ch: utils.aio.Chan,
+) -> None:
+    """Forward a provider stream's events; failing before the first one counts against the provider.
+
+    A failed request never reaches the provider's metrics as an error (its
+    time to first token is just -1), so it is recorded here.
+    """
+    received = False
+    try:
+        async with stream:
+            async for event in stream:
+                received = True
+                event_ch.send_nowait(event)
+    except (APIError, asyncio.TimeoutError) as e:
+        if not received:
+            logger.warning(f"{name} failed before its first chunk: {e}")
+            router.record(name, -1.0, error=True)
+        raise
+
+
+class _RoutedLLMStream(llm.LLMStream):
+    def __init__(self, routed_llm: "RoutedLLM", name: str, stream: llm.LLMStream) -> None:
+        super().__init__(
+            routed_llm, chat_ctx=stream.chat_ctx, fnc_ctx=stream.fnc_ctx, conn_options=_RELAY_CONN_OPTIONS
+        )
+        self._router = routed_llm.router
+        self._name = name
+        self._stream = stream
+
+    @property
+    def function_calls(self) -> List[llm.FunctionCallInfo]:
+        return self._stream.function_calls
+
+    def execute_functions(self) -> List[llm.CalledFunction]:
+        return self._stream.execute_functions()
+
+    async def _metrics_monitor_task(self, event_aiter: AsyncIterator[llm.ChatChunk]) -> None:
+        # The provider's own metrics are forwarded by RoutedLLM
+        async for _ in event_aiter:
+            pass
+
+    async def _run(self) -> None:
+        await _relay(self._router, self._name, self._stream, self._event_ch)
+
+
+class RoutedLLM(llm.LLM):
+    """LLM that sends each request to the provider LatencyRouter picks.
+
+    The chosen provider's stream is relayed, so a request that fails or times
+    out before its first token is recorded against that provider. Time to first
+    token is read from each provider's metrics and forwarded as this LLM's
+    metrics.
+    """
+
+    def __init__(self, router: LatencyRouter[llm.LLM]) -> None:
+        instances = [instance for _, instance in router.providers]
+        super().__init__(
+            capabilities=llm.LLMCapabilities(
+                supports_choices_on_int=all(i.capabilities.supports_choices_on_int for i in instances),
+                requires_persistent_functions=any(i.capabilities.requires_persistent_functions for i in instances),
+            )
+        )
+        self._router = router
+        for name, instance in router.providers:
+            self._watch(name, instance)
+
+    @property
+    def router(self) -> LatencyRouter[llm.LLM]:
+        return self._router
+
+    def chat(self, **kwargs) -> llm.LLMStream:
+        name, instance = self._router.pick()
+        return _RoutedLLMStream(self, name, instance.chat(**kwargs))
+
+    async def aclose(self) -> None:
+        for _, instance in self._router.providers:
+            await instance.aclose()
+
+    def _watch(self, name: str, instance: llm.LLM) -> None:
+        @instance.on("metrics_collected")
+        def _forward_metrics(agent_metrics: metrics.LLMMetrics) -> None:
+            self._router.record(name, agent_metrics.ttft, agent_metrics.error is not None)
+            self.emit("metrics_collected", agent_metrics)
+
+
+class _RoutedChunkedStream(tts.ChunkedStream):
+    def __init__(self, routed_tts: "RoutedTTS", name: str, stream: tts.ChunkedStream) -> None:
+        super().__init__(tts=routed_tts, input_text=stream.input_text, conn_options=_RELAY_CONN_OPTIONS)
+        self._router = routed_tts.router
+        self._name = name
+        self._stream = stream
+
+    @property
+    def provider(self) -> str:
+        return self._name
+
+    async def _metrics_monitor_task(self, event_aiter: AsyncIterator[tts.SynthesizedAudio]) -> None:
+        # The provider's own metrics are forwarded by RoutedTTS
+        async for _ in event_aiter:
+            pass
+
+    async def _run(self) -> None:
+        await _relay(self._router, self._name, self._stream, self._event_ch)
+
+
+class _RoutedSynthesizeStream(tts.SynthesizeStream):
+    def __init__(self, routed_tts: "RoutedTTS", name: str, stream: tts.SynthesizeStream) -> None:
+        super().__init__(tts=routed_tts, conn_options=_RELAY_CONN_OPTIONS)
+        self._router = routed_tts.router
+        self._name = name
+        self._stream = stream
+
+    @property
+    def provider(self) -> str:
+        return self._name
+
+    async def _metrics_monitor_task(self, event_aiter: AsyncIterator[tts.SynthesizedAudio]) -> None:
+        # The provider's own metrics are forwarded by RoutedTTS
+        async for _ in event_aiter:
+            pass
+
+    async def _run(self) -> None:
+        async def _forward_input() -> None:
+            try:
+                async for data in self._input_ch:
+                    if isinstance(data, self._FlushSentinel):
+                        self._stream.flush()
+                    else:
+                        self._stream.push_text(data)
+                self._stream.end_input()
+            except RuntimeError:
+                pass  # the provider's stream closed; _relay reports why
+
+        forward_task = asyncio.create_task(_forward_input())
+        try:
+            await _relay(self._router, self._name, self._stream, self._event_ch)
+        finally:
+            await utils.aio.gracefully_cancel(forward_task)
+
+
+class RoutedTTS(tts.TTS):
+    """TTS that starts each synthesis on the provider LatencyRouter picks, by time to first byte.
+
+    As with RoutedLLM, a synthesis that fails or times out before its first
+    audio is recorded against the provider. Each stream's provider tells
+    CachedTTS which voice the audio is in.
+
+    Every provider has to produce the same sample rate and channel count, since
+    the pipeline's audio source is set up once per session.
+    """
+
+    def __init__(self, router: LatencyRouter[tts.TTS]) -> None:
+        instances = [instance for _, instance in router.providers]
+        first = instances[0]
+        for name, instance in router.providers:
+            if (instance.sample_rate, instance.num_channels) != (first.sample_rate, first.num_channels):
+                raise ValueError(
+                    f"TTS provider {name} produces {instance.sample_rate}Hz/{instance.num_channels}ch, "
+                    f"expected {first.sample_rate}Hz/{first.num_channels}ch"
+                )
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=all(i.capabilities.streaming for i in instances)),
+            sample_rate=first.sample_rate,
+            num_channels=first.num_channels,
+        )
+        self._router = router
+        for name, instance in router.providers:
+            self._watch(name, instance)
+
+    @property
+    def router(self) -> LatencyRouter[tts.TTS]:
+        return self._router
+
+    @property
+    def primary(self) -> str:
+        """The preferred provider, whose voice the pre-synthesized lines are in."""
+        return self._router.names[0]
+
+    def synthesize(self, text: str, *, conn_options: Optional[APIConnectOptions] = None) -> tts.ChunkedStream:
+        name, instance = self._router.pick()
+        return _RoutedChunkedStream(self, name, instance.synthesize(text, conn_options=conn_options))
+
+    def stream(self, *, conn_options: Optional[APIConnectOptions] = None) -> tts.SynthesizeStream:
+        name, instance = self._router.pick()
+        return _RoutedSynthesizeStream(self, name, instance.stream(conn_options=conn_options))
+
+    def prewarm(self) -> None:
+        for _, instance in self._router.providers:
+            instance.prewarm()
+
+    async def aclose(self) -> None:
+        for _, instance in self._router.providers:
+            await instance.aclose()
+
+    def _watch(self, name: str, instance: tts.TTS) -> None:
+        @instance.on("metrics_collected")
+        def _forward_metrics(agent_metrics: metrics.TTSMetrics) -> None:
+            self._router.record(name, agent_metrics.ttfb, agent_metrics.error is not None)
+            self.emit("metrics_collected", agent_metrics)
+
+
+@dataclass
+class ProviderConfig:
+    """Which providers an interview uses, in order of preference."""
+
+    llm_fallback_model: Optional[str] = None
+    # OpenAI-compatible endpoint for the fallback model; unset uses the primary's endpoint
+    llm_fallback_base_url: Optional[str] = None
+    llm_fallback_api_key: Optional[str] = None
+    tts_fallback: bool = False
+    cartesia_voice: Optional[str] = None
+    llm_ttft_threshold: float = DEFAULT_LLM_TTFT_THRESHOLD
+    tts_ttfb_threshold: float = DEFAULT_TTS_TTFB_THRESHOLD
+
+    @classmethod
+    def from_env(cls) -> "ProviderConfig":
+        return cls(
+            llm_fallback_model=os.getenv("LLM_FALLBACK_MODEL") or None,
+            llm_fallback_base_url=os.getenv("LLM_FALLBACK_BASE_URL") or None,
+            llm_fallback_api_key=os.getenv("LLM_FALLBACK_API_KEY") or None,
+            # Cartesia takes over slow TTS requests whenever it has an API key
+            tts_fallback=bool(os.getenv("CARTESIA_API_KEY")) and os.getenv("TTS_FALLBACK", "1") != "0",
+            cartesia_voice=os.getenv("CARTESIA_VOICE") or None,
+            llm_ttft_threshold=float(os.getenv("LLM_TTFT_THRESHOLD", DEFAULT_LLM_TTFT_THRESHOLD)),
+            tts_ttfb_threshold=float(os.getenv("TTS_TTFB_THRESHOLD", DEFAULT_TTS_TTFB_THRESHOLD)),
+        )
+
+
+class ProviderPool:
+    """STT, LLM and TTS clients of one interview, all on two kept-alive connection pools.
+
+    Deepgram and Cartesia share one aiohttp session and every OpenAI-compatible
+    client (pipeline LLM, fallback LLM, transcript summaries) shares one httpx
+    client, both keeping idle connections open across the pauses between turns.
+    The pool is per interview, not per process: LiveKit runs every job on its
+    own event loop and aiohttp and httpx sessions only work on the loop that
+    created them, so connections cannot outlive the interview. The latency each
+    provider shows is process-wide (ProviderLatency), so every interview in a
+    thread-executor process routes on what the others have seen; a job process
+    in process mode starts with an empty history. Only the LLM and TTS are
+    routed. preconnect() opens TLS connections to the provider hosts while the
+    greeting plays, so the first candidate turn does not pay for handshakes.
+    """
+
+    def __init__(
+        self,
+        config: ProviderConfig,
+        process_metrics: ProcessMetrics,
+        latency: Optional[ProviderLatency] = None,
+    ) -> None:
+        self._config = config
+        self._process_metrics = process_metrics
+        self._latency = latency or get_provider_latency()
+        self._http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(keepalive_timeout=KEEPALIVE_TIMEOUT, ttl_dns_cache=DNS_CACHE_TTL),
+        )
+        self._httpx_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(connect=15.0, read=5.0, write=5.0, pool=5.0),
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=50, keepalive_expiry=KEEPALIVE_TIMEOUT),
+        )
+        # Reads OPENAI_API_KEY and OPENAI_BASE_URL, so a local mock server can stand in for the API
+        self._openai_client = openai_sdk.AsyncClient(max_retries=0, http_client=self._httpx_client)
+        self._routers: List[LatencyRouter] = []
+
+    @classmethod
+    def from_env(cls, process_metrics: ProcessMetrics) -> "ProviderPool":
+        return cls(ProviderConfig.from_env(), process_metrics)
+
+    @property
+    def http_session(self) -> aiohttp.ClientSession:
+        return self._http_session
+
+    def create_stt(self) -> stt.STT:
+        # One websocket for the whole interview, so there is no per-request choice to make
+        return deepgram.STT(http_session=self._http_session)
+
+    def create_llm(self) -> llm.LLM:
+        primary = openai.LLM(model=LLM_MODEL, client=self._openai_client)
+        if not self._config.llm_fallback_model:
+            return primary
+        if self._config.llm_fallback_base_url:
+            fallback_client = openai_sdk.AsyncClient(
+                api_key=self._config.llm_fallback_api_key,
+                base_url=self._config.llm_fallback_base_url,
+                max_retries=0,
+                http_client=self._httpx_client,
+            )
+        else:
+            fallback_client = self._openai_client
+        fallback = openai.LLM(model=self._config.llm_fallback_model, client=fallback_client)
+        return RoutedLLM(self._router(
+            "llm",
+            [(f"openai/{LLM_MODEL}", primary), (f"fallback/{self._config.llm_fallback_model}", fallback)],
+            self._config.llm_ttft_threshold,
+        ))
+
+    def create_summary_llm(self) -> llm.LLM:
+        # Separate instance so summary requests never show up as the pipeline's LLM metrics
+        return openai.LLM(model=LLM_MODEL, temperature=0.2, client=self._openai_client)
+
+    def create_tts(self) -> tts.TTS:
+        primary = deepgram.tts.TTS(model=TTS_MODEL, sample_rate=TTS_SAMPLE_RATE, http_session=self._http_session)
+        if not self._config.tts_fallback:
+            return primary
+        cartesia_options = {"voice": self._config.cartesia_voice} if self._config.cartesia_voice else {}
+        fallback = cartesia.TTS(sample_rate=TTS_SAMPLE_RATE, http_session=self._http_session, **cartesia_options)
+        return RoutedTTS(self._router(
+            "tts",
+            [(f"deepgram/{TTS_MODEL}", primary), ("cartesia", fallback)],
+            self._config.tts_ttfb_threshold,
+        ))
+
+    async def preconnect(self, speech: bool = True) -> None:
+        """Open a kept-alive connection to every configured provider host; failures only cost the warm-up.
+
+        speech=False leaves out the Deepgram and Cartesia hosts, for LLM-only runs.
+        """
+        started = time.perf_counter()
+        urls = []
+        if speech:
+            urls.append(DEEPGRAM_URL)
+            if self._config.tts_fallback:
+                urls.append(CARTESIA_URL)
+        openai_urls = {str(self._openai_client.base_url)}
+        if self._config.llm_fallback_base_url:
+            openai_urls.add(self._config.llm_fallback_base_url)
+        results = await asyncio.gather(
+            *(self._preconnect_aiohttp(url) for url in urls),
+            *(self._preconnect_httpx(url) for url in openai_urls),
+            return_exceptions=True,
+        )
+        failed = [str(r) for r in results if isinstance(r, BaseException)]
+        if failed:
+            logger.warning(f"Could not preconnect to every provider: {'; '.join(failed)}")
+        logger.info(f"Preconnected to {len(results) - len(failed)}/{len(results)} provider hosts in {time.perf_counter() - started:.3f}s")
+
+    def describe(self) -> str:
+        """Per-provider latency and failovers of the routed providers."""
+        return "; ".join(
+            f"{router._kind}: {self._latency.describe(router.names)}, failovers={router.failovers}"
+            for router in self._routers
+        ) or "single provider per kind"
+
+    async def aclose(self) -> None:
+        await self._http_session.close()
+        await self._httpx_client.aclose()
+
+    def _router(self, kind: str, providers: List[Tuple[str, T]], threshold: float) -> LatencyRouter[T]:
+        router = LatencyRouter(kind, providers, threshold, self._latency, self._process_metrics)
+        self._routers.append(router)
+        return router
+
+    async def _preconnect_aiohttp(self, url: str) -> None:
+        timeout = aiohttp.ClientTimeout(total=PRECONNECT_TIMEOUT)
+        # Any response (usually 401/404) leaves the connection open in the session's pool
+        async with self._http_session.head(url, timeout=timeout) as response:
+            await response.read()
+
+    async def _preconnect_httpx(self, url: str) -> None:
+        await self._httpx_client.head(url, timeout=PRECONNECT_TIMEOUT)
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Set
+
+from livekit.agents import JobExecutorType
+
+from telemetry import ProcessMetrics
+
+logger = logging.getLogger("vision-voice-agent")
+
+DEFAULT_MAX_CPU_SHARE = 0.5
+DEFAULT_MAX_PENDING_TASKS = 32
+# Window the per-room CPU share is measured over (seconds)
+CPU_CHECK_INTERVAL = 2.0
+
+_shared_lock = threading.Lock()
+_shared: Dict[str, Any] = {}
+
+
+def job_executor_type() -> JobExecutorType:
+    """JOB_EXECUTOR_MODE: "process" (one interview per process) or "thread" (interviews share a process)."""
+    mode = os.getenv("JOB_EXECUTOR_MODE", JobExecutorType.PROCESS.value).lower()
+    try:
+        return JobExecutorType(mode)
+    except ValueError:
+        logger.warning(f"Unknown JOB_EXECUTOR_MODE {mode!r}, using process")
+        return JobExecutorType.PROCESS
+
+
+def shared(key: str, factory: Callable[[], Any]) -> Any:
+    """Build a component once per OS process and hand the same instance to every prewarm.
+
+    With the process executor prewarm runs once per process anyway. With the
+    thread executor it runs for every job thread, and without this each room
+    would load its own copy of the VAD weights, TTS cache and encoder pool.
+    Only components that are safe to use from several event loops belong here.
+    """
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = factory()
+        return _shared[key]
+
+
+@dataclass
+class RoomLimits:
+    """Per-room resource limits, enforced by RoomTaskGroup."""
+
+    # CPU time the room's event loop may use per wall-clock second before it sheds optional work
+    max_cpu_share: float = DEFAULT_MAX_CPU_SHARE
+    # Background tasks a room may have in flight before new optional ones are refused
+    max_pending_tasks: int = DEFAULT_MAX_PENDING_TASKS
+
+    @classmethod
+    def from_env(cls) -> "RoomLimits":
+        return cls(
+            max_cpu_share=float(os.getenv("ROOM_MAX_CPU_SHARE", DEFAULT_MAX_CPU_SHARE)),
+            max_pending_tasks=int(os.getenv("ROOM_MAX_PENDING_TASKS", DEFAULT_MAX_PENDING_TASKS)),
+        )
+
+
+@dataclass
+class RoomTaskStats:
+    """Per-room totals of background tasks and CPU use."""
+
+    started: int = 0
+    failed: int = 0
+    rejected: int = 0
+    cpu_seconds: float = 0.0
+    peak_cpu_share: float = 0.0
+    # CPU checks that found the room over its share
+    throttled_checks: int = 0
+
+    def describe(self) -> str:
+        return (
+            f"tasks_started={self.started}, failed={self.failed}, rejected={self.rejected}, "
+            f"cpu={self.cpu_seconds:.1f}s, peak_cpu_share={self.peak_cpu_share:.2f}, "
+            f"throttled_checks={self.throttled_checks}"
+        )
+
+
+class RoomTaskGroup:
+    """Owns every background task one interview starts and keeps its failures inside the room.
+
+    A task that raises cancels the rest of the group (silence prompts, disconnect
+    timers, goodbyes) and calls on_failure, so a broken room ends on its own
+    while other rooms in the same process carry on. When more than
+    max_pending_tasks are in flight, optional tasks are refused instead of queued.
+
+    CPU is measured with time.thread_time() from the room's own event loop. Under
+    the thread executor every job runs its loop on a dedicated thread, so this is
+    exactly the room's CPU; under the process executor it is the job process's
+    main thread. Work handed to executor threads (frame encoding) is not
+    included. A room above max_cpu_share reports over_budget, which callers
+    use to skip optional work (camera frames) until it drops back.
+    """
+
+    def __init__(
+        self,
+        room_name: str,
+        process_metrics: ProcessMetrics,
+        limits: Optional[RoomLimits] = None,
+        on_failure: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self._room_name = room_name
+        self._process_metrics = process_metrics
+        self._limits = limits or RoomLimits()
+        self._on_failure = on_failure
+        self._tasks: Set[asyncio.Task] = set()
+        self._cleanups: List[Callable[[], None]] = []
+        self._closed = False
+        self._over_budget = False
+        self._cpu_task: Optional[asyncio.Task] = None
+        self.stats = RoomTaskStats()
+
+    @property
+    def over_budget(self) -> bool:
+        return self._over_budget
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def start(self) -> None:
+        """Start measuring the room's CPU share."""
+        if self._cpu_task is None:
+            self._cpu_task = asyncio.create_task(self._watch_cpu())
+
+    def create_task(
+        self, coro: Coroutine, name: Optional[str] = None, essential: bool = False
+    ) -> Optional[asyncio.Task]:
+        """Run coro as part of this room; optional work is refused when the room is backed up.
+
+        Essential tasks (goodbyes, disconnects, cleanup) are always accepted while
+        the group is open.
+        """
+        if self._closed or (not essential and len(self._tasks) >= self._limits.max_pending_tasks):
+            coro.close()
+            self.stats.rejected += 1
+            self._process_metrics.inc("intervita_room_tasks_rejected_total")
+            if not self._closed:
+                logger.warning(
+                    f"Room {self._room_name} has {len(self._tasks)} tasks in flight, refusing {name or 'task'}"
+                )
+            return None
+        task = asyncio.create_task(coro, name=name)
+        self._tasks.add(task)
+        self.stats.started += 1
+        task.add_done_callback(self._on_task_done)
+        return task
+
+    def add_cleanup(self, callback: Callable[[], None]) -> None:
+        """Run callback when the group closes or fails, e.g. to disarm a timer that is not a task."""
+        self._cleanups.append(callback)
+
+    async def aclose(self) -> None:
+        """Cancel everything still running in the room and wait for it to finish."""
+        self._closed = True
+        self._run_cleanups()
+        tasks = [t for t in self._tasks if not t.done()]
+        if self._cpu_task is not None:
+            tasks.append(self._cpu_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if task.cancelled() or task.exception() is None:
+            return
+        self.stats.failed += 1
+        self._process_metrics.inc("intervita_room_task_failures_total")
+        error = task.exception()
+        logger.error(
+            f"Task {task.get_name()} failed in room {self._room_name}, ending this room only: {error!r}",
+            exc_info=error,
+        )
+        if self._closed:
+            return
+        self._closed = True
+        self._run_cleanups()
+        for other in list(self._tasks):
+            other.cancel()
+        if self._on_failure is not None:
+            self._on_failure(f"task {task.get_name()} failed: {error!r}")
+
+    def _run_cleanups(self) -> None:
+        cleanups, self._cleanups = self._cleanups, []
+        for callback in cleanups:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Room {self._room_name} cleanup failed: {e}")
+
+    async def _watch_cpu(self) -> None:
+        last_cpu, last_wall = time.thread_time(), time.perf_counter()
+        while True:
+            await asyncio.sleep(CPU_CHECK_INTERVAL)
+            cpu, wall = time.thread_time(), time.perf_counter()
+            used = cpu - last_cpu
+            share = used / max(wall - last_wall, 1e-6)
+            last_cpu, last_wall = cpu, wall
+            self.stats.cpu_seconds += used
+            self.stats.peak_cpu_share = max(self.stats.peak_cpu_share, share)
+            self._process_metrics.inc("intervita_room_cpu_seconds_total", used)
+            over_budget = share > self._limits.max_cpu_share
+            if over_budget:
+                self.stats.throttled_checks += 1
+                self._process_metrics.inc("intervita_room_cpu_throttled_total")
+            if over_budget != self._over_budget:
+                self._over_budget = over_budget
+                if over_budget:
+                    logger.warning(
+                        f"Room {self._room_name} used {share:.2f} CPU over the last {CPU_CHECK_INTERVAL:.0f}s "
+                        f"(limit {self._limits.max_cpu_share:.2f}), shedding optional work"
+                    )
+                else:
+                    logger.info(f"Room {self._room_name} is back within its CPU share ({share:.2f})")
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Set
+
+from livekit import rtc
+
+from telemetry import ProcessMetrics
+
+logger = logging.getLogger("vision-voice-agent")
+
+SESSION_STATE_TOPIC = "session_state"
+# Minimum spacing between two pushes to the same room (seconds)
+DEFAULT_MIN_PUSH_INTERVAL = 0.5
+# Upper bound on pushes per room over a session, whatever the event rate
+DEFAULT_MAX_PUSHES = 2000
+
+
+@dataclass
+class SessionState:
+    """Interview state exposed to the frontend, kept current by the agent's event handlers.
+
+    Every change bumps version; the serialized payload is cached per version
+    so neither get_session_state nor a push re-serializes an unchanged state.
+    elapsed is not part of the cache: clients derive it from started_at, and
+    the RPC adds it at call time.
+    """
+
+    started_at: float
+    max_interview_minutes: int
+    turns: int = 0
+    agent_speaking: bool = False
+    user_speaking: bool = False
+    conversation_ending: bool = False
+    version: int = 0
+
+    def __post_init__(self) -> None:
+        self._payload: Optional[str] = None
+        self._payload_version = -1
+        self._listeners: List[Callable[[], None]] = []
+
+    def on_change(self, listener: Callable[[], None]) -> None:
+        self._listeners.append(listener)
+
+    def update(self, **changes) -> None:
+        """Set fields; listeners only hear about it when a value actually changed."""
+        changed = False
+        for name, value in changes.items():
+            if getattr(self, name) != value:
+                setattr(self, name, value)
+                changed = True
+        if changed:
+            self.version += 1
+            for listener in self._listeners:
+                listener()
+
+    def add_turn(self) -> None:
+        self.update(turns=self.turns + 1)
+
+    def payload(self) -> str:
+        """Compact JSON of the state, serialized once per version."""
+        if self._payload_version != self.version:
+            self._payload = json.dumps(
+                {
+                    "v": self.version,
+                    "started_at": round(self.started_at, 3),
+                    "max_minutes": self.max_interview_minutes,
+                    "turns": self.turns,
+                    "agent_speaking": self.agent_speaking,
+                    "user_speaking": self.user_speaking,
+                    "ending": self.conversation_ending,
+                },
+                separators=(",", ":"),
+            )
+            self._payload_version = self.version
+        return self._payload
+
+    def rpc_payload(self) -> str:
+        """payload() plus the elapsed time at the moment of the call."""
+        elapsed = round(time.time() - self.started_at, 1)
+        return f'{self.payload()[:-1]},"elapsed":{elapsed}}}'
+
+
+class SessionStatePublisher:
+    """Pushes the session state as data messages to participants that subscribed to it.
+
+    Changes are coalesced: a burst of events (speaking flags flip several times
+    per turn) produces one push of the latest state after at most
+    min_interval, never one push per event. Pushes stop after max_pushes, so a
+    flapping client or a noisy room cannot turn the push channel into a flood;
+    get_session_state still answers after that.
+    """
+
+    def __init__(
+        self,
+        room: rtc.Room,
+        state: SessionState,
+        process_metrics: ProcessMetrics,
+        min_interval: float = DEFAULT_MIN_PUSH_INTERVAL,
+        max_pushes: int = DEFAULT_MAX_PUSHES,
+        spawn: Optional[Callable] = None,
+    ) -> None:
+        self._room = room
+        self._state = state
+        self._process_metrics = process_metrics
+        self._min_interval = min_interval
+        self._max_pushes = max_pushes
+        self._spawn = spawn or asyncio.ensure_future
+        self._subscribers: Set[str] = set()
+        self._last_push = 0.0
+        self._pushed_version = -1
+        self._pending: Optional[asyncio.TimerHandle] = None
+        self._closed = False
+        self._limit_logged = False
+        self.pushes = 0
+        self.coalesced = 0
+        self.bytes_sent = 0
+        state.on_change(self.notify)
+
+    @classmethod
+    def from_env(
+        cls, room: rtc.Room, state: SessionState, process_metrics: ProcessMetrics, spawn: Optional[Callable] = None
+    ) -> "SessionStatePublisher":
+        return cls(
+            room,
+            state,
+            process_metrics,
+            min_interval=float(os.getenv("SESSION_STATE_MIN_INTERVAL", DEFAULT_MIN_PUSH_INTERVAL)),
+            max_pushes=int(os.getenv("SESSION_STATE_MAX_PUSHES", DEFAULT_MAX_PUSHES)),
+            spawn=spawn,
+        )
+
+    def subscribe(self, identity: str) -> None:
+        self._subscribers.add(identity)
+        # A new subscriber gets the current state right away instead of waiting for a change
+        self._pushed_version = -1
+        self.notify()
+
+    def unsubscribe(self, identity: str) -> None:
+        self._subscribers.discard(identity)
+
+    def notify(self) -> None:
+        """Called on every state change; schedules at most one push."""
+        if self._closed or not self._subscribers:
+            return
+        if self._pending is not None:
+            self.coalesced += 1
+            self._process_metrics.inc("intervita_session_state_coalesced_total")
+            return
+        loop = asyncio.get_event_loop()
+        delay = max(0.0, self._last_push + self._min_interval - time.monotonic())
+        self._pending = loop.call_later(delay, self._flush)
+
+    def close(self) -> None:
+        self._closed = True
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+
+    def _flush(self) -> None:
+        self._pending = None
+        if self._closed or not self._subscribers or self._state.version == self._pushed_version:
+            return
+        if self.pushes >= self._max_pushes:
+            if not self._limit_logged:
+                self._limit_logged = True
+                logger.warning(f"Session state push limit ({self._max_pushes}) reached, clients must poll from now on")
+            return
+        payload = self._state.payload().encode()
+        self._pushed_version = self._state.version
+        self._last_push = time.monotonic()
+        self.pushes += 1
+        self.bytes_sent += len(payload)
+        self._process_metrics.inc("intervita_session_state_pushes_total")
+        self._spawn(self._publish(payload, sorted(self._subscribers)))
+
+    async def _publish(self, payload: bytes, destinations: List[str]) -> None:
+        try:
+            await self._room.local_participant.publish_data(
+                payload, reliable=True, destination_identities=destinations, topic=SESSION_STATE_TOPIC
+            )
+        except Exception as e:
+            logger.warning(f"Failed to push session state: {e}")
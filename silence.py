@@ -0,0 +1,101 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Coroutine, Optional
+
+logger = logging.getLogger("vision-voice-agent")
+
+DEFAULT_SILENCE_TIMEOUT = 120.0  # 2 minutes of silence triggers the check-in prompt
+DEFAULT_SILENCE_GRACE_PERIOD = 15.0  # time the user gets to answer the prompt
+
+
+class SilenceWatchdog:
+    """Deadline-based silence detection driven by a single scheduled timer.
+
+    Speech activity pushes the deadline back by rescheduling one loop.call_at
+    handle, so there are no periodic wakeups. When the deadline passes,
+    on_silence runs and a grace deadline is armed; only user speech cancels the
+    grace period (the agent's own prompt must not), otherwise on_grace_expired runs.
+    Callbacks run through spawn when given, e.g. a room's task group.
+    """
+
+    def __init__(
+        self,
+        on_silence: Callable[[], Awaitable[None]],
+        on_grace_expired: Callable[[], Awaitable[None]],
+        timeout: float = DEFAULT_SILENCE_TIMEOUT,
+        grace_period: float = DEFAULT_SILENCE_GRACE_PERIOD,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        spawn: Optional[Callable[[Coroutine], Optional[asyncio.Future]]] = None,
+    ) -> None:
+        self._on_silence = on_silence
+        self._on_grace_expired = on_grace_expired
+        self._timeout = timeout
+        self._grace_period = grace_period
+        self._loop = loop or asyncio.get_event_loop()
+        self._spawn = spawn or (lambda coro: asyncio.ensure_future(coro, loop=self._loop))
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._task: Optional[asyncio.Task] = None
+        self._in_grace = False
+        self._stopped = False
+
+    @property
+    def timeout(self) -> float:
+        return self._timeout
+
+    @property
+    def grace_period(self) -> float:
+        return self._grace_period
+
+    def start(self) -> None:
+        self._schedule(self._timeout, self._fire_silence)
+
+    def user_activity(self) -> None:
+        """User speech: leaves the grace period and pushes the silence deadline back."""
+        if self._stopped:
+            return
+        if self._in_grace:
+            logger.info("User responded to silence prompt, resuming interview")
+            self._in_grace = False
+        self._schedule(self._timeout, self._fire_silence)
+
+    def agent_activity(self) -> None:
+        """Agent speech: pushes the silence deadline back, but never ends a grace period."""
+        if self._stopped or self._in_grace:
+            return
+        self._schedule(self._timeout, self._fire_silence)
+
+    def cancel(self) -> None:
+        """Stop the watchdog and cancel any pending timer or callback task."""
+        self._stopped = True
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    def _schedule(self, delay: float, callback: Callable[[], None]) -> None:
+        if self._stopped:
+            return
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = self._loop.call_at(self._loop.time() + delay, callback)
+
+    def _fire_silence(self) -> None:
+        self._handle = None
+        self._in_grace = True
+        self._task = self._spawn(self._run_silence())
+
+    def _fire_grace_expired(self) -> None:
+        self._handle = None
+        if not self._in_grace:
+            return
+        self._stopped = True
+        self._task = self._spawn(self._on_grace_expired())
+
+    async def _run_silence(self) -> None:
+        try:
+            await self._on_silence()
+        except Exception as e:
+            logger.error(f"Error handling silence detection: {e}")
+        if self._in_grace and not self._stopped:
+            self._schedule(self._grace_period, self._fire_grace_expired)
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Set
+
+from livekit.agents import llm, metrics
+from livekit.agents.pipeline.pipeline_agent import SpeechDataContextVar
+
+from telemetry import ProcessMetrics
+
+logger = logging.getLogger("vision-voice-agent")
+
+DEFAULT_EOU_THRESHOLD = 0.15
+# Upper bound on holding back a reply, just past the pipeline's max_endpointing_delay
+DEFAULT_HOLD_TIMEOUT = 6.0
+
+
+@dataclass
+class SpeculationStats:
+    """Outcome counts of speculative replies in one session."""
+
+    hits: int = 0
+    misses: int = 0
+    cancels: int = 0
+    timeouts: int = 0
+    wasted_tokens: int = 0
+
+    def describe(self) -> str:
+        total = self.hits + self.misses
+        hit_rate = self.hits / total if total else 0.0
+        return (
+            f"hits={self.hits}, misses={self.misses}, cancels={self.cancels}, timeouts={self.timeouts}, "
+            f"hit_rate={hit_rate:.0%}, wasted_tokens={self.wasted_tokens}"
+        )
+
+
+@dataclass
+class _Reply:
+    speculating: bool = False
+    tokens: int = 0
+    validated: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class SpeculativeReplies:
+    """Decides which preemptive replies may call the LLM before the turn is confirmed.
+
+    With preemptive_synthesis, VoicePipelineAgent starts a reply (before_llm_cb,
+    LLM, TTS) on every final transcript and only plays it once the endpointing
+    delay confirms the turn; more speech replaces it. gate() lets a reply through
+    right away when the turn detector already rates the transcript as a likely end
+    of turn, and holds it until confirmation otherwise, so unlikely turns cost no
+    more tokens than without speculation.
+
+    Outcomes are tracked per reply (the pipeline's sequence_id):
+    - hit: the reply started early and was confirmed
+    - miss: the turn was confirmed but the reply had been held back
+    - cancel: the reply started early and was replaced because the user kept talking
+    - timeout: a held reply was neither confirmed nor replaced within hold_timeout
+    """
+
+    def __init__(
+        self,
+        eou_model,
+        process_metrics: ProcessMetrics,
+        eou_threshold: float = DEFAULT_EOU_THRESHOLD,
+        hold_timeout: float = DEFAULT_HOLD_TIMEOUT,
+    ) -> None:
+        self._eou_model = eou_model
+        self._process_metrics = process_metrics
+        self._eou_threshold = eou_threshold
+        self._hold_timeout = hold_timeout
+        self._replies: Dict[str, _Reply] = {}
+        self._validated: Set[str] = set()
+        self._cancelled: Set[str] = set()
+        self.stats = SpeculationStats()
+
+    @classmethod
+    def from_env(cls, eou_model, process_metrics: ProcessMetrics) -> "SpeculativeReplies":
+        return cls(
+            eou_model,
+            process_metrics,
+            eou_threshold=float(os.getenv("SPECULATIVE_EOU_THRESHOLD", DEFAULT_EOU_THRESHOLD)),
+        )
+
+    async def gate(self, chat_ctx: llm.ChatContext) -> bool:
+        """Call first thing in before_llm_cb; returns once this reply may call the LLM.
+
+        Returns False when the reply was only released by hold_timeout: the
+        request still goes out in case the confirmation was missed, but the reply
+        will most likely never play, so the caller should leave the session's
+        state (the agent's chat context, schedulers) untouched.
+        """
+        speech_data = SpeechDataContextVar.get(None)
+        if speech_data is None:
+            return True
+        sequence_id = speech_data.sequence_id
+        self._cancel_superseded(sequence_id)
+        reply = self._replies.setdefault(sequence_id, _Reply())
+
+        if sequence_id in self._validated:
+            # Confirmed before before_llm_cb got to run (zero endpointing delay)
+            self._record_miss()
+            return True
+
+        if self._eou_model is not None:
+            try:
+                probability = await self._eou_model.predict_end_of_turn(chat_ctx)
+            except Exception as e:
+                logger.debug(f"Turn detector unavailable for speculation, holding reply: {e}")
+                probability = 0.0
+            if probability < self._eou_threshold:
+                try:
+                    await asyncio.wait_for(reply.validated.wait(), timeout=self._hold_timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"Reply {sequence_id} was never confirmed, releasing it after {self._hold_timeout:.0f}s")
+                    self.stats.timeouts += 1
+                    self._process_metrics.inc("intervita_speculative_timeouts_total")
+                    return False
+                self._record_miss()
+                return True
+
+        reply.speculating = True
+        if sequence_id in self._validated:
+            self._record_hit()
+        return True
+
+    def on_metrics(self, agent_metrics: metrics.AgentMetrics) -> None:
+        """Feed every metrics_collected event; confirmation and token usage arrive here."""
+        if isinstance(agent_metrics, metrics.PipelineEOUMetrics):
+            # Emitted exactly when the pipeline confirms the turn and queues the reply
+            sequence_id = agent_metrics.sequence_id
+            self._validated.add(sequence_id)
+            reply = self._replies.get(sequence_id)
+            if reply is None:
+                return
+            reply.validated.set()
+            if reply.speculating:
+                self._record_hit()
+        elif isinstance(agent_metrics, metrics.PipelineLLMMetrics):
+            tokens = agent_metrics.prompt_tokens + agent_metrics.completion_tokens
+            if agent_metrics.sequence_id in self._cancelled:
+                # Usage of a replaced reply can be reported after it was cancelled
+                self._record_waste(tokens)
+            elif agent_metrics.sequence_id in self._replies:
+                self._replies[agent_metrics.sequence_id].tokens += tokens
+
+    def close(self) -> None:
+        """Settle replies still in flight at the end of the session."""
+        self._cancel_superseded(None)
+
+    def _cancel_superseded(self, current: Optional[str]) -> None:
+        # The pipeline keeps one pending reply; a newer one means the others were replaced
+        for sequence_id in [s for s in self._replies if s != current]:
+            reply = self._replies.pop(sequence_id)
+            if reply.speculating and sequence_id not in self._validated:
+                self._cancelled.add(sequence_id)
+                self.stats.cancels += 1
+                self._process_metrics.inc("intervita_speculative_cancels_total")
+                self._record_waste(reply.tokens)
+
+    def _record_hit(self) -> None:
+        self.stats.hits += 1
+        self._process_metrics.inc("intervita_speculative_hits_total")
+
+    def _record_miss(self) -> None:
+        self.stats.misses += 1
+        self._process_metrics.inc("intervita_speculative_misses_total")
+
+    def _record_waste(self, tokens: int) -> None:
+        if tokens:
+            self.stats.wasted_tokens += tokens
+            self._process_metrics.inc("intervita_speculative_wasted_tokens_total", tokens)
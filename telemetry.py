@@ -0,0 +1,317 @@
+import bisect
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from livekit.agents import metrics
+
+logger = logging.getLogger("vision-voice-agent")
+
+DEFAULT_METRICS_DIR = os.path.join(tempfile.gettempdir(), "intervita-metrics")
+# Snapshots are rewritten at most this often (seconds) while a session is busy
+FLUSH_INTERVAL = 1.0
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+CONTEXT_TOKEN_BUCKETS = (500, 1000, 2000, 3000, 4000, 6000, 8000, 12000, 16000, 32000)
+FRAME_CAPTURE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+INTERVIEW_MINUTE_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 45, 60, 90)
+RPC_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+
+# name -> (help, buckets)
+HISTOGRAMS: Dict[str, Tuple[str, Sequence[float]]] = {
+    "intervita_stt_latency_seconds": ("Delay between end of speech and the final transcript", LATENCY_BUCKETS),
+    "intervita_eou_delay_seconds": ("End-of-utterance delay before the LLM is called", LATENCY_BUCKETS),
+    "intervita_llm_ttft_seconds": ("LLM time to first token", LATENCY_BUCKETS),
+    "intervita_tts_ttfb_seconds": ("TTS time to first audio byte", LATENCY_BUCKETS),
+    "intervita_frame_capture_seconds": ("Camera frame capture and preprocessing time in before_llm_cb", FRAME_CAPTURE_BUCKETS),
+    "intervita_context_tokens": ("Text tokens of the chat context sent to the LLM per turn", CONTEXT_TOKEN_BUCKETS),
+    "intervita_context_tokens_uncompacted": ("Text tokens the same turn would send without transcript compaction", CONTEXT_TOKEN_BUCKETS),
+    "intervita_startup_to_greeting_seconds": ("Time from job start to the greeting's first audio", LATENCY_BUCKETS),
+    "intervita_session_state_rpc_seconds": ("Handling time of the get_session_state RPC", RPC_BUCKETS),
+    "intervita_interview_minutes": ("Wall-clock length of interviews", INTERVIEW_MINUTE_BUCKETS),
+}
+
+# name -> help
+COUNTERS: Dict[str, str] = {
+    "intervita_llm_prompt_tokens_total": "LLM prompt tokens",
+    "intervita_llm_completion_tokens_total": "LLM completion tokens",
+    "intervita_tts_characters_total": "Characters sent to TTS",
+    "intervita_stt_audio_seconds_total": "Audio seconds sent to STT",
+    "intervita_sessions_total": "Interview sessions started",
+    "intervita_transcript_summaries_total": "Rolling transcript summaries produced",
+    "intervita_speculative_hits_total": "Replies started before the turn was confirmed and then played",
+    "intervita_speculative_misses_total": "Confirmed turns whose reply was held back until confirmation",
+    "intervita_speculative_cancels_total": "Replies started early and discarded because the candidate kept talking",
+    "intervita_speculative_timeouts_total": "Held replies released after the hold timeout without being confirmed",
+    "intervita_speculative_wasted_tokens_total": "LLM tokens spent on discarded speculative replies",
+    "intervita_vision_frames_attached_total": "Camera frames attached to a turn's LLM request",
+    "intervita_vision_frames_skipped_total": "Turns that reused the frame already in context instead of attaching one",
+    "intervita_room_tasks_rejected_total": "Optional room tasks refused because the room had too many in flight",
+    "intervita_room_task_failures_total": "Room background tasks that raised and ended their room",
+    "intervita_room_cpu_seconds_total": "CPU seconds used by interview event loops",
+    "intervita_session_state_pushes_total": "Session state snapshots pushed to subscribed clients",
+    "intervita_session_state_coalesced_total": "Session state changes folded into an already scheduled push",
+    "intervita_room_cpu_throttled_total": "CPU checks that found a room over its share and shedding optional work",
+    "intervita_pacing_hints_total": "LLM requests that carried a time-budget hint",
+    "intervita_interviews_ended_by_budget_total": "Interviews ended because max_interview_minutes was spent",
+    "intervita_interview_overrun_seconds_total": "Wall-clock seconds interviews ran past max_interview_minutes",
+    "intervita_api_audio_seconds_over_budget_total": "STT and TTS audio seconds billed after an interview's budget was spent",
+    "intervita_provider_failovers_total": "LLM/TTS requests sent to a fallback provider because the preferred one was over its latency threshold",
+    "intervita_provider_errors_total": "LLM/TTS requests that failed at the provider",
+    "intervita_drain_wrapped_up_total": "Interviews ended with a goodbye because the worker was draining",
+    "intervita_drain_abandoned_sessions_total": "Interviews still running when a drain hit its deadline",
+}
+
+# name -> (help, how per-process values combine: "sum" or "max")
+GAUGES: Dict[str, Tuple[str, str]] = {
+    "intervita_active_rooms": ("Rooms with an interview in progress", "sum"),
+    "intervita_event_loop_lag_seconds": ("Recent worst lag of the busiest event loop in any job process", "max"),
+    "intervita_job_process_rss_bytes": ("Resident memory of the largest job process", "max"),
+    "intervita_drain_seconds": ("Time from SIGTERM until the last drain finished or hit its deadline", "max"),
+}
+
+
+def metrics_dir() -> str:
+    return os.getenv("METRICS_DIR", DEFAULT_METRICS_DIR)
+
+
+class _Histogram:
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def to_dict(self) -> dict:
+        return {"counts": list(self.counts), "sum": self.sum}
+
+
+class ProcessMetrics:
+    """Metrics recorded by one job process, persisted as a JSON snapshot for the exporter.
+
+    Job processes cannot share memory with the process serving /metrics, so each
+    one rewrites <metrics_dir>/<pid>.json (atomically) and MetricsAggregator
+    merges every snapshot at scrape time. Thread-executor jobs share the process
+    and therefore the same instance.
+    """
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        self._dir = directory or metrics_dir()
+        self._path = os.path.join(self._dir, f"{os.getpid()}.json")
+        self._lock = threading.Lock()
+        self._histograms = {name: _Histogram(buckets) for name, (_, buckets) in HISTOGRAMS.items()}
+        self._counters = {name: 0.0 for name in COUNTERS}
+        self._gauges = {name: 0.0 for name in GAUGES}
+        self._last_flush = 0.0
+
+    def observe(self, name: str, value: float) -> None:
+        # Pipeline metrics use negative values for "never happened" (e.g. a cancelled TTS)
+        if value < 0:
+            return
+        with self._lock:
+            self._histograms[name].observe(value)
+        self._maybe_flush()
+
+    def inc(self, name: str, value: float = 1.0) -> None:
+        with self._lock:
+            self._counters[name] += value
+        self._maybe_flush()
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+        self._maybe_flush()
+
+    def session_started(self) -> None:
+        with self._lock:
+            self._counters["intervita_sessions_total"] += 1
+            self._gauges["intervita_active_rooms"] += 1
+        self.flush()
+
+    def session_ended(self) -> None:
+        with self._lock:
+            self._gauges["intervita_active_rooms"] = max(0.0, self._gauges["intervita_active_rooms"] - 1)
+            if self._gauges["intervita_active_rooms"] == 0:
+                # An idle process must not keep a stale lag in the worker's load score
+                self._gauges["intervita_event_loop_lag_seconds"] = 0.0
+        self.flush()
+
+    def observe_agent_metrics(self, agent_metrics: metrics.AgentMetrics) -> None:
+        """Record the latency and usage fields of a metrics_collected event."""
+        if isinstance(agent_metrics, metrics.PipelineEOUMetrics):
+            self.observe("intervita_stt_latency_seconds", agent_metrics.transcription_delay)
+            self.observe("intervita_eou_delay_seconds", agent_metrics.end_of_utterance_delay)
+        elif isinstance(agent_metrics, metrics.LLMMetrics):
+            self.observe("intervita_llm_ttft_seconds", agent_metrics.ttft)
+            self.inc("intervita_llm_prompt_tokens_total", agent_metrics.prompt_tokens)
+            self.inc("intervita_llm_completion_tokens_total", agent_metrics.completion_tokens)
+        elif isinstance(agent_metrics, metrics.TTSMetrics):
+            self.observe("intervita_tts_ttfb_seconds", agent_metrics.ttfb)
+            self.inc("intervita_tts_characters_total", agent_metrics.characters_count)
+        elif isinstance(agent_metrics, metrics.STTMetrics):
+            self.inc("intervita_stt_audio_seconds_total", agent_metrics.audio_duration)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "updated": time.time(),
+                "histograms": {name: h.to_dict() for name, h in self._histograms.items()},
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+            }
+
+    def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        try:
+            os.makedirs(self._dir, exist_ok=True)
+            tmp_path = f"{self._path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, self._path)
+        except OSError as e:
+            logger.warning(f"Failed to write metrics snapshot to {self._path}: {e}")
+
+    def _maybe_flush(self) -> None:
+        if time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+
+_process_metrics: Optional[ProcessMetrics] = None
+
+
+def get_process_metrics() -> ProcessMetrics:
+    """Return this process's ProcessMetrics, creating it on first use."""
+    global _process_metrics
+    if _process_metrics is None:
+        _process_metrics = ProcessMetrics()
+    return _process_metrics
+
+
+_aggregator: Optional["MetricsAggregator"] = None
+
+
+def get_aggregator() -> "MetricsAggregator":
+    """Return the aggregator shared by /metrics and the load monitor in this process."""
+    global _aggregator
+    if _aggregator is None:
+        _aggregator = MetricsAggregator()
+    return _aggregator
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _empty_totals() -> dict:
+    return {
+        "histograms": {name: {"counts": [0] * (len(buckets) + 1), "sum": 0.0} for name, (_, buckets) in HISTOGRAMS.items()},
+        "counters": {name: 0.0 for name in COUNTERS},
+        "gauges": {name: 0.0 for name in GAUGES},
+    }
+
+
+def _merge(into: dict, snapshot: dict, gauges: bool = True) -> None:
+    for name, hist in snapshot.get("histograms", {}).items():
+        if name not in into["histograms"]:
+            continue
+        target = into["histograms"][name]
+        target["counts"] = [a + b for a, b in zip(target["counts"], hist["counts"])]
+        target["sum"] += hist["sum"]
+    for name, value in snapshot.get("counters", {}).items():
+        if name in into["counters"]:
+            into["counters"][name] += value
+    if gauges:
+        for name, value in snapshot.get("gauges", {}).items():
+            if name not in GAUGES:
+                continue
+            if GAUGES[name][1] == "max":
+                into["gauges"][name] = max(into["gauges"][name], value)
+            else:
+                into["gauges"][name] += value
+
+
+class MetricsAggregator:
+    """Merges the snapshots of every job process into one Prometheus exposition.
+
+    Snapshots of processes that have exited are folded into a retired total and
+    removed, so counters and histograms keep increasing across process restarts
+    while the active-rooms gauge only counts live processes. Run a single
+    aggregator per machine.
+    """
+
+    def __init__(self, directory: Optional[str] = None, worker: Optional[str] = None) -> None:
+        self._dir = directory or metrics_dir()
+        self._worker = worker or os.getenv("FLY_MACHINE_ID") or socket.gethostname()
+        self._retired = _empty_totals()
+        self._lock = threading.Lock()
+
+    def collect(self) -> dict:
+        with self._lock:
+            totals = _empty_totals()
+            _merge(totals, self._retired)
+            for snapshot, path in self._read_snapshots():
+                if _pid_alive(snapshot.get("pid", -1)):
+                    _merge(totals, snapshot)
+                else:
+                    _merge(self._retired, snapshot, gauges=False)
+                    _merge(totals, snapshot, gauges=False)
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            return totals
+
+    def render(self) -> str:
+        """Return the merged metrics in the Prometheus text exposition format."""
+        totals = self.collect()
+        labels = f'worker="{self._worker}"'
+        lines: List[str] = []
+        for name, (help_text, buckets) in HISTOGRAMS.items():
+            hist = totals["histograms"][name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ["+Inf"], hist["counts"]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {hist['sum']}")
+            lines.append(f"{name}_count{{{labels}}} {cumulative}")
+        for name, help_text in COUNTERS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{{{labels}}} {totals['counters'][name]}")
+        for name, (help_text, _) in GAUGES.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{{{labels}}} {totals['gauges'][name]}")
+        return "\n".join(lines) + "\n"
+
+    def _read_snapshots(self):
+        try:
+            names = os.listdir(self._dir)
+        except FileNotFoundError:
+            return
+        for filename in names:
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(self._dir, filename)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    yield json.load(f), path
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable metrics snapshot {path}: {e}")
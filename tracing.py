@@ -0,0 +1,274 @@
+import asyncio
+import json
+import logging
+import os
+import secrets
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import aiohttp
+from livekit.agents import metrics
+from livekit.agents.pipeline.pipeline_agent import SpeechDataContextVar
+
+logger = logging.getLogger("vision-voice-agent")
+
+DEFAULT_CAPACITY = 4096
+
+# Event kinds, stored in the buffer by index
+EVENTS = (
+    "user_speech_start",
+    "user_speech_end",
+    "eou_decision",
+    "frame_capture",
+    "llm_request",
+    "llm_first_token",
+    "tts_first_byte",
+    "agent_speech_start",
+    "transcript_committed",
+    "silence_prompt",
+    "rpc_end_conversation",
+)
+_EVENT_CODES = {name: code for code, name in enumerate(EVENTS)}
+
+# Waterfall columns, as offsets from the end of the candidate's speech
+WATERFALL_STEPS = ("eou_decision", "frame_capture", "llm_request", "llm_first_token", "tts_first_byte", "agent_speech_start")
+
+NO_TURN = -1
+
+
+@dataclass
+class TraceEvent:
+    at: float
+    name: str
+    turn: Optional[str]
+    # Duration in seconds for events that cover a span ending at `at` (e.g. frame_capture), else 0
+    duration: float
+
+
+class SessionTrace:
+    """Timestamped events of one interview in a preallocated ring buffer.
+
+    record() is a handful of array stores: no allocation, no formatting, no I/O,
+    so it can sit in every pipeline callback. Events are tied to a turn (the
+    pipeline's sequence_id) when one is known. The oldest events are overwritten
+    once capacity is reached. At the end of the session the buffer is exported
+    as JSONL (TRACE_DIR) and/or OTLP/HTTP JSON spans (TRACE_OTLP_ENDPOINT), and
+    a per-turn latency waterfall is logged.
+
+    Timestamps are wall-clock (time.time()) so they line up with the
+    timestamps of LiveKit's metrics events.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        room_name: str,
+        capacity: int = DEFAULT_CAPACITY,
+        directory: Optional[str] = None,
+        otlp_endpoint: Optional[str] = None,
+    ) -> None:
+        self._session_id = session_id
+        self._room_name = room_name
+        self._capacity = capacity
+        self._directory = directory
+        self._otlp_endpoint = otlp_endpoint
+        self._at = array("d", bytes(8 * capacity))
+        self._durations = array("d", bytes(8 * capacity))
+        self._codes = array("B", bytes(capacity))
+        self._turns = array("i", [NO_TURN]) * capacity
+        self._turn_ids: Dict[str, int] = {}
+        self._turn_names: List[str] = []
+        self._count = 0
+
+    @classmethod
+    def from_env(cls, session_id: str, room_name: str) -> "SessionTrace":
+        return cls(
+            session_id,
+            room_name,
+            capacity=int(os.getenv("TRACE_CAPACITY", DEFAULT_CAPACITY)),
+            directory=os.getenv("TRACE_DIR") or None,
+            otlp_endpoint=os.getenv("TRACE_OTLP_ENDPOINT") or None,
+        )
+
+    @property
+    def dropped(self) -> int:
+        return max(0, self._count - self._capacity)
+
+    def record(self, name: str, turn: Optional[str] = None, duration: float = 0.0, at: Optional[float] = None) -> None:
+        """Append an event; without turn it is tied to the reply being generated, if any."""
+        if turn is None:
+            speech_data = SpeechDataContextVar.get(None)
+            turn_index = self._turn_index(speech_data.sequence_id) if speech_data is not None else NO_TURN
+        else:
+            turn_index = self._turn_index(turn)
+        i = self._count % self._capacity
+        self._at[i] = time.time() if at is None else at
+        self._durations[i] = duration
+        self._codes[i] = _EVENT_CODES[name]
+        self._turns[i] = turn_index
+        self._count += 1
+
+    def on_metrics(self, agent_metrics: metrics.AgentMetrics) -> None:
+        """Derive EOU, LLM and TTS events from the pipeline's metrics_collected events."""
+        if isinstance(agent_metrics, metrics.PipelineEOUMetrics):
+            # Its duration reaches back to the end of the candidate's speech, the origin of the turn's waterfall
+            self.record(
+                "eou_decision",
+                agent_metrics.sequence_id,
+                duration=agent_metrics.end_of_utterance_delay,
+                at=agent_metrics.timestamp,
+            )
+        elif isinstance(agent_metrics, metrics.PipelineLLMMetrics) and agent_metrics.ttft >= 0:
+            started = agent_metrics.timestamp - agent_metrics.duration
+            self.record(
+                "llm_first_token", agent_metrics.sequence_id, duration=agent_metrics.ttft, at=started + agent_metrics.ttft
+            )
+        elif isinstance(agent_metrics, metrics.PipelineTTSMetrics) and agent_metrics.ttfb >= 0:
+            started = agent_metrics.timestamp - agent_metrics.duration
+            self.record(
+                "tts_first_byte", agent_metrics.sequence_id, duration=agent_metrics.ttfb, at=started + agent_metrics.ttfb
+            )
+
+    def events(self) -> List[TraceEvent]:
+        """Buffered events in timestamp order."""
+        start = max(0, self._count - self._capacity)
+        events = []
+        for n in range(start, self._count):
+            i = n % self._capacity
+            turn = self._turns[i]
+            events.append(TraceEvent(
+                at=self._at[i],
+                name=EVENTS[self._codes[i]],
+                turn=self._turn_names[turn] if turn != NO_TURN else None,
+                duration=self._durations[i],
+            ))
+        events.sort(key=lambda e: e.at)
+        return events
+
+    def waterfalls(self) -> Dict[str, Dict[str, float]]:
+        """Per turn, the first occurrence of each step as seconds after the end of the candidate's speech.
+
+        Agent speech has no turn of its own; it is attributed to the last turn
+        whose reply had started generating.
+        """
+        turns: Dict[str, Dict[str, float]] = {}
+        origins: Dict[str, float] = {}
+        last_turn: Optional[str] = None
+        for event in self.events():
+            turn = event.turn
+            if event.name == "agent_speech_start":
+                turn = last_turn
+            if turn is None:
+                continue
+            steps = turns.setdefault(turn, {})
+            steps.setdefault(event.name, event.at)
+            if event.name == "eou_decision":
+                origins.setdefault(turn, event.at - event.duration)
+            elif event.name == "llm_request":
+                last_turn = turn
+        waterfalls = {}
+        for turn, steps in turns.items():
+            origin = origins.get(turn)
+            if origin is None or "agent_speech_start" not in steps:
+                # Replaced by a newer reply, or the session ended mid-turn
+                continue
+            waterfalls[turn] = {name: steps[name] - origin for name in WATERFALL_STEPS if name in steps}
+        return waterfalls
+
+    async def aclose(self) -> None:
+        """Log the waterfall and export the buffer; export failures never fail the session."""
+        waterfalls = self.waterfalls()
+        for turn, steps in waterfalls.items():
+            logger.info(
+                f"Turn {turn} waterfall: " + ", ".join(f"{name}={offset * 1000:+.0f}ms" for name, offset in steps.items())
+            )
+        if self.dropped:
+            logger.warning(f"Session trace dropped its {self.dropped} oldest events (capacity {self._capacity})")
+        events = self.events()
+        if not events:
+            return
+        if self._directory:
+            try:
+                path = await asyncio.to_thread(self._write_jsonl, events)
+                logger.info(f"Wrote {len(events)} trace events to {path}")
+            except Exception as e:
+                logger.warning(f"Failed to write session trace: {e}")
+        if self._otlp_endpoint:
+            try:
+                await self._export_otlp(events, waterfalls)
+            except Exception as e:
+                logger.warning(f"Failed to export session trace to {self._otlp_endpoint}: {e}")
+
+    def _turn_index(self, turn: str) -> int:
+        index = self._turn_ids.get(turn)
+        if index is None:
+            index = self._turn_ids[turn] = len(self._turn_names)
+            self._turn_names.append(turn)
+        return index
+
+    def _write_jsonl(self, events: List[TraceEvent]) -> str:
+        os.makedirs(self._directory, exist_ok=True)
+        path = os.path.join(self._directory, f"{self._room_name}-{self._session_id}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for event in events:
+                record = {"t": round(event.at, 6), "e": event.name}
+                if event.turn is not None:
+                    record["turn"] = event.turn
+                if event.duration:
+                    record["d"] = round(event.duration, 6)
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        return path
+
+    async def _export_otlp(self, events: List[TraceEvent], waterfalls: Dict[str, Dict[str, float]]) -> None:
+        """POST one trace per session to an OTLP/HTTP collector: a span per turn, a child span per timed step."""
+        trace_id = secrets.token_hex(16)
+        spans = []
+        for turn, steps in waterfalls.items():
+            eou = next(e for e in events if e.turn == turn and e.name == "eou_decision")
+            origin = eou.at - eou.duration
+            turn_span_id = secrets.token_hex(8)
+            end = origin + steps["agent_speech_start"]
+            spans.append(_otlp_span(trace_id, turn_span_id, None, "turn", origin, end, {"sequence_id": turn}))
+            for event in events:
+                if event.turn == turn and event.duration:
+                    spans.append(_otlp_span(
+                        trace_id, secrets.token_hex(8), turn_span_id, event.name, event.at - event.duration, event.at, {}
+                    ))
+        body = {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    _otlp_attribute("service.name", "intervita-vision"),
+                    _otlp_attribute("livekit.room", self._room_name),
+                    _otlp_attribute("livekit.job_id", self._session_id),
+                ]},
+                "scopeSpans": [{"scope": {"name": "vision-voice-agent"}, "spans": spans}],
+            }],
+        }
+        timeout = aiohttp.ClientTimeout(total=5)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.post(self._otlp_endpoint, json=body) as response:
+                response.raise_for_status()
+        logger.info(f"Exported {len(spans)} trace spans to {self._otlp_endpoint}")
+
+
+def _otlp_attribute(key: str, value: str) -> dict:
+    return {"key": key, "value": {"stringValue": value}}
+
+
+def _otlp_span(
+    trace_id: str, span_id: str, parent_id: Optional[str], name: str, start: float, end: float, attributes: Dict[str, str]
+) -> dict:
+    span = {
+        "traceId": trace_id,
+        "spanId": span_id,
+        "name": name,
+        "kind": 1,
+        "startTimeUnixNano": str(int(start * 1e9)),
+        "endTimeUnixNano": str(int(end * 1e9)),
+        "attributes": [_otlp_attribute(k, v) for k, v in attributes.items()],
+    }
+    if parent_id is not None:
+        span["parentSpanId"] = parent_id
+    return span
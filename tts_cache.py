@@ -0,0 +1,339 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+from livekit import rtc
+from livekit.agents import Plugin, tts, utils
+from livekit.agents.types import APIConnectOptions
+
+from providers import RoutedTTS
+
+logger = logging.getLogger("vision-voice-agent")
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_cache")
+MANIFEST_FILE = "manifest.json"
+
+# Cached audio is replayed in 100 ms frames
+FRAME_DURATION = 0.1
+
+# The wrapped stream retries on its own; relaying it must not replay the request
+_RECORD_CONN_OPTIONS = APIConnectOptions(max_retry=0)
+
+
+def cache_key(text: str, voice: str, sample_rate: int) -> str:
+    return hashlib.sha1(f"{voice}|{sample_rate}|{text}".encode("utf-8")).hexdigest()
+
+
+class TTSAudioCache:
+    """PCM cache for fixed agent lines, keyed by (text, voice model, sample rate).
+
+    Entries live in memory and can be persisted to / loaded from a directory of
+    raw 16-bit PCM files plus a JSON manifest. Only texts registered with
+    add_cacheable() are looked up or recorded, so ordinary LLM replies never
+    touch the cache.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None) -> None:
+        self._cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self._entries: Dict[str, bytes] = {}
+        self._meta: Dict[str, dict] = {}
+        self._cacheable: set = set()
+
+    @property
+    def cache_dir(self) -> str:
+        return self._cache_dir
+
+    def add_cacheable(self, texts: Iterable[str]) -> None:
+        self._cacheable.update(t.strip() for t in texts)
+
+    def is_cacheable(self, text: str) -> bool:
+        return text.strip() in self._cacheable
+
+    def is_cacheable_prefix(self, text: str) -> bool:
+        """Whether text could still grow into one of the cacheable lines."""
+        text = text.lstrip()
+        return any(t.startswith(text) for t in self._cacheable)
+
+    def get(self, text: str, voice: str, sample_rate: int) -> Optional[bytes]:
+        return self._entries.get(cache_key(text.strip(), voice, sample_rate))
+
+    def put(self, text: str, voice: str, sample_rate: int, num_channels: int, pcm: bytes) -> None:
+        text = text.strip()
+        key = cache_key(text, voice, sample_rate)
+        self._entries[key] = pcm
+        self._meta[key] = {
+            "text": text,
+            "voice": voice,
+            "sample_rate": sample_rate,
+            "num_channels": num_channels,
+            "file": f"{key}.pcm",
+        }
+
+    def missing(self, voice: str, sample_rate: int) -> List[str]:
+        return [t for t in sorted(self._cacheable) if self.get(t, voice, sample_rate) is None]
+
+    def load(self) -> int:
+        """Load every entry in the on-disk store; returns the number of entries loaded."""
+        manifest_path = os.path.join(self._cache_dir, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            logger.info(f"No TTS cache found at {self._cache_dir}")
+            return 0
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        loaded = 0
+        for key, meta in manifest.items():
+            try:
+                with open(os.path.join(self._cache_dir, meta["file"]), "rb") as f:
+                    self._entries[key] = f.read()
+                self._meta[key] = meta
+                loaded += 1
+            except OSError as e:
+                logger.warning(f"Skipping TTS cache entry {meta.get('text', key)!r}: {e}")
+        logger.info(f"Loaded {loaded} cached TTS lines from {self._cache_dir}")
+        return loaded
+
+    def save(self) -> None:
+        os.makedirs(self._cache_dir, exist_ok=True)
+        for key, pcm in self._entries.items():
+            with open(os.path.join(self._cache_dir, self._meta[key]["file"]), "wb") as f:
+                f.write(pcm)
+        with open(os.path.join(self._cache_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(self._meta, f, indent=2)
+
+    async def fill(self, engine: tts.TTS, voice: str) -> int:
+        """Synthesize every missing cacheable line with the given TTS; returns how many were added."""
+        added = 0
+        for text in self.missing(voice, engine.sample_rate):
+            frames = [ev.frame async for ev in engine.synthesize(text)]
+            if not frames:
+                continue
+            pcm = b"".join(bytes(frame.data) for frame in frames)
+            self.put(text, voice, engine.sample_rate, engine.num_channels, pcm)
+            added += 1
+        return added
+
+
+def pcm_to_frames(pcm: bytes, sample_rate: int, num_channels: int) -> List[rtc.AudioFrame]:
+    samples_per_frame = int(sample_rate * FRAME_DURATION)
+    bytes_per_frame = samples_per_frame * num_channels * 2
+    frames = []
+    for offset in range(0, len(pcm), bytes_per_frame):
+        chunk = pcm[offset:offset + bytes_per_frame]
+        frames.append(
+            rtc.AudioFrame(
+                data=chunk,
+                sample_rate=sample_rate,
+                num_channels=num_channels,
+                samples_per_channel=len(chunk) // (2 * num_channels),
+            )
+        )
+    return frames
+
+
+class CachedTTS(tts.TTS):
+    """TTS wrapper that plays cached PCM for fixed lines and delegates everything else.
+
+    Lines that miss the cache are synthesized by the wrapped TTS and recorded, so
+    later sessions in the same process hit the cache even without a prebuilt store.
+    Entries are keyed by voice, so when the wrapped TTS is routed only audio from
+    its primary provider is recorded; a line synthesized by a fallback provider
+    is played but never stored under the primary's voice.
+    """
+
+    def __init__(self, wrapped: tts.TTS, cache: TTSAudioCache, voice: str) -> None:
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=True),
+            sample_rate=wrapped.sample_rate,
+            num_channels=wrapped.num_channels,
+        )
+        self._wrapped = wrapped
+        self._cache = cache
+        self._voice = voice
+
+        @self._wrapped.on("metrics_collected")
+        def _forward_metrics(*args, **kwargs):
+            self.emit("metrics_collected", *args, **kwargs)
+
+    @property
+    def cache(self) -> TTSAudioCache:
+        return self._cache
+
+    @property
+    def voice(self) -> str:
+        return self._voice
+
+    def lookup(self, text: str) -> Optional[bytes]:
+        return self._cache.get(text, self._voice, self.sample_rate)
+
+    def records(self, stream: Union[tts.ChunkedStream, tts.SynthesizeStream]) -> bool:
+        """Whether a stream of the wrapped TTS speaks in the cache's voice."""
+        if isinstance(self._wrapped, RoutedTTS):
+            return stream.provider == self._wrapped.primary
+        return True
+
+    def synthesize(self, text: str, *, conn_options: Optional[APIConnectOptions] = None) -> tts.ChunkedStream:
+        pcm = self.lookup(text)
+        if pcm is not None:
+            return _CachedChunkedStream(tts=self, input_text=text, pcm=pcm, conn_options=conn_options)
+        stream = self._wrapped.synthesize(text, conn_options=conn_options)
+        if not self._cache.is_cacheable(text) or not self.records(stream):
+            return stream
+        return _RecordingChunkedStream(tts=self, stream=stream)
+
+    def stream(self, *, conn_options: Optional[APIConnectOptions] = None) -> "_CachedSynthesizeStream":
+        return _CachedSynthesizeStream(tts=self, conn_options=conn_options)
+
+    def prewarm(self) -> None:
+        self._wrapped.prewarm()
+
+    async def aclose(self) -> None:
+        await self._wrapped.aclose()
+
+
+class _CachedChunkedStream(tts.ChunkedStream):
+    def __init__(self, *, tts: CachedTTS, input_text: str, pcm: bytes, conn_options: Optional[APIConnectOptions]) -> None:
+        super().__init__(tts=tts, input_text=input_text, conn_options=conn_options)
+        self._pcm = pcm
+
+    async def _metrics_monitor_task(self, event_aiter: AsyncIterator[tts.SynthesizedAudio]) -> None:
+        # Cached audio is not billed, do not report TTS usage
+        async for _ in event_aiter:
+            pass
+
+    async def _run(self) -> None:
+        request_id = utils.shortuuid("cached_")
+        for frame in pcm_to_frames(self._pcm, self._tts.sample_rate, self._tts.num_channels):
+            self._event_ch.send_nowait(tts.SynthesizedAudio(frame=frame, request_id=request_id))
+
+
+class _RecordingChunkedStream(tts.ChunkedStream):
+    """Relays a cacheable line synthesized by the wrapped TTS and stores its audio once complete."""
+
+    def __init__(self, *, tts: CachedTTS, stream: tts.ChunkedStream) -> None:
+        super().__init__(tts=tts, input_text=stream.input_text, conn_options=_RECORD_CONN_OPTIONS)
+        self._cached_tts = tts
+        self._stream = stream
+
+    async def _metrics_monitor_task(self, event_aiter: AsyncIterator[tts.SynthesizedAudio]) -> None:
+        # The wrapped TTS reports metrics for audio it actually synthesizes
+        async for _ in event_aiter:
+            pass
+
+    async def _run(self) -> None:
+        pcm = bytearray()
+        async with self._stream:
+            async for ev in self._stream:
+                self._event_ch.send_nowait(ev)
+                pcm.extend(bytes(ev.frame.data))
+        # Only reached when the wrapped stream finished, so partial audio is never stored
+        if pcm:
+            self._cached_tts.cache.put(self._input_text, self._cached_tts.voice, self._cached_tts.sample_rate,
+                                       self._cached_tts.num_channels, bytes(pcm))
+
+
+class _CachedSynthesizeStream(tts.SynthesizeStream):
+    """Buffers input while it can still become a cached line, then plays it or falls through.
+
+    As soon as the pushed text stops being a prefix of any cacheable line (for
+    example the first tokens of an LLM reply), buffered text is forwarded to a
+    stream on the wrapped TTS and the rest passes straight through.
+    """
+
+    def __init__(self, *, tts: CachedTTS, conn_options: Optional[APIConnectOptions]) -> None:
+        super().__init__(tts=tts, conn_options=conn_options)
+        self._cached_tts = tts
+
+    async def _metrics_monitor_task(self, event_aiter: AsyncIterator[tts.SynthesizedAudio]) -> None:
+        # The wrapped TTS reports metrics for audio it actually synthesizes
+        async for _ in event_aiter:
+            pass
+
+    async def _run(self) -> None:
+        cache = self._cached_tts.cache
+        inner: Optional[tts.SynthesizeStream] = None
+        forward_task: Optional[asyncio.Task] = None
+        segment_text = ""
+
+        async def _forward(stream: tts.SynthesizeStream, first_text: str) -> None:
+            # Record passthrough audio for cacheable lines so the next session hits the cache
+            recording = cache.is_cacheable(first_text) and self._cached_tts.records(stream)
+            text, pcm = first_text, bytearray()
+            async for ev in stream:
+                self._event_ch.send_nowait(ev)
+                if recording:
+                    pcm.extend(bytes(ev.frame.data))
+                    if ev.is_final:
+                        cache.put(text, self._cached_tts.voice, self._cached_tts.sample_rate,
+                                  self._cached_tts.num_channels, bytes(pcm))
+                        recording = False
+
+        def _start_passthrough(text: str) -> None:
+            nonlocal inner, forward_task
+            inner = self._cached_tts._wrapped.stream(conn_options=self._conn_options)
+            forward_task = asyncio.create_task(_forward(inner, text))
+            inner.push_text(text)
+
+        try:
+            async for data in self._input_ch:
+                if inner is not None:
+                    if isinstance(data, self._FlushSentinel):
+                        inner.flush()
+                    else:
+                        inner.push_text(data)
+                    continue
+
+                if isinstance(data, self._FlushSentinel):
+                    if not segment_text.strip():
+                        continue
+                    pcm = self._cached_tts.lookup(segment_text)
+                    if pcm is not None:
+                        self._emit_cached(pcm)
+                        segment_text = ""
+                        continue
+                    _start_passthrough(segment_text)
+                    inner.flush()
+                    continue
+
+                segment_text += data
+                if not cache.is_cacheable_prefix(segment_text):
+                    _start_passthrough(segment_text)
+
+            if inner is not None:
+                inner.end_input()
+                await forward_task
+        finally:
+            if forward_task is not None:
+                await utils.aio.gracefully_cancel(forward_task)
+            if inner is not None:
+                await inner.aclose()
+
+    def _emit_cached(self, pcm: bytes) -> None:
+        request_id = utils.shortuuid("cached_")
+        frames = pcm_to_frames(pcm, self._cached_tts.sample_rate, self._cached_tts.num_channels)
+        for i, frame in enumerate(frames):
+            self._event_ch.send_nowait(
+                tts.SynthesizedAudio(
+                    frame=frame,
+                    request_id=request_id,
+                    is_final=i == len(frames) - 1,
+                )
+            )
+
+
+def log_time_to_first_audio(label: str, started: float, cached: bool) -> None:
+    logger.info(f"{label} time-to-first-audio: {time.perf_counter() - started:.3f}s (cached={cached})")
+
+
+class TTSCachePlugin(Plugin):
+    """Hooks the on-disk TTS cache build into `python agent.py download-files`."""
+
+    def __init__(self, build: Callable[[], Awaitable[None]]) -> None:
+        super().__init__("intervita-tts-cache", "1.0.0", __name__, logger)
+        self._build = build
+
+    def download_files(self) -> None:
+        asyncio.run(self._build())
@@ -0,0 +1,569 @@
+import asyncio
+import base64
+import io
+import logging
+import math
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Literal, Optional
+
+from livekit import rtc
+from livekit.agents import llm
+from livekit.agents.llm import ChatImage
+from PIL import Image, ImageChops, ImageStat
+
+logger = logging.getLogger("vision-voice-agent")
+
+
+@dataclass
+class BufferedFrame:
+    """A decoded video frame together with the time it was received."""
+
+    frame: rtc.VideoFrame
+    received_at: float
+    timestamp_us: int
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.received_at
+
+
+# Luminance thumbnail used for scene statistics; tiny enough to compute on the event loop
+SCENE_THUMBNAIL_SIZE = (32, 24)
+SCENE_HISTOGRAM_BINS = 16
+# How often the frame buffer refreshes scene statistics from the live track (seconds)
+SCENE_STATS_INTERVAL = 0.25
+
+_LUMA_PLANE_TYPES = (rtc.VideoBufferType.I420, rtc.VideoBufferType.I420A, rtc.VideoBufferType.NV12)
+
+
+@dataclass
+class SceneStats:
+    """Cheap statistics of one sampled frame: a luminance thumbnail and histogram, plus motion."""
+
+    thumbnail: "Image.Image"
+    histogram: List[float]
+    # Mean absolute luminance change (0-1) since the previous sample
+    motion: float
+    sampled_at: float
+
+
+def luma_thumbnail(frame: rtc.VideoFrame) -> "Image.Image":
+    """Downscale the frame's luminance to SCENE_THUMBNAIL_SIZE, reading the Y plane directly when there is one."""
+    if frame.type in _LUMA_PLANE_TYPES:
+        luma = Image.frombuffer("L", (frame.width, frame.height), frame.get_plane(0), "raw", "L", 0, 1)
+    else:
+        converted = frame if frame.type == rtc.VideoBufferType.RGBA else frame.convert(rtc.VideoBufferType.RGBA)
+        luma = Image.frombytes("RGBA", (frame.width, frame.height), converted.data).convert("L")
+    return luma.resize(SCENE_THUMBNAIL_SIZE, Image.BOX)
+
+
+def compute_scene_stats(frame: rtc.VideoFrame, previous: Optional[SceneStats] = None) -> SceneStats:
+    thumbnail = luma_thumbnail(frame)
+    counts = thumbnail.histogram()
+    per_bin = 256 // SCENE_HISTOGRAM_BINS
+    total = float(thumbnail.width * thumbnail.height)
+    histogram = [sum(counts[i:i + per_bin]) / total for i in range(0, 256, per_bin)]
+    motion = 0.0
+    if previous is not None:
+        motion = ImageStat.Stat(ImageChops.difference(thumbnail, previous.thumbnail)).mean[0] / 255
+    return SceneStats(thumbnail=thumbnail, histogram=histogram, motion=motion, sampled_at=time.monotonic())
+
+
+def scene_distance(a: SceneStats, b: SceneStats) -> float:
+    """How different two scenes look, 0 (same) to 1: the larger of histogram and thumbnail difference.
+
+    The histogram catches lighting and exposure changes, the thumbnail difference
+    catches the candidate moving or holding something up at constant brightness.
+    """
+    histogram = sum(abs(x - y) for x, y in zip(a.histogram, b.histogram)) / 2
+    pixels = ImageStat.Stat(ImageChops.difference(a.thumbnail, b.thumbnail)).mean[0] / 255
+    return max(histogram, pixels)
+
+
+class FrameBuffer:
+    """Long-lived subscriber that keeps only the most recent frame of a video track.
+
+    The underlying VideoStream is created once per track with a capacity of one,
+    so older frames are dropped by the ring queue instead of piling up. Readers
+    get the newest frame in O(1) without awaiting. Every stats_interval seconds
+    the newest frame is also reduced to SceneStats for the vision scheduler.
+    """
+
+    def __init__(self, track: rtc.Track, participant_identity: str, stats_interval: float = SCENE_STATS_INTERVAL) -> None:
+        self._track = track
+        self._participant_identity = participant_identity
+        self._stream = rtc.VideoStream(track, capacity=1)
+        self._latest: Optional[BufferedFrame] = None
+        self._scene: Optional[SceneStats] = None
+        self._stats_interval = stats_interval
+        self._closed = False
+        self._task = asyncio.create_task(self._run())
+
+    @property
+    def track_sid(self) -> str:
+        return self._track.sid
+
+    @property
+    def participant_identity(self) -> str:
+        return self._participant_identity
+
+    @property
+    def scene(self) -> Optional[SceneStats]:
+        """Statistics of the most recently sampled frame, if any."""
+        return self._scene
+
+    async def _run(self) -> None:
+        next_stats_at = 0.0
+        try:
+            async for event in self._stream:
+                now = time.monotonic()
+                self._latest = BufferedFrame(
+                    frame=event.frame,
+                    received_at=now,
+                    timestamp_us=event.timestamp_us,
+                )
+                if now >= next_stats_at:
+                    next_stats_at = now + self._stats_interval
+                    try:
+                        self._scene = compute_scene_stats(event.frame, self._scene)
+                    except Exception as e:
+                        logger.debug(f"Scene statistics unavailable for this frame: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Video frame subscriber for {self._participant_identity} stopped: {e}")
+
+    def latest(self, max_age: Optional[float] = None) -> Optional[BufferedFrame]:
+        """Return the newest frame, or None if there is none or it is older than max_age seconds."""
+        buffered = self._latest
+        if buffered is None:
+            return None
+        if max_age is not None and buffered.age > max_age:
+            return None
+        return buffered
+
+    async def aclose(self) -> None:
+        """Stop the subscriber task and release the underlying stream."""
+        if self._closed:
+            return
+        self._closed = True
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        try:
+            await self._stream.aclose()
+        except Exception as e:
+            logger.debug(f"Error closing video stream: {e}")
+        self._latest = None
+        self._scene = None
+        logger.info(f"Closed video frame buffer for {self._participant_identity}")
+
+
+@dataclass
+class FramePreprocessOptions:
+    """Target size and encoding applied to frames before they are sent to the LLM."""
+
+    width: int = 768
+    height: int = 768
+    format: Literal["JPEG", "PNG"] = "JPEG"
+    quality: int = 75
+
+    @classmethod
+    def from_env(cls) -> "FramePreprocessOptions":
+        """Build options from VISION_FRAME_* environment variables, falling back to defaults."""
+        image_format = os.getenv("VISION_FRAME_FORMAT", cls.format).upper()
+        if image_format not in ("JPEG", "PNG"):
+            logger.warning(f"Unsupported VISION_FRAME_FORMAT {image_format!r}, using JPEG")
+            image_format = "JPEG"
+        return cls(
+            width=int(os.getenv("VISION_FRAME_WIDTH", cls.width)),
+            height=int(os.getenv("VISION_FRAME_HEIGHT", cls.height)),
+            format=image_format,
+            quality=int(os.getenv("VISION_FRAME_QUALITY", cls.quality)),
+        )
+
+
+@dataclass
+class EncodedFrame:
+    """A frame that has been resized and encoded into a ready-to-send data URL."""
+
+    data_url: str
+    width: int
+    height: int
+    num_bytes: int
+    fingerprint: int = 0
+    duplicate: bool = False
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+class FramePreprocessor:
+    """Converts, resizes and encodes video frames on a thread pool.
+
+    Keeping this work off the event loop means STT/TTS for the session are not
+    stalled while a full-resolution camera frame is being compressed.
+    """
+
+    def __init__(self, options: FramePreprocessOptions, max_workers: int = 1) -> None:
+        self._options = options
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="frame-preprocess"
+        )
+
+    @property
+    def options(self) -> FramePreprocessOptions:
+        return self._options
+
+    async def process(
+        self,
+        frame: rtc.VideoFrame,
+        previous_fingerprint: Optional[int] = None,
+        max_distance: int = 0,
+    ) -> EncodedFrame:
+        """Encode the frame in the pool and return it with per-stage timings in seconds.
+
+        When previous_fingerprint is given and the new frame's perceptual hash is
+        within max_distance bits of it, encoding is skipped and the result is
+        marked as a duplicate with an empty data URL.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        encoded = await loop.run_in_executor(
+            self._executor, self._encode, frame, previous_fingerprint, max_distance
+        )
+        encoded.timings["wait"] = time.perf_counter() - started
+        return encoded
+
+    def _encode(
+        self,
+        frame: rtc.VideoFrame,
+        previous_fingerprint: Optional[int],
+        max_distance: int,
+    ) -> EncodedFrame:
+        opts = self._options
+        t0 = time.perf_counter()
+        converted = frame
+        if frame.type != rtc.VideoBufferType.RGBA:
+            converted = frame.convert(rtc.VideoBufferType.RGBA)
+        image = Image.frombytes("RGB", (frame.width, frame.height), converted.data, "raw", "RGBX")
+        t1 = time.perf_counter()
+
+        # thumbnail() keeps the aspect ratio and never upscales
+        image.thumbnail((opts.width, opts.height), Image.BILINEAR)
+        fingerprint = difference_hash(image)
+        t2 = time.perf_counter()
+
+        if previous_fingerprint is not None and hamming_distance(fingerprint, previous_fingerprint) <= max_distance:
+            return EncodedFrame(
+                data_url="",
+                width=image.width,
+                height=image.height,
+                num_bytes=0,
+                fingerprint=fingerprint,
+                duplicate=True,
+                timings={"convert": t1 - t0, "resize": t2 - t1, "encode": 0.0, "total": t2 - t0},
+            )
+
+        buffer = io.BytesIO()
+        save_kwargs = {"quality": opts.quality} if opts.format == "JPEG" else {}
+        image.save(buffer, opts.format, **save_kwargs)
+        data = buffer.getvalue()
+        mime = "image/jpeg" if opts.format == "JPEG" else "image/png"
+        data_url = f"data:{mime};base64,{base64.b64encode(data).decode('utf-8')}"
+        t3 = time.perf_counter()
+
+        return EncodedFrame(
+            data_url=data_url,
+            width=image.width,
+            height=image.height,
+            num_bytes=len(data),
+            fingerprint=fingerprint,
+            timings={
+                "convert": t1 - t0,
+                "resize": t2 - t1,
+                "encode": t3 - t2,
+                "total": t3 - t0,
+            },
+        )
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def log_preprocess_metrics(encoded: EncodedFrame) -> None:
+    """Log per-stage preprocessing timings in the same style as metrics.log_metrics."""
+    timings = encoded.timings
+    logger.info(
+        f"Vision preprocess metrics: convert={timings.get('convert', 0.0):.3f}, "
+        f"resize={timings.get('resize', 0.0):.3f}, encode={timings.get('encode', 0.0):.3f}, "
+        f"off_loop_cpu={timings.get('total', 0.0):.3f}, wait={timings.get('wait', 0.0):.3f}, "
+        f"size={encoded.width}x{encoded.height}, bytes={encoded.num_bytes}, duplicate={encoded.duplicate}"
+    )
+
+
+def difference_hash(image: "Image.Image") -> int:
+    """Return a 64-bit perceptual difference hash of the image's 9x8 luminance thumbnail."""
+    small = image.convert("L").resize((9, 8), Image.BILINEAR)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def estimate_image_tokens(width: int, height: int, detail: str = "auto") -> int:
+    """Estimate prompt tokens for an image using OpenAI's tiling rules."""
+    if detail == "low":
+        return 85
+    # high/auto: fit within 2048x2048, then shortest side to 768, 170 tokens per 512px tile
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+IMAGE_PLACEHOLDER = "[Earlier camera frame omitted]"
+
+
+@dataclass
+class _SentImage:
+    sent_at: float
+    fingerprint: int
+    num_bytes: int
+    tokens: int
+
+
+@dataclass
+class VisionContextStats:
+    """Running per-session totals for the vision context policy."""
+
+    images_sent: int = 0
+    duplicates_skipped: int = 0
+    images_collapsed: int = 0
+    tokens_saved: int = 0
+    bytes_saved: int = 0
+
+
+class VisionContextPolicy:
+    """Bounds how many camera frames the chat context carries.
+
+    Only the newest max_images images (and, if max_age is set, only those sent
+    within max_age seconds) are kept; older ones are replaced by a single text
+    placeholder. A new frame that is perceptually near-identical to the last
+    image still in context is not sent at all.
+    """
+
+    def __init__(
+        self,
+        max_images: int = 1,
+        max_age: Optional[float] = None,
+        duplicate_distance: int = 4,
+    ) -> None:
+        self._max_images = max_images
+        self._max_age = max_age
+        self._duplicate_distance = duplicate_distance
+        self._sent: Dict[str, _SentImage] = {}
+        self._last_id: Optional[str] = None
+        self.stats = VisionContextStats()
+
+    @classmethod
+    def from_env(cls) -> "VisionContextPolicy":
+        max_age = float(os.getenv("VISION_MAX_IMAGE_AGE", 0))
+        return cls(
+            max_images=int(os.getenv("VISION_MAX_IMAGES", 1)),
+            max_age=max_age if max_age > 0 else None,
+            duplicate_distance=int(os.getenv("VISION_DUPLICATE_DISTANCE", 4)),
+        )
+
+    @property
+    def duplicate_distance(self) -> int:
+        return self._duplicate_distance
+
+    def last_fingerprint(self) -> Optional[int]:
+        """Fingerprint of the last image sent, if it is still retained in context."""
+        if self._last_id is None:
+            return None
+        sent = self._sent.get(self._last_id)
+        if sent is None or self._expired(sent, time.monotonic()):
+            return None
+        return sent.fingerprint
+
+    def record_duplicate(self) -> None:
+        self.stats.duplicates_skipped += 1
+        last = self._sent.get(self._last_id) if self._last_id else None
+        if last is not None:
+            self.stats.tokens_saved += last.tokens
+            self.stats.bytes_saved += last.num_bytes
+
+    def create_image_message(self, encoded: EncodedFrame, detail: str = "auto") -> llm.ChatMessage:
+        """Wrap an encoded frame in a chat message and start tracking it."""
+        message = llm.ChatMessage(
+            role="user",
+            content=[ChatImage(image=encoded.data_url, inference_detail=detail)],
+        )
+        self._sent[message.id] = _SentImage(
+            sent_at=time.monotonic(),
+            fingerprint=encoded.fingerprint,
+            num_bytes=encoded.num_bytes,
+            tokens=estimate_image_tokens(encoded.width, encoded.height, detail),
+        )
+        self._last_id = message.id
+        self.stats.images_sent += 1
+        return message
+
+    def apply(self, chat_ctx: llm.ChatContext, count_savings: bool = True) -> int:
+        """Collapse images outside the retention window; return the number collapsed.
+
+        All dropped images (and placeholders left by earlier turns) are replaced by
+        one placeholder at the position of the most recent of them. When
+        count_savings is set, every image sent this session that is not in the
+        resulting context is counted as saved tokens and bytes, relative to a
+        context that keeps every image (use it for the context actually sent).
+        """
+        now = time.monotonic()
+        image_indices = [
+            i for i, msg in enumerate(chat_ctx.messages)
+            if msg.id in self._sent or _has_image(msg)
+        ]
+        keep = set(image_indices[-self._max_images:]) if self._max_images > 0 else set()
+        drop = set()
+        for i in image_indices:
+            sent = self._sent.get(chat_ctx.messages[i].id)
+            if i not in keep or (sent is not None and self._expired(sent, now)):
+                drop.add(i)
+        placeholders = {i for i, msg in enumerate(chat_ctx.messages) if _is_placeholder(msg)}
+        marker = max(drop | placeholders, default=None)
+
+        messages: List[llm.ChatMessage] = []
+        kept_ids = set()
+        for i, msg in enumerate(chat_ctx.messages):
+            if i in drop or i in placeholders:
+                if i == marker:
+                    messages.append(llm.ChatMessage(role="user", content=IMAGE_PLACEHOLDER))
+                continue
+            kept_ids.add(msg.id)
+            messages.append(msg)
+        chat_ctx.messages[:] = messages
+
+        if count_savings:
+            self.stats.images_collapsed += len(drop)
+            for message_id, sent in self._sent.items():
+                if message_id not in kept_ids:
+                    self.stats.tokens_saved += sent.tokens
+                    self.stats.bytes_saved += sent.num_bytes
+        return len(drop)
+
+    def _expired(self, sent: _SentImage, now: float) -> bool:
+        return self._max_age is not None and now - sent.sent_at > self._max_age
+
+
+def _has_image(message: llm.ChatMessage) -> bool:
+    return isinstance(message.content, list) and any(
+        isinstance(c, ChatImage) for c in message.content
+    )
+
+
+def _is_placeholder(message: llm.ChatMessage) -> bool:
+    return message.role == "user" and message.content == IMAGE_PLACEHOLDER
+
+
+# Explicit references to what the camera shows, which make the current frame worth attaching whatever
+# the scene statistics say. Bare words like "see", "look" or "show" mostly come up in figures of speech
+# ("I see", "looking for a team") and would attach a frame nearly every turn
+VISUAL_CUES = (
+    "can you see", "could you see", "do you see", "look at this", "look at my", "take a look at this",
+    "on my screen", "share my screen", "on the screen", "holding up", "hold this up", "in front of me",
+    "behind me", "on camera", "the camera", "my camera", "show you this", "showing you", "this diagram",
+    "the whiteboard", "this picture", "this photo",
+)
+_VISUAL_CUE_PATTERN = re.compile(
+    r"\b(?:" + "|".join(re.escape(cue) for cue in VISUAL_CUES) + r")\b", re.IGNORECASE
+)
+
+
+@dataclass
+class VisionScheduleStats:
+    """Per-session counts of frames attached (by reason) and skipped by the vision scheduler."""
+
+    attached: Dict[str, int] = field(default_factory=dict)
+    skipped: int = 0
+
+    def describe(self) -> str:
+        reasons = ", ".join(f"{reason}={count}" for reason, count in sorted(self.attached.items()))
+        return f"attached={sum(self.attached.values())} ({reasons or 'none'}), skipped={self.skipped}"
+
+
+class VisionScheduler:
+    """Decides per turn whether the current camera frame is worth attaching at all.
+
+    A frame is attached when nothing was attached yet, when the scene moved more
+    than change_threshold (scene_distance) away from the last attached frame,
+    when refresh_interval seconds passed since the last attachment, or when the
+    candidate's words refer to something visual. Every other turn skips
+    preprocessing entirely and relies on the image already in context.
+    """
+
+    def __init__(self, change_threshold: float = 0.12, refresh_interval: Optional[float] = 60.0) -> None:
+        self._change_threshold = change_threshold
+        self._refresh_interval = refresh_interval
+        self._last_scene: Optional[SceneStats] = None
+        self._last_attached_at: Optional[float] = None
+        self.stats = VisionScheduleStats()
+
+    @classmethod
+    def from_env(cls) -> "VisionScheduler":
+        refresh_interval = float(os.getenv("VISION_REFRESH_INTERVAL", 60))
+        return cls(
+            change_threshold=float(os.getenv("VISION_CHANGE_THRESHOLD", 0.12)),
+            refresh_interval=refresh_interval if refresh_interval > 0 else None,
+        )
+
+    def decide(self, scene: Optional[SceneStats], transcript: str = "") -> Optional[str]:
+        """Return why this turn should attach a frame, or None to skip it."""
+        now = time.monotonic()
+        if self._last_attached_at is None:
+            return "first"
+        if transcript and _VISUAL_CUE_PATTERN.search(transcript):
+            return "visual_cue"
+        # Without statistics on either side there is nothing to compare, so assume the scene changed
+        if scene is None or self._last_scene is None:
+            return "changed"
+        if scene_distance(scene, self._last_scene) > self._change_threshold:
+            return "changed"
+        if self._refresh_interval is not None and now - self._last_attached_at >= self._refresh_interval:
+            return "interval"
+        return None
+
+    def record_attached(self, reason: str, scene: Optional[SceneStats]) -> None:
+        self._last_scene = scene
+        self._last_attached_at = time.monotonic()
+        self.stats.attached[reason] = self.stats.attached.get(reason, 0) + 1
+
+    def record_skipped(self) -> None:
+        self.stats.skipped += 1
+
+    def record_unchanged(self, scene: Optional[SceneStats]) -> None:
+        """The frame was encoded but matched the image in context; that image is current as of now."""
+        self._last_scene = scene
+        self._last_attached_at = time.monotonic()
+        self.stats.skipped += 1
+
+
+def log_vision_context_metrics(stats: VisionContextStats, prefix: str = "Vision context metrics") -> None:
+    logger.info(
+        f"{prefix}: images_sent={stats.images_sent}, duplicates_skipped={stats.duplicates_skipped}, "
+        f"images_collapsed={stats.images_collapsed}, tokens_saved={stats.tokens_saved}, "
+        f"bytes_saved={stats.bytes_saved}"
+    )